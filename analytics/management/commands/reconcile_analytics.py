@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the analytics rollups with exact counts and fix the counters "
+        "that drifted. Task workers also do it every ANALYTICS_RECONCILE_INTERVAL "
+        "seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report the drift and exit non-zero when there is some.",
+        )
+
+    def handle(self, *args, **options):
+        found = rollups.drift()
+        for metric, target_id, stored, actual in found:
+            self.stdout.write(
+                f"{metric.model.__name__} {target_id} {metric.field}: "
+                f"stored {stored}, actual {actual}"
+            )
+        if options["check"]:
+            if found:
+                raise CommandError(f"{len(found)} counters drifted")
+            self.stdout.write("No drift")
+            return
+        self.stdout.write(f"Fixed {rollups.reconcile(found)} counters")
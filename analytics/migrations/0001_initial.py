@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("course", "0004_course_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CourseStats",
+            fields=[
+                (
+                    "course",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="course.course",
+                    ),
+                ),
+                ("completed_count", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["-completed_count", "course"],
+                        name="course_stats_completed",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="SkillStats",
+            fields=[
+                (
+                    "skill",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="course.skill",
+                    ),
+                ),
+                ("verified_count", models.PositiveIntegerField(default=0)),
+                ("posting_count", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["-verified_count", "skill"], name="skill_stats_supply"
+                    ),
+                    models.Index(
+                        fields=["-posting_count", "skill"], name="skill_stats_demand"
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+from django.db import migrations
+from django.db.models import Count
+
+BATCH_SIZE = 1000
+
+
+def counts(through, target, using):
+    return dict(
+        through.objects.using(using)
+        .values_list(target)
+        .annotate(count=Count("*"))
+        .order_by()
+    )
+
+
+def seed(apps, schema_editor):
+    """
+    Create the rollup rows of the skills and courses that existed before
+    analytics, with exact counts. Later changes are counted by the signals of
+    analytics/rollups.py.
+    """
+    using = schema_editor.connection.alias
+    Skill = apps.get_model("course", "Skill")
+    Course = apps.get_model("course", "Course")
+    UserProfile = apps.get_model("authentication", "UserProfile")
+    JobPosting = apps.get_model("jobs", "JobPosting")
+    SkillStats = apps.get_model("analytics", "SkillStats")
+    CourseStats = apps.get_model("analytics", "CourseStats")
+
+    verified = counts(UserProfile.verified_skills.through, "skill_id", using)
+    postings = counts(JobPosting.required_skills.through, "skill_id", using)
+    completed = counts(UserProfile.completed_course.through, "course_id", using)
+
+    SkillStats.objects.using(using).bulk_create(
+        (
+            SkillStats(
+                skill_id=skill_id,
+                verified_count=verified.get(skill_id, 0),
+                posting_count=postings.get(skill_id, 0),
+            )
+            for skill_id in Skill.objects.using(using)
+            .values_list("id", flat=True)
+            .iterator(chunk_size=BATCH_SIZE)
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    CourseStats.objects.using(using).bulk_create(
+        (
+            CourseStats(
+                course_id=course_id, completed_count=completed.get(course_id, 0)
+            )
+            for course_id in Course.objects.using(using)
+            .values_list("id", flat=True)
+            .iterator(chunk_size=BATCH_SIZE)
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0001_initial"),
+        (
+            "authentication",
+            "0003_userprofile_skill_userprofile_completed_course_and_more",
+        ),
+        ("jobs", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(seed, migrations.RunPython.noop),
+    ]
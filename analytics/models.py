@@ -0,0 +1,49 @@
+from django.db import models
+
+from course.models import Course, Skill
+
+
+class SkillStats(models.Model):
+    """
+    Rollup of one skill, maintained by analytics/rollups.py.
+    """
+
+    skill = models.OneToOneField(
+        Skill, on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+    # Profiles that verified the skill, i.e. the candidate supply.
+    verified_count = models.PositiveIntegerField(default=0)
+    # Job postings requiring the skill, i.e. employer demand.
+    posting_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["-verified_count", "skill"], name="skill_stats_supply"
+            ),
+            models.Index(fields=["-posting_count", "skill"], name="skill_stats_demand"),
+        ]
+
+    def __str__(self):
+        return f"Stats of {self.skill}"
+
+
+class CourseStats(models.Model):
+    """
+    Rollup of one course, maintained by analytics/rollups.py.
+    """
+
+    course = models.OneToOneField(
+        Course, on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+    completed_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["-completed_count", "course"], name="course_stats_completed"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Stats of {self.course}"
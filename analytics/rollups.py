@@ -0,0 +1,290 @@
+"""
+Rollup counters behind the analytics endpoints.
+
+Each metric counts the rows of one m2m table per target:
+
+- SkillStats.verified_count: profiles that verified the skill;
+- SkillStats.posting_count: job postings requiring the skill;
+- CourseStats.completed_count: profiles that completed the course.
+
+Counters are kept up to date from m2m_changed. The rows a change adds or
+removes are turned into per-target deltas as the signal fires, collected per
+atomic block in a `Batch` and applied once the transaction commits with one
+UPDATE per metric and delta, so a batch completion of many profiles costs a
+few statements and concurrent writers never hold a lock on a popular skill's
+row. Each batch is the on_commit callback of its block, so rolling the block
+back discards its deltas with it.
+
+A crash between a commit and its flush, rows cascaded by a raw delete or a
+bulk_create without signals leave the counters off. `drift()` reports the
+difference with an exact count and `reconcile()` fixes it. The task workers
+reconcile every ANALYTICS_RECONCILE_INTERVAL seconds (see tasks/queue.py),
+`manage.py reconcile_analytics` does it on demand. Migration 0002 counted
+the rows that existed before analytics.
+"""
+
+import logging
+from collections import Counter, defaultdict
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+
+from authentication.models import UserProfile
+from course.models import Course, Skill
+from jobs.models import JobPosting
+from tasks.queue import task
+
+from .models import CourseStats, SkillStats
+
+logger = logging.getLogger(__name__)
+
+
+class Metric(NamedTuple):
+    through: type
+    owner: str  # column of the owning side, e.g. the profile
+    target: str  # column of the counted side, e.g. the skill
+    model: type  # rollup model, keyed by the target
+    field: str
+
+    def counts(self, target_ids=None):
+        rows = self.through.objects.all()
+        if target_ids is not None:
+            rows = rows.filter(**{f"{self.target}__in": target_ids})
+        return dict(rows.values_list(self.target).annotate(count=Count("*")).order_by())
+
+
+METRICS = (
+    Metric(
+        UserProfile.verified_skills.through,
+        "userprofile_id",
+        "skill_id",
+        SkillStats,
+        "verified_count",
+    ),
+    Metric(
+        JobPosting.required_skills.through,
+        "jobposting_id",
+        "skill_id",
+        SkillStats,
+        "posting_count",
+    ),
+    Metric(
+        UserProfile.completed_course.through,
+        "userprofile_id",
+        "course_id",
+        CourseStats,
+        "completed_count",
+    ),
+)
+TARGETS = {SkillStats: Skill, CourseStats: Course}
+
+
+class Batch:
+    """
+    Deltas of one atomic block, applied when called on commit.
+    """
+
+    def __init__(self):
+        self.deltas = defaultdict(Counter)
+        self.applied = False
+
+    def __call__(self):
+        self.applied = True
+        for metric, deltas in self.deltas.items():
+            apply(metric, deltas)
+
+
+def open_batch():
+    """
+    Return the batch registered by the current atomic block, if any.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        return None
+    savepoints = set(connection.savepoint_ids)
+    for block, callback, _ in reversed(connection.run_on_commit):
+        if isinstance(callback, Batch):
+            # Batches of inner blocks, released or not, are not reused, nor
+            # ones already run, e.g. by TestCase.captureOnCommitCallbacks().
+            if block == savepoints and not callback.applied:
+                return callback
+            return None
+    return None
+
+
+def schedule(metric, deltas):
+    """
+    Add `deltas`, target id -> change, to `metric` once the current
+    transaction commits.
+    """
+    batch = open_batch()
+    if batch is not None:
+        batch.deltas[metric].update(deltas)
+        return
+    batch = Batch()
+    batch.deltas[metric].update(deltas)
+    transaction.on_commit(batch)
+
+
+def apply(metric, deltas):
+    by_delta = defaultdict(list)
+    for target_id, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(target_id)
+    pk = metric.model._meta.pk.attname
+    for delta, target_ids in sorted(by_delta.items()):
+        target_ids.sort()
+        updated = metric.model.objects.filter(**{f"{pk}__in": target_ids}).update(
+            **{metric.field: Greatest(F(metric.field) + delta, Value(0))}
+        )
+        if updated < len(target_ids):
+            # Targets created without signals have no row yet, count them.
+            create_missing(metric.model, target_ids)
+
+
+def create_missing(model, target_ids):
+    pk = model._meta.pk.attname
+    existing = set(
+        model.objects.filter(**{f"{pk}__in": target_ids}).values_list(pk, flat=True)
+    )
+    missing = set(
+        TARGETS[model]
+        .objects.filter(id__in=set(target_ids) - existing)
+        .values_list("id", flat=True)
+    )
+    if not missing:
+        return
+    counts = {
+        metric.field: metric.counts(missing)
+        for metric in METRICS
+        if metric.model is model
+    }
+    model.objects.bulk_create(
+        [
+            model(
+                **{pk: target_id},
+                **{field: count.get(target_id, 0) for field, count in counts.items()},
+            )
+            for target_id in sorted(missing)
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def drift():
+    """
+    Return `(metric, target id, stored, actual)` for every counter that
+    differs from an exact count, stored is None when the row is missing.
+    """
+    found = []
+    for model, target in TARGETS.items():
+        pk = model._meta.pk.attname
+        metrics = [metric for metric in METRICS if metric.model is model]
+        actual = {metric.field: metric.counts() for metric in metrics}
+        stored = {
+            row[pk]: row
+            for row in model.objects.values(pk, *(m.field for m in metrics))
+        }
+        for target_id in target.objects.order_by("id").values_list("id", flat=True):
+            row = stored.get(target_id)
+            for metric in metrics:
+                count = actual[metric.field].get(target_id, 0)
+                value = None if row is None else row[metric.field]
+                if value != count:
+                    found.append((metric, target_id, value, count))
+    return found
+
+
+def reconcile(found=None):
+    """
+    Fix the counters in `found`, see drift(), and return how many were off.
+
+    Rows are recounted by a single UPDATE each, so a write committing while
+    drift() ran is not undone.
+    """
+    found = drift() if found is None else found
+    by_metric = defaultdict(set)
+    for metric, target_id, stored, _ in found:
+        if stored is None:
+            create_missing(metric.model, [target_id])
+        else:
+            by_metric[metric].add(target_id)
+    for metric, target_ids in by_metric.items():
+        pk = metric.model._meta.pk.attname
+        exact = (
+            metric.through.objects.filter(**{metric.target: OuterRef(pk)})
+            .values(metric.target)
+            .annotate(count=Count("*"))
+            .values("count")
+        )
+        metric.model.objects.filter(**{f"{pk}__in": target_ids}).update(
+            **{
+                metric.field: Coalesce(
+                    Subquery(exact, output_field=IntegerField()), Value(0)
+                )
+            }
+        )
+    return len(found)
+
+
+@task(every=settings.ANALYTICS_RECONCILE_INTERVAL)
+def reconcile_periodically():
+    if fixed := reconcile():
+        logger.warning("Fixed %d drifted analytics counters", fixed)
+
+
+def owner_changed(metric, instance, action, reverse, pk_set):
+    if action == "post_add":
+        if reverse:
+            schedule(metric, {instance.pk: len(pk_set)})
+        else:
+            schedule(metric, dict.fromkeys(pk_set, 1))
+        return
+    if action not in ("pre_remove", "pre_clear"):
+        return
+    # remove() reports the ids asked for, count the rows that exist.
+    rows = metric.through.objects.filter(
+        **{metric.target if reverse else metric.owner: instance.pk}
+    )
+    if action == "pre_remove":
+        rows = rows.filter(
+            **{f"{metric.owner if reverse else metric.target}__in": pk_set}
+        )
+    if reverse:
+        schedule(metric, {instance.pk: -rows.count()})
+    else:
+        targets = Counter(rows.values_list(metric.target, flat=True))
+        schedule(metric, {target_id: -count for target_id, count in targets.items()})
+
+
+def connect(metric):
+    @receiver(m2m_changed, sender=metric.through, weak=False)
+    def changed(sender, instance, action, reverse, pk_set, **kwargs):
+        owner_changed(metric, instance, action, reverse, pk_set)
+
+    owner = metric.through._meta.get_field(metric.owner).related_model
+
+    @receiver(pre_delete, sender=owner, weak=False)
+    def owner_deleted(sender, instance, **kwargs):
+        # Links of a deleted owner go by cascade without m2m_changed.
+        targets = metric.through.objects.filter(
+            **{metric.owner: instance.pk}
+        ).values_list(metric.target, flat=True)
+        schedule(metric, {target_id: -1 for target_id in targets})
+
+
+for metric in METRICS:
+    connect(metric)
+
+
+@receiver(post_save, sender=Skill)
+@receiver(post_save, sender=Course)
+def target_created(sender, instance, created, **kwargs):
+    if created:
+        model = SkillStats if sender is Skill else CourseStats
+        model.objects.get_or_create(pk=instance.pk)
@@ -0,0 +1,170 @@
+import random
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from authentication.models import AuthToken, User
+from config.testing import run_due_tasks
+from course.completion import complete_courses
+from course.models import Course, Skill
+from jobs.models import JobPosting
+from tasks import queue
+from tasks.models import Task
+
+from . import rollups
+from .models import CourseStats, SkillStats
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.skills = [
+                Skill.objects.create(name=f"skill {i}", description="")
+                for i in range(4)
+            ]
+            self.courses = [
+                Course.objects.create(title=f"course {i}", description="")
+                for i in range(3)
+            ]
+            self.employer = User.objects.create(username="acme", user_type="employer")
+            self.seekers = [
+                User.objects.create(username=f"seeker{i}", user_type="seeker")
+                for i in range(4)
+            ]
+        for course in self.courses:
+            course.skills.add(*random.Random(course.id).sample(self.skills, 2))
+        self.token = AuthToken.objects.create(
+            user=self.employer, key=AuthToken.generate_token()
+        )
+
+    def get(self, path):
+        response = self.client.get(path, HTTP_AUTHORIZATION=f"Bearer {self.token.key}")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_counters_follow_every_kind_of_change(self):
+        rng = random.Random(5)
+        posting = JobPosting.objects.create(
+            employer=self.employer.employer_profile, title="Engineer"
+        )
+        for _ in range(60):
+            profile = rng.choice(self.seekers).profile
+            skill = rng.choice(self.skills)
+            course = rng.choice(self.courses)
+            with self.captureOnCommitCallbacks(execute=True):
+                match rng.randrange(8):
+                    case 0:
+                        profile.verified_skills.add(skill)
+                    case 1:
+                        profile.verified_skills.remove(skill, rng.choice(self.skills))
+                    case 2:
+                        skill.verified_users.add(
+                            *(user.profile for user in rng.sample(self.seekers, 2))
+                        )
+                    case 3:
+                        skill.verified_users.remove(rng.choice(self.seekers).profile)
+                    case 4:
+                        complete_courses([(profile.user_id, course.id)])
+                    case 5:
+                        profile.completed_course.clear()
+                    case 6:
+                        posting.required_skills.set(rng.sample(self.skills, 2))
+                    case 7:
+                        skill.required_by_postings.clear()
+            self.assertEqual(rollups.drift(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            posting.delete()
+            self.seekers[0].delete()
+        self.assertEqual(rollups.drift(), [])
+
+    def test_rolled_back_changes_are_not_counted(self):
+        profile = self.seekers[0].profile
+        kept, dropped = self.skills[:2]
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.verified_skills.add(kept)
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                profile.verified_skills.add(dropped)
+                raise RuntimeError
+            with transaction.atomic():
+                profile.completed_course.add(self.courses[0])
+        self.assertEqual(rollups.drift(), [])
+
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            profile.verified_skills.add(dropped)
+            raise RuntimeError
+        # The next commit of the thread does not pick up the rolled back delta.
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.create(name="unrelated", description="")
+        self.assertEqual(rollups.drift(), [])
+        self.assertEqual(SkillStats.objects.get(pk=dropped.pk).verified_count, 0)
+
+    def test_reconcile_fixes_drift(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            complete_courses([(self.seekers[0].id, self.courses[0].id)])
+        SkillStats.objects.all().update(verified_count=7)
+        CourseStats.objects.filter(pk=self.courses[1].pk).delete()
+        # Skills created without signals have no rollup row.
+        Skill.objects.bulk_create([Skill(name="bulk", description="")])
+
+        with self.assertRaises(CommandError):
+            call_command("reconcile_analytics", check=True, stdout=StringIO())
+        out = StringIO()
+        call_command("reconcile_analytics", stdout=out)
+        self.assertIn(f"Fixed {len(self.skills) + 3} counters", out.getvalue())
+        self.assertEqual(rollups.drift(), [])
+        call_command("reconcile_analytics", check=True, stdout=StringIO())
+
+    def test_workers_reconcile_periodically(self):
+        SkillStats.objects.all().update(posting_count=3)
+        queue.schedule_periodic()
+        Task.objects.update(run_at=timezone.now())
+        with self.assertLogs("analytics.rollups", "WARNING"):
+            run_due_tasks()
+        self.assertEqual(rollups.drift(), [])
+
+    def test_endpoints_read_the_rollups(self):
+        a, b, c, _ = self.skills
+        with self.captureOnCommitCallbacks(execute=True):
+            b.verified_users.add(*(user.profile for user in self.seekers[:3]))
+            a.verified_users.add(self.seekers[0].profile)
+            JobPosting.objects.create(
+                employer=self.employer.employer_profile, title="Engineer"
+            ).required_skills.add(c)
+
+        # One query per page whatever the number of profiles, the token is
+        # cached by the first request.
+        self.get("/api/analytics/skills")
+        with self.assertNumQueries(1):
+            page = self.get("/api/analytics/skills?limit=2")
+        self.assertEqual(
+            [(item["skill"], item["verified_count"]) for item in page["items"]],
+            [(b.id, 3), (a.id, 1)],
+        )
+        page = self.get(f"/api/analytics/skills?limit=2&cursor={page['next_cursor']}")
+        self.assertEqual(page["items"][0]["skill"], c.id)
+        page = self.get("/api/analytics/skills?order=demand&limit=1")
+        self.assertEqual(
+            page["items"],
+            [{"skill": c.id, "name": c.name, "verified_count": 0, "posting_count": 1}],
+        )
+        self.assertEqual(self.get(f"/api/analytics/skills/{b.id}")["verified_count"], 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            complete_courses([(self.seekers[1].id, self.courses[2].id)])
+        page = self.get("/api/analytics/courses")
+        self.assertEqual(page["items"][0]["course"], self.courses[2].id)
+        self.assertEqual(page["items"][0]["completed_count"], 1)
+
+    def test_seekers_are_refused(self):
+        self.token = AuthToken.objects.create(
+            user=self.seekers[0], key=AuthToken.generate_token()
+        )
+        response = self.client.get(
+            "/api/analytics/skills", HTTP_AUTHORIZATION=f"Bearer {self.token.key}"
+        )
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,89 @@
+from typing import Literal
+
+from ninja import Field, Schema
+from ninja.errors import HttpError
+from ninja_extra import api_controller, http_get
+
+from authentication.auth import SimpleTokenAuth, require_employer
+from config.pagination import Page, paginate
+
+from .models import CourseStats, SkillStats
+
+SKILL_ORDERINGS = {
+    "supply": ("-verified_count", "skill_id"),
+    "demand": ("-posting_count", "skill_id"),
+}
+
+
+class SkillMetrics(Schema):
+    skill: int = Field(alias="skill_id")
+    name: str = Field(alias="skill.name")
+    verified_count: int
+    posting_count: int
+
+
+class CourseMetrics(Schema):
+    course: int = Field(alias="course_id")
+    title: str = Field(alias="course.title")
+    completed_count: int
+
+
+def skill_stats():
+    return SkillStats.objects.select_related("skill").only(
+        "verified_count", "posting_count", "skill__name"
+    )
+
+
+def course_stats():
+    return CourseStats.objects.select_related("course").only(
+        "completed_count", "course__title"
+    )
+
+
+@api_controller("/analytics", auth=SimpleTokenAuth(), tags=["Analytics"])
+class AnalyticsController:
+    """
+    Employer dashboard metrics, read from the rollups of analytics/rollups.py
+    so every read costs the same whatever the number of users.
+    """
+
+    @http_get("/skills", response=Page[SkillMetrics])
+    async def skills(
+        self,
+        request,
+        order: Literal["supply", "demand"] = "supply",
+        cursor: str = None,
+        limit: int = None,
+    ):
+        """
+        Skills by candidate supply, the profiles that verified them, or by
+        demand, the job postings requiring them.
+        """
+        require_employer(request)
+        return await paginate(skill_stats(), SKILL_ORDERINGS[order], cursor, limit)
+
+    @http_get("/skills/{int:skill_id}", response=SkillMetrics)
+    async def skill(self, request, skill_id: int):
+        require_employer(request)
+        stats = await skill_stats().filter(pk=skill_id).afirst()
+        if stats is None:
+            raise HttpError(404, "Skill not found")
+        return stats
+
+    @http_get("/courses", response=Page[CourseMetrics])
+    async def courses(self, request, cursor: str = None, limit: int = None):
+        """
+        Courses by number of completions.
+        """
+        require_employer(request)
+        return await paginate(
+            course_stats(), ("-completed_count", "course_id"), cursor, limit
+        )
+
+    @http_get("/courses/{int:course_id}", response=CourseMetrics)
+    async def course(self, request, course_id: int):
+        require_employer(request)
+        stats = await course_stats().filter(pk=course_id).afirst()
+        if stats is None:
+            raise HttpError(404, "Course not found")
+        return stats
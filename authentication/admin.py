@@ -1,10 +1,75 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
-from .models import AuthToken, Resume, User, UserProfile
+from config.admin import LargeTableAdmin
+from course.completion import complete_courses
 
-# Register your models here.
+from .models import AuthToken, Resume, ResumeSkill, User, UserProfile
 
-admin.site.register(User)
-admin.site.register(UserProfile)
-admin.site.register(Resume)
-admin.site.register(AuthToken)
+# Profiles whose completions are verified per transaction by the bulk action.
+VERIFY_BATCH_SIZE = 500
+
+# Prefix matches on the unique username use its index, contains does not.
+USERNAME_SEARCH = ("user__username__startswith",)
+
+
+@admin.register(User)
+class UserAdmin(LargeTableAdmin, BaseUserAdmin):
+    list_display = ("username", "email", "user_type", "is_active", "date_joined")
+    list_filter = ("user_type", "is_active", "is_staff")
+    search_fields = ("username__startswith",)
+    fieldsets = BaseUserAdmin.fieldsets + (("Type", {"fields": ("user_type",)}),)
+
+
+@admin.register(UserProfile)
+class UserProfileAdmin(LargeTableAdmin):
+    list_display = ("user", "id")
+    list_select_related = ("user",)
+    search_fields = USERNAME_SEARCH
+    raw_id_fields = ("user",)
+    autocomplete_fields = ("completed_course", "verified_skills", "skill")
+    actions = ["verify_completed_skills"]
+
+    @admin.action(description="Verify the skills of their completed courses")
+    def verify_completed_skills(self, request, queryset):
+        CompletedCourse = UserProfile.completed_course.through
+        profiles = queryset.order_by("id").values_list("id", flat=True)
+        verified, last = 0, 0
+        while batch := list(profiles.filter(id__gt=last)[:VERIFY_BATCH_SIZE]):
+            last = batch[-1]
+            pairs = CompletedCourse.objects.filter(
+                userprofile_id__in=batch
+            ).values_list("userprofile__user_id", "course_id")
+            if pairs:
+                verified += complete_courses(pairs)["verified_skills"]
+        self.message_user(request, f"Verified {verified} new skills.", messages.SUCCESS)
+
+
+class ResumeSkillInline(admin.TabularInline):
+    model = ResumeSkill
+    fields = ("skill", "mentions", "confidence")
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("skill")
+
+
+@admin.register(Resume)
+class ResumeAdmin(LargeTableAdmin):
+    list_display = ("user", "resume_file", "created_at", "parsed_at", "parse_error")
+    list_select_related = ("user",)
+    search_fields = USERNAME_SEARCH
+    raw_id_fields = ("user",)
+    readonly_fields = ("parsed_file", "parsed_at", "parse_error")
+    inlines = (ResumeSkillInline,)
+
+
+@admin.register(AuthToken)
+class AuthTokenAdmin(LargeTableAdmin):
+    list_display = ("user", "created")
+    list_select_related = ("user",)
+    search_fields = USERNAME_SEARCH
+    raw_id_fields = ("user",)
+    readonly_fields = ("created",)
@@ -1,14 +1,61 @@
 # auth_backend.py
+from ninja.errors import HttpError
 from ninja.security import HttpBearer
 
-from .models import AuthToken
+from . import token_cache
+from .models import User
+from .tokens import TokenUser, is_signed_token, verify_signed_token
 
 
 class SimpleTokenAuth(HttpBearer):
     def authenticate(self, request, token: str):
-        try:
-            auth_token = AuthToken.objects.get(key=token)
-            request.user = auth_token.user
-            return auth_token.user
-        except AuthToken.DoesNotExist:
-            return None
+        # Sub-requests of /api/batch carry the user the batch authenticated.
+        batch_user = getattr(request, "batch_user", None)
+        if batch_user is not None:
+            request.user = batch_user
+            return batch_user
+
+        if is_signed_token(token):
+            user = verify_signed_token(token)
+            if user is not None:
+                request.user = user
+            return user
+
+        user = token_cache.get_user(token)
+        if user is None:
+            user = User.objects.filter(auth_token__key=token, is_active=True).first()
+            if user is None:
+                return None
+            token_cache.set_user(token, user)
+        request.user = user
+        return user
+
+
+async def aget_user(request):
+    """
+    Return request.user as a loaded User, safe to use from async views.
+    """
+    user = request.user
+    if isinstance(user, TokenUser):
+        return await user.aload()
+    return user
+
+
+def require_admin(request):
+    """
+    Raise 403 unless the authenticated user is an admin. Only reads the
+    user_type, so it does not load signed-token users.
+    """
+    if request.user.user_type != User.USER_TYPE_CHOICES.ADMIN:
+        raise HttpError(403, "Admin only")
+
+
+def require_employer(request):
+    """
+    Raise 403 unless the authenticated user is an employer or an admin.
+    """
+    if request.user.user_type not in (
+        User.USER_TYPE_CHOICES.EMPLOYER,
+        User.USER_TYPE_CHOICES.ADMIN,
+    ):
+        raise HttpError(403, "Employers only")
@@ -0,0 +1,40 @@
+from django.contrib.auth import backends
+from django.contrib.auth.hashers import verify_password
+
+from config.executors import hashing_pool, run_in_pool
+
+from .models import User
+
+
+class ModelBackend(backends.ModelBackend):
+    """
+    Django's ModelBackend, hashing in `hashing_pool` when used through
+    `aauthenticate()`, so checking a password neither blocks the event loop
+    nor queues up behind ORM calls. The user is still loaded through the
+    async ORM; inactive users, hash upgrades and the user_login_failed
+    signal are handled as with `authenticate()`.
+    """
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = await User._default_manager.aget_by_natural_key(username)
+        except User.DoesNotExist:
+            # Hash anyway so response times don't reveal which usernames exist.
+            await run_in_pool(hashing_pool, User().set_password, password)
+            return None
+
+        valid, must_update = await run_in_pool(
+            hashing_pool, verify_password, password, user.password
+        )
+        if not valid or not self.user_can_authenticate(user):
+            return None
+        if must_update:
+            await run_in_pool(hashing_pool, user.set_password, password)
+            # A hash upgrade is not a password change.
+            user._password = None
+            await user.asave(update_fields=["password"])
+        return user
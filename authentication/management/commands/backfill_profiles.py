@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from authentication import public
+from authentication.models import EmployerProfile, User, UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the missing profiles of seekers and employers, which read "
+        "endpoints no longer create on demand."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        for model, user_type in (
+            (UserProfile, User.USER_TYPE_CHOICES.SEEKER),
+            (EmployerProfile, User.USER_TYPE_CHOICES.EMPLOYER),
+        ):
+            created = self.backfill(model, user_type, options["batch_size"])
+            self.stdout.write(f"Created {created} {model._meta.verbose_name}s")
+
+    def backfill(self, model, user_type, batch_size):
+        missing = (
+            User.objects.filter(user_type=user_type)
+            .exclude(id__in=model.objects.values("user_id"))
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        created = 0
+        while user_ids := list(missing[:batch_size]):
+            with transaction.atomic():
+                # Profiles created concurrently by a write are left alone.
+                model.objects.bulk_create(
+                    [model(user_id=user_id) for user_id in user_ids],
+                    ignore_conflicts=True,
+                )
+                # bulk_create sends no signals.
+                public.refresh(user_ids)
+            created += len(user_ids)
+        return created
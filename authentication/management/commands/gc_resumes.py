@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from authentication import uploads
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete resume objects of the bucket that no Resume points at any "
+        "more, listing the bucket a page at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-age",
+            type=float,
+            default=24,
+            help="Only delete objects older than this many hours.",
+        )
+        parser.add_argument("--page-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        scanned, deleted = uploads.collect_garbage(
+            min_age=timedelta(hours=options["min_age"]),
+            page_size=options["page_size"],
+            dry_run=options["dry_run"],
+        )
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(f"{verb} {deleted} of {scanned} objects")
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from authentication import resume_parsing
+
+
+class Command(BaseCommand):
+    help = (
+        "Infer the skills of the resumes whose file was not parsed yet, or of "
+        "all resumes with --all, over a pool of worker processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", dest="everything")
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=None,
+            help="Worker processes, the number of CPUs by default.",
+        )
+        parser.add_argument("--batch-size", type=int, default=100)
+
+    def handle(self, *args, **options):
+        parsed, failed = resume_parsing.parse_all(
+            everything=options["everything"],
+            processes=options["processes"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(f"Parsed {parsed} resumes, {failed} could not be read")
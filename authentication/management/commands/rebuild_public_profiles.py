@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from authentication import public
+from authentication.models import PublicProfile
+
+
+class Command(BaseCommand):
+    help = "Rebuild the public profile of every user, e.g. after a bulk SQL load."
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        public.rebuild()
+        self.stdout.write(
+            f"Rebuilt {PublicProfile.objects.count()} public profiles "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
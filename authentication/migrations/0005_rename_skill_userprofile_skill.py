@@ -2,6 +2,23 @@
 
 from django.db import migrations
 
+OLD_TABLE = "authentication_userprofile_Skill"
+NEW_TABLE = "authentication_userprofile_skill"
+
+
+def rename_through_table(apps, schema_editor):
+    # SQLite table names are case-insensitive, the old table already answers
+    # to the new name and remaking it would fail with "table already exists".
+    if schema_editor.connection.features.ignores_table_name_case:
+        return
+    schema_editor.alter_db_table(None, OLD_TABLE, NEW_TABLE)
+
+
+def restore_through_table(apps, schema_editor):
+    if schema_editor.connection.features.ignores_table_name_case:
+        return
+    schema_editor.alter_db_table(None, NEW_TABLE, OLD_TABLE)
+
 
 class Migration(migrations.Migration):
 
@@ -10,9 +27,16 @@ class Migration(migrations.Migration):
     ]
 
     operations = [
-        migrations.RenameField(
-            model_name="userprofile",
-            old_name="Skill",
-            new_name="skill",
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(rename_through_table, restore_through_table),
+            ],
+            state_operations=[
+                migrations.RenameField(
+                    model_name="userprofile",
+                    old_name="Skill",
+                    new_name="skill",
+                ),
+            ],
         ),
     ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0007_user_token_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PublicProfile",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="public_profile",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("username", models.CharField(max_length=150, unique=True)),
+                ("user_type", models.CharField(max_length=10, null=True)),
+                ("profile_id", models.BigIntegerField(null=True, unique=True)),
+                ("profile", models.JSONField(null=True)),
+                ("employer", models.JSONField(null=True)),
+            ],
+        ),
+    ]
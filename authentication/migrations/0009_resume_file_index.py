@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0008_public_profile"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="resume",
+            name="resume_file",
+            field=models.FileField(db_index=True, upload_to="resumes/"),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0009_resume_file_index"),
+        ("course", "0004_course_search"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="resume",
+            name="parse_error",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="resume",
+            name="parsed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="resume",
+            name="parsed_file",
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.CreateModel(
+            name="ResumeSkill",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("mentions", models.PositiveIntegerField()),
+                ("confidence", models.FloatField()),
+                (
+                    "resume",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="inferred_skills",
+                        to="authentication.resume",
+                    ),
+                ),
+                (
+                    "skill",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="resume_mentions",
+                        to="course.skill",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["skill", "-confidence"], name="resume_skill_rank"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("resume", "skill"), name="resume_skill_unique"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,109 @@
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import migrations
+
+BATCH_SIZE = 1000
+# Profile m2m field -> column of the related id, as in authentication/public.py.
+M2M = {
+    "completed_course": "course_id",
+    "verified_skills": "skill_id",
+    "skill": "course_id",
+}
+
+
+def documents(apps, using, user_ids):
+    """
+    Build the PublicProfile rows of `user_ids` like public.documents().
+    """
+    User = apps.get_model("authentication", "User")
+    UserProfile = apps.get_model("authentication", "UserProfile")
+    PublicProfile = apps.get_model("authentication", "PublicProfile")
+
+    ids = defaultdict(lambda: {name: [] for name in M2M})
+    for name, column in M2M.items():
+        through = UserProfile._meta.get_field(name).remote_field.through
+        rows = (
+            through.objects.using(using)
+            .filter(userprofile__user_id__in=user_ids)
+            .order_by(column)
+            .values_list("userprofile_id", column)
+        )
+        for profile_id, related_id in rows:
+            ids[profile_id][name].append(related_id)
+
+    rows = []
+    for user in (
+        User.objects.using(using)
+        .filter(id__in=user_ids)
+        .select_related("profile", "employer_profile")
+    ):
+        public = {
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "email": user.email,
+        }
+        profile = getattr(user, "profile", None)
+        employer = getattr(user, "employer_profile", None)
+        rows.append(
+            PublicProfile(
+                user_id=user.pk,
+                username=user.username,
+                user_type=user.user_type,
+                profile_id=profile and profile.pk,
+                profile=profile
+                and {
+                    "id": profile.pk,
+                    "user_id": user.pk,
+                    "bio": profile.bio,
+                    **ids[profile.pk],
+                    **public,
+                },
+                employer=employer
+                and {
+                    "id": employer.pk,
+                    "user_id": user.pk,
+                    "bio": employer.bio,
+                    "company": employer.company,
+                    "website": employer.website,
+                    "location": employer.location,
+                    **public,
+                },
+            )
+        )
+    return rows
+
+
+def backfill(apps, schema_editor):
+    """
+    Build the public profiles of the users that existed before the read
+    model, later changes are applied by the signals of authentication/public.py.
+    """
+    from authentication.public import miss_key
+
+    User = apps.get_model("authentication", "User")
+    PublicProfile = apps.get_model("authentication", "PublicProfile")
+    using = schema_editor.connection.alias
+    built = PublicProfile.objects.using(using).values("user_id")
+    ids = list(
+        User.objects.using(using)
+        .exclude(id__in=built)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    for start in range(0, len(ids), BATCH_SIZE):
+        rows = documents(apps, using, ids[start : start + BATCH_SIZE])
+        PublicProfile.objects.using(using).bulk_create(rows)
+        # Lookups made before the backfill may have cached these as missing.
+        cache.delete_many([miss_key(row.username) for row in rows])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0010_resume_skills"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,14 @@
 import secrets
 
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
 
 from course.models import Course, Skill
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from . import token_cache
+
 # Create your models here.
 
 
@@ -25,23 +27,46 @@ class User(AbstractUser):
         choices=USER_TYPE_CHOICES.choices,
         null=True,
     )
+    token_version = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return self.username
 
+    @transaction.atomic
+    def set_user_type(self, user_type):
+        """
+        Change the user type, creating the matching profile with it.
+        """
+        self.user_type = user_type
+        self.save(update_fields=["user_type"])
+
+
+def ensure_profile(user):
+    """
+    Create the profile the user's type calls for if it is missing. Reads
+    never create profiles, every write of a user type goes through here.
+    """
+    if user.user_type == User.USER_TYPE_CHOICES.SEEKER:
+        UserProfile.objects.get_or_create(user=user)
+    elif user.user_type == User.USER_TYPE_CHOICES.EMPLOYER:
+        EmployerProfile.objects.get_or_create(user=user)
+
 
 @receiver(post_save, sender=User)
-def user_pre_save(sender, instance, **kwargs):
+def create_profile(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields is None or "user_type" in update_fields:
+        ensure_profile(instance)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, **kwargs):
     """
-    Signal that prints a message every time the User model is updated.
+    Drop cached tokens of a user whenever the user changes, e.g. on deactivation.
     """
-    try:
-        if instance.user_type == "seeker":
-            UserProfile.objects.get_or_create(user=instance)
-        elif instance.user_type == "employer":
-            EmployerProfile.objects.get_or_create(user=instance)
-    except Exception as e:
-        print(f"Error creating user profile: {e}")
+    token_cache.invalidate(
+        *AuthToken.objects.filter(user=instance).values_list("key", flat=True)
+    )
+    token_cache.invalidate_user_state(instance.pk)
 
 
 class Resume(models.Model):
@@ -50,13 +75,43 @@ class Resume(models.Model):
     """
 
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="resume")
-    resume_file = models.FileField(upload_to="resumes/")
+    # Indexed for the orphan lookups of `manage.py gc_resumes`.
+    resume_file = models.FileField(upload_to="resumes/", db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # File the inferred skills were extracted from, see resume_parsing.py.
+    parsed_file = models.CharField(max_length=100, blank=True)
+    parsed_at = models.DateTimeField(null=True, blank=True)
+    parse_error = models.CharField(max_length=255, blank=True)
 
     def __str__(self):
         return f"{self.user.username}'s Resume"
 
 
+class ResumeSkill(models.Model):
+    """
+    Skill of the catalog found in the text of a resume.
+    """
+
+    resume = models.ForeignKey(
+        Resume, on_delete=models.CASCADE, related_name="inferred_skills"
+    )
+    skill = models.ForeignKey(
+        Skill, on_delete=models.CASCADE, related_name="resume_mentions"
+    )
+    mentions = models.PositiveIntegerField()
+    confidence = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["resume", "skill"], name="resume_skill_unique"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["skill", "-confidence"], name="resume_skill_rank")
+        ]
+
+
 class UserProfile(models.Model):
     """
     User profile model that extends the custom user model.
@@ -93,6 +148,29 @@ class EmployerProfile(models.Model):
         return f"{self.user.username}'s Profile"
 
 
+class PublicProfile(models.Model):
+    """
+    Denormalised public view of a user, kept current by
+    authentication/public.py. `profile` and `employer` hold the serialised
+    ProfileResponse and EmployerProfileResponse, or null without that profile.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="public_profile",
+    )
+    username = models.CharField(max_length=150, unique=True)
+    user_type = models.CharField(max_length=10, null=True)
+    profile_id = models.BigIntegerField(null=True, unique=True)
+    profile = models.JSONField(null=True)
+    employer = models.JSONField(null=True)
+
+    def __str__(self):
+        return f"{self.username}'s public profile"
+
+
 class AuthToken(models.Model):
     user = models.OneToOneField(
         User, on_delete=models.CASCADE, related_name="auth_token"
@@ -104,5 +182,19 @@ class AuthToken(models.Model):
     def generate_token():
         return secrets.token_hex(20)
 
+    def rotate(self):
+        """
+        Replace the key with a fresh one and invalidate the old key everywhere.
+        """
+        old_key = self.key
+        self.key = self.generate_token()
+        self.save()
+        token_cache.invalidate(old_key)
+
     def __str__(self):
         return f"Token for {self.user.username}"
+
+
+@receiver(post_delete, sender=AuthToken)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key)
@@ -0,0 +1,240 @@
+"""
+Denormalised public profiles.
+
+Public lookups read one PublicProfile row by its unique username (or profile
+id) and return the stored JSON documents as they are, instead of joining
+User with its profile and loading three id lists per profile.
+
+Rows are refreshed after commit from signals on User, UserProfile, its m2m
+relations and EmployerProfile. Changes are collected per thread and every
+user is refreshed once per transaction, so a batch of completions costs a
+fixed number of queries. Deleting a user deletes its row by cascade.
+Migration 0011 built the rows of the users that existed before.
+
+Usernames without a row are cached as misses for PUBLIC_PROFILE_MISS_TIMEOUT
+seconds. Refreshing a user forgets the miss of its username; a lookup racing
+with the commit that creates the user can re-cache it until the timeout.
+"""
+
+import hashlib
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from course.models import Course, Skill
+
+from .models import EmployerProfile, PublicProfile, User, UserProfile
+
+BATCH_SIZE = 1000
+MISS_KEY = "authentication:public:missing:{}"
+
+# Profile m2m field -> (through model, column of the related id).
+M2M = {
+    "completed_course": (UserProfile.completed_course.through, "course_id"),
+    "verified_skills": (UserProfile.verified_skills.through, "skill_id"),
+    "skill": (UserProfile.skill.through, "course_id"),
+}
+
+_pending = threading.local()
+
+
+def miss_key(username):
+    return MISS_KEY.format(hashlib.sha256(username.encode()).hexdigest())
+
+
+def documents(user_ids):
+    """
+    Build the PublicProfile rows of `user_ids`.
+    """
+    users = User.objects.filter(id__in=user_ids).select_related(
+        "profile", "employer_profile"
+    )
+    ids = defaultdict(lambda: {name: [] for name in M2M})
+    for name, (through, column) in M2M.items():
+        rows = (
+            through.objects.filter(userprofile__user_id__in=user_ids)
+            .order_by(column)
+            .values_list("userprofile_id", column)
+        )
+        for profile_id, related_id in rows:
+            ids[profile_id][name].append(related_id)
+
+    # Keys are model attribute names, which the response schemas validate.
+    rows = []
+    for user in users:
+        public = {
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "email": user.email,
+        }
+        profile = getattr(user, "profile", None)
+        employer = getattr(user, "employer_profile", None)
+        rows.append(
+            PublicProfile(
+                user_id=user.pk,
+                username=user.username,
+                user_type=user.user_type,
+                profile_id=profile and profile.pk,
+                profile=profile
+                and {
+                    "id": profile.pk,
+                    "user_id": user.pk,
+                    "bio": profile.bio,
+                    **ids[profile.pk],
+                    **public,
+                },
+                employer=employer
+                and {
+                    "id": employer.pk,
+                    "user_id": user.pk,
+                    "bio": employer.bio,
+                    "company": employer.company,
+                    "website": employer.website,
+                    "location": employer.location,
+                    **public,
+                },
+            )
+        )
+    return rows
+
+
+def refresh(user_ids):
+    """
+    Rebuild the public profiles of `user_ids`.
+    """
+    user_ids = sorted(set(user_ids))
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        batch = user_ids[start : start + BATCH_SIZE]
+        with transaction.atomic():
+            rows = documents(batch)
+            # A renamed user frees its old username inside this batch.
+            PublicProfile.objects.filter(
+                username__in=[row.username for row in rows]
+            ).exclude(user_id__in=batch).delete()
+            PublicProfile.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=["user"],
+                update_fields=[
+                    "username",
+                    "user_type",
+                    "profile_id",
+                    "profile",
+                    "employer",
+                ],
+            )
+        cache.delete_many([miss_key(row.username) for row in rows])
+
+
+def rebuild():
+    ids = User.objects.order_by("id").values_list("id", flat=True)
+    batch = []
+    for user_id in ids.iterator(chunk_size=BATCH_SIZE):
+        batch.append(user_id)
+        if len(batch) == BATCH_SIZE:
+            refresh(batch)
+            batch = []
+    if batch:
+        refresh(batch)
+
+
+async def aget(username, field):
+    """
+    Return the `field` document and user type of `username`, None when the
+    user does not exist.
+    """
+    key = miss_key(username)
+    if await cache.aget(key):
+        return None
+    row = (
+        await PublicProfile.objects.filter(username=username)
+        .values_list(field, "user_type")
+        .afirst()
+    )
+    if row is None:
+        await cache.aset(key, True, settings.PUBLIC_PROFILE_MISS_TIMEOUT)
+    return row
+
+
+def schedule(user_ids=(), profile_ids=()):
+    """
+    Refresh the given users and the users of the given UserProfiles once the
+    current transaction commits.
+    """
+    if not hasattr(_pending, "users"):
+        _pending.users, _pending.profiles = set(), set()
+    _pending.users.update(user_ids)
+    _pending.profiles.update(profile_ids)
+    # Registered every time, flushing an empty set is free. A callback lost
+    # to a savepoint rollback is covered by the ones registered after it.
+    transaction.on_commit(flush)
+
+
+def flush():
+    users, profiles = _pending.users, _pending.profiles
+    if not users and not profiles:
+        return
+    _pending.users, _pending.profiles = set(), set()
+    if profiles:
+        users |= set(
+            UserProfile.objects.filter(id__in=profiles).values_list(
+                "user_id", flat=True
+            )
+        )
+    refresh(users)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    schedule(user_ids=[instance.pk])
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_save, sender=EmployerProfile)
+@receiver(post_delete, sender=EmployerProfile)
+def profile_changed(sender, instance, **kwargs):
+    schedule(user_ids=[instance.user_id])
+
+
+def profile_m2m_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith("post_"):
+            # Batch completion sends signals for unsaved UserProfile(id=...).
+            schedule(profile_ids=[instance.pk])
+    elif action in ("post_add", "post_remove"):
+        schedule(profile_ids=pk_set)
+    elif action == "pre_clear":
+        schedule(profile_ids=holders(instance))
+
+
+for through, _ in M2M.values():
+    m2m_changed.connect(profile_m2m_changed, sender=through)
+
+
+def holders(instance):
+    """
+    Ids of the profiles related to a Course or Skill through any m2m field.
+    """
+    column = "course_id" if isinstance(instance, Course) else "skill_id"
+    profile_ids = set()
+    for through, related in M2M.values():
+        if related == column:
+            profile_ids.update(
+                through.objects.filter(**{column: instance.pk}).values_list(
+                    "userprofile_id", flat=True
+                )
+            )
+    return profile_ids
+
+
+@receiver(pre_delete, sender=Course)
+@receiver(pre_delete, sender=Skill)
+def catalog_deleted(sender, instance, **kwargs):
+    # Through rows are deleted by cascade without m2m_changed.
+    schedule(profile_ids=holders(instance))
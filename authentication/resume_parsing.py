@@ -0,0 +1,288 @@
+"""
+Skills inferred from the text of resumes.
+
+Saving a Resume with a new file enqueues a `parse_resume` task (see
+tasks/queue.py), so uploads answer as fast as before. The file is
+streamed from the bucket into a spooled temporary file, its text read page
+by page (PDF) or paragraph by paragraph (DOCX) and its tokens run through
+the skill automaton of course/skill_matcher.py. The matches replace the
+resume's ResumeSkill rows, unless the user uploaded another file meanwhile.
+
+A skill's confidence grows with its mentions: each one is taken as a
+`PHRASE_CONFIDENCE` chance of meaning the skill for names of several words
+and `WORD_CONFIDENCE` for one word, which is more often a coincidence.
+
+`manage.py parse_resumes` parses the resumes whose file was never parsed,
+or all of them with --all, over a pool of processes; the database is only
+used by the parent, workers download, extract and match.
+
+Files that cannot be read as a resume keep the error in `parse_error`.
+Storage errors fail the task, which is retried, and leave the resume
+unparsed for the next run of the command.
+"""
+
+import logging
+import multiprocessing
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing, contextmanager
+from itertools import chain
+from tempfile import SpooledTemporaryFile
+from xml.etree import ElementTree
+
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from pypdf import PdfReader
+from storages.backends.s3 import S3Storage
+
+from course.models import Skill
+from course.skill_matcher import catalog, compile_skills, skill_matcher, tokenize
+from tasks.queue import enqueue, task
+
+from . import resume_urls
+from .models import Resume, ResumeSkill
+from .resume_urls import client, object_key, storage
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+PHRASE_CONFIDENCE = 0.8
+WORD_CONFIDENCE = 0.5
+# Uncompressed size of the text of a DOCX, guards against zip bombs.
+MAX_DOCUMENT_XML = 64 * 1024 * 1024
+WORD = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# Automaton of a batch worker process, see start_worker.
+_automaton = None
+
+
+class ParseError(ValueError):
+    pass
+
+
+@contextmanager
+def open_resume(name):
+    """
+    Yield a seekable copy of a resume file, spooled to disk past
+    FILE_UPLOAD_MAX_MEMORY_SIZE.
+    """
+    s3 = storage()
+    with SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE) as copy:
+        if isinstance(s3, S3Storage):
+            try:
+                source = client().get_object(
+                    Bucket=s3.bucket_name, Key=object_key(name)
+                )["Body"]
+            except ClientError as exc:
+                if exc.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                    raise ParseError("File not found")
+                raise
+            chunks = source.iter_chunks(CHUNK_SIZE)
+        else:
+            source = s3.open(name, "rb")
+            chunks = source.chunks(CHUNK_SIZE)
+        with closing(source):
+            size = 0
+            for chunk in chunks:
+                size += len(chunk)
+                if size > settings.RESUME_MAX_SIZE:
+                    raise ParseError(
+                        f"Resumes must be at most {settings.RESUME_MAX_SIZE} bytes"
+                    )
+                copy.write(chunk)
+        copy.seek(0)
+        yield copy
+
+
+def pdf_texts(file):
+    reader = PdfReader(file)
+    if reader.is_encrypted and not reader.decrypt(""):
+        raise ParseError("Encrypted PDF")
+    for page in reader.pages[: settings.RESUME_PARSE_MAX_PAGES]:
+        yield page.extract_text()
+
+
+def docx_texts(file):
+    with zipfile.ZipFile(file) as archive:
+        try:
+            info = archive.getinfo("word/document.xml")
+        except KeyError:
+            raise ParseError("Unsupported file format")
+        if info.file_size > MAX_DOCUMENT_XML:
+            raise ParseError("Document too large")
+        with archive.open(info) as xml:
+            parts = []
+            for _, element in ElementTree.iterparse(xml):
+                if element.tag == f"{WORD}t":
+                    parts.append(element.text or "")
+                elif element.tag in (f"{WORD}tab", f"{WORD}br"):
+                    parts.append(" ")
+                elif element.tag == f"{WORD}p":
+                    yield "".join(parts)
+                    parts = []
+                    element.clear()
+
+
+def texts(file):
+    """
+    Yield the text of a PDF or DOCX file in pieces, at most
+    RESUME_PARSE_MAX_CHARS characters in all.
+    """
+    head = file.read(4)
+    file.seek(0)
+    if head == b"%PDF":
+        pieces = pdf_texts(file)
+    elif head == b"PK\x03\x04":
+        pieces = docx_texts(file)
+    else:
+        raise ParseError("Unsupported file format")
+    room = settings.RESUME_PARSE_MAX_CHARS
+    for piece in pieces:
+        yield piece[:room]
+        room -= len(piece)
+        if room <= 0:
+            return
+
+
+def extract(name, automaton):
+    """
+    Return skill id -> mentions in the resume file `name`.
+
+    Raises ParseError for files that cannot be read as a resume, storage
+    errors propagate.
+    """
+    with open_resume(name) as file:
+        try:
+            return automaton.count(chain.from_iterable(map(tokenize, texts(file))))
+        except ParseError:
+            raise
+        except Exception as exc:
+            # pypdf, zipfile and expat fail in many ways on damaged files.
+            raise ParseError("Could not read the file") from exc
+
+
+def inspect(name, automaton):
+    """
+    Return `(skill id -> mentions, error)` of a resume file, mentions are
+    None when the file could not be downloaded.
+    """
+    try:
+        return dict(extract(name, automaton)), ""
+    except ParseError as exc:
+        return {}, str(exc)
+    except Exception:
+        logger.exception("Could not download resume %s", name)
+        return None, ""
+
+
+def confidence(name, mentions):
+    chance = PHRASE_CONFIDENCE if len(list(tokenize(name))) > 1 else WORD_CONFIDENCE
+    return round(1 - (1 - chance) ** mentions, 3)
+
+
+def save(resume_id, name, mentions, error=""):
+    """
+    Replace the inferred skills of a resume with `mentions`, skill id ->
+    count, found in its file `name`. Nothing is written when the resume
+    points at another file by now; returns whether it was updated.
+    """
+    with transaction.atomic():
+        # Also locks the row, runs on the same resume write one at a time.
+        updated = Resume.objects.filter(pk=resume_id, resume_file=name).update(
+            parsed_file=name, parsed_at=timezone.now(), parse_error=error[:255]
+        )
+        if not updated:
+            return False
+        names = dict(Skill.objects.filter(id__in=mentions).values_list("id", "name"))
+        ResumeSkill.objects.filter(resume_id=resume_id).delete()
+        ResumeSkill.objects.bulk_create(
+            ResumeSkill(
+                resume_id=resume_id,
+                skill_id=skill_id,
+                mentions=mentions[skill_id],
+                confidence=confidence(skill_name, mentions[skill_id]),
+            )
+            for skill_id, skill_name in sorted(names.items())
+        )
+    return True
+
+
+@task
+def parse_resume(resume_id, name):
+    """
+    Infer the skills of one resume from its file `name`, unless it was
+    replaced since.
+    """
+    if not Resume.objects.filter(pk=resume_id, resume_file=name).exists():
+        return
+    try:
+        mentions, error = extract(name, skill_matcher.ensure_fresh()), ""
+    except ParseError as exc:
+        mentions, error = {}, str(exc)
+    save(resume_id, name, mentions, error)
+
+
+@receiver(post_save, sender=Resume)
+def resume_saved(sender, instance, **kwargs):
+    name = instance.resume_file.name
+    if name and name != instance.parsed_file:
+        # Keyed by file, saving the resume again does not parse it twice.
+        enqueue(
+            parse_resume, instance.pk, name, key=f"parse_resume:{instance.pk}:{name}"
+        )
+
+
+def start_worker(skills):
+    global _automaton
+    # The parent's botocore client must not be shared across a fork.
+    resume_urls.reset()
+    _automaton = compile_skills(skills)
+
+
+def inspect_in_worker(name):
+    return inspect(name, _automaton)
+
+
+def parse_all(everything=False, processes=None, batch_size=100):
+    """
+    Parse the resumes whose current file was not parsed, or all of them,
+    over `processes` worker processes. Returns `(parsed, failed)` counts.
+    """
+    resumes = Resume.objects.exclude(resume_file="")
+    if not everything:
+        resumes = resumes.exclude(parsed_file=F("resume_file"))
+    parsed = failed = 0
+    skills = list(catalog())
+    # Forked, the workers inherit Django's setup. They never use the database
+    # but would share the socket of an open connection, so it is closed and
+    # the workers started before the parent queries again: with fork, the
+    # first task submitted starts all of them.
+    connections.close_all()
+    with ProcessPoolExecutor(
+        processes,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=start_worker,
+        initargs=(skills,),
+    ) as pool:
+        pool.submit(int).result()
+        last = 0
+        while True:
+            batch = list(
+                resumes.filter(pk__gt=last)
+                .order_by("pk")
+                .values_list("pk", "resume_file")[:batch_size]
+            )
+            if not batch:
+                break
+            last = batch[-1][0]
+            results = pool.map(inspect_in_worker, [name for _, name in batch])
+            for (resume_id, name), (mentions, error) in zip(batch, results):
+                if mentions is not None and save(resume_id, name, mentions, error):
+                    parsed += 1
+                    failed += bool(error)
+    return parsed, failed
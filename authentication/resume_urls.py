@@ -0,0 +1,119 @@
+"""
+Signed URLs of resume files.
+
+`storage.url()` presigns through a boto3 resource the storage keeps per
+thread, so every thread of the storage pool builds its own session and
+client, and every response signs again. Here all threads share one botocore
+client per process, which unlike sessions is thread-safe, and each URL is
+kept in an in-process LRU until RESUME_URL_REFRESH_MARGIN seconds before it
+expires. Signing is CPU only, so views call this inline rather than in a
+thread pool, and a cache hit costs a dictionary lookup.
+
+Storages that do not presign S3 URLs (custom domains, public buckets, local
+files) are passed through to `storage.url()`.
+"""
+
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from storages.backends.s3 import S3Storage
+
+from .models import Resume
+from .token_cache import LocalTokenCache
+
+_lock = threading.Lock()
+_client = None
+_cache = None
+
+
+def storage():
+    return Resume.resume_file.field.storage
+
+
+def object_key(name):
+    location = storage().location
+    return f"{location.rstrip('/')}/{name}" if location else name
+
+
+def signs(s3):
+    return isinstance(s3, S3Storage) and s3.querystring_auth and not s3.custom_domain
+
+
+def client():
+    """
+    Return the process-wide S3 client of the resume storage.
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                s3 = storage()
+                _client = s3._create_session().client(
+                    "s3",
+                    region_name=s3.region_name,
+                    use_ssl=s3.use_ssl,
+                    endpoint_url=s3.endpoint_url,
+                    config=s3.client_config,
+                    verify=s3.verify,
+                )
+    return _client
+
+
+def cache():
+    global _cache
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                _cache = LocalTokenCache(
+                    maxsize=settings.RESUME_URL_CACHE_SIZE,
+                    ttl=max(
+                        0,
+                        storage().querystring_expire
+                        - settings.RESUME_URL_REFRESH_MARGIN,
+                    ),
+                )
+    return _cache
+
+
+def urls(names):
+    """
+    Return name -> URL for every non-empty name of `names`.
+    """
+    s3 = storage()
+    names = {name for name in names if name}
+    if not signs(s3):
+        return {name: s3.url(name) for name in names}
+    found = {}
+    cached = cache()
+    for name in names:
+        url = cached.get(name)
+        if url is None:
+            url = client().generate_presigned_url(
+                "get_object",
+                Params={"Bucket": s3.bucket_name, "Key": object_key(name)},
+                ExpiresIn=s3.querystring_expire,
+            )
+            cached.set(name, url)
+        found[name] = url
+    return found
+
+
+def url(name):
+    """
+    Return the URL of one resume file, None without a file.
+    """
+    return urls([name]).get(name) if name else None
+
+
+def reset():
+    global _client, _cache
+    with _lock:
+        _client = _cache = None
+
+
+@receiver(setting_changed)
+def storage_changed(setting, **kwargs):
+    if setting == "STORAGES" or setting.startswith(("AWS_", "RESUME_URL_")):
+        reset()
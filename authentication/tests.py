@@ -1,3 +1,757 @@
-from django.test import TestCase
+import hashlib
+import io
+import threading
+import zipfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import boto3
+import requests
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from moto import mock_aws
+from moto.core import DEFAULT_ACCOUNT_ID
+from moto.s3.models import s3_backends
+
+from config.testing import assert_constant_queries, run_due_tasks
+from course.completion import complete_courses
+from course.models import Course, Skill
+from course.skill_matcher import skill_matcher
+from tasks.models import Task
+
+from . import resume_parsing, resume_urls, token_cache, uploads
+from .models import (
+    AuthToken,
+    EmployerProfile,
+    Resume,
+    ResumeSkill,
+    User,
+    UserProfile,
+)
+
+
+class TokenCacheTests(TestCase):
+    def setUp(self):
+        token_cache.local_cache.clear()
+        self.user = User.objects.create_user(
+            username="alice", password="secret-pass-123", user_type="seeker"
+        )
+        self.token = AuthToken.objects.create(
+            user=self.user, key=AuthToken.generate_token()
+        )
+
+    def get_me(self, key):
+        return self.client.get("/api/profile/me", HTTP_AUTHORIZATION=f"Bearer {key}")
+
+    def test_cached_token_skips_database(self):
+        self.assertEqual(self.get_me(self.token.key).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_me(self.token.key).status_code, 200)
+
+    def test_rotated_token_is_rejected(self):
+        old_key = self.token.key
+        self.get_me(old_key)
+        self.client.post(
+            "/api/auth/login",
+            {"username": "alice", "password": "secret-pass-123"},
+            content_type="application/json",
+        )
+        self.assertEqual(self.get_me(old_key).status_code, 401)
+
+    def test_deactivated_user_is_rejected(self):
+        self.get_me(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get_me(self.token.key).status_code, 401)
+
+
+@override_settings(AUTH_TOKEN_MODE="signed")
+class SignedTokenTests(TestCase):
+    def setUp(self):
+        User.objects.create_user(
+            username="bob", password="secret-pass-123", user_type="seeker"
+        )
+
+    def login(self):
+        response = self.client.post(
+            "/api/auth/login",
+            {"username": "bob", "password": "secret-pass-123"},
+            content_type="application/json",
+        )
+        return response.json()["token"]
+
+    def get_me(self, token):
+        return self.client.get("/api/profile/me", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_signed_token_authenticates(self):
+        token = self.login()
+        self.assertFalse(AuthToken.objects.exists())
+        response = self.get_me(token)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["username"], "bob")
+
+    def test_new_login_revokes_previous_token(self):
+        old_token = self.login()
+        self.login()
+        self.assertEqual(self.get_me(old_token).status_code, 401)
+
+    def test_opaque_tokens_keep_working(self):
+        user = User.objects.get(username="bob")
+        key = AuthToken.objects.create(user=user, key=AuthToken.generate_token()).key
+        self.assertEqual(self.get_me(key).status_code, 200)
+
+
+class LoginTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="carol", password="secret-pass-123", user_type="seeker"
+        )
+
+    def login(self, username="carol", password="secret-pass-123"):
+        return self.client.post(
+            "/api/auth/login",
+            {"username": username, "password": password},
+            content_type="application/json",
+        )
+
+    def test_login(self):
+        self.assertEqual(self.login("Carol").status_code, 200)
+        self.assertEqual(self.login(password="wrong").status_code, 401)
+        self.assertEqual(self.login("nobody").status_code, 401)
+
+    def test_failed_logins_are_signalled(self):
+        failed = []
+
+        def receiver(credentials, **kwargs):
+            failed.append(credentials["username"])
+
+        user_login_failed.connect(receiver)
+        self.addCleanup(user_login_failed.disconnect, receiver)
+        self.login(password="wrong")
+        self.login("nobody")
+        self.assertEqual(failed, ["carol", "nobody"])
+
+    def test_inactive_users_cannot_log_in(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.login().status_code, 401)
+
+    @override_settings(
+        PASSWORD_HASHERS=[
+            "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+            "django.contrib.auth.hashers.MD5PasswordHasher",
+        ]
+    )
+    def test_outdated_hashes_are_upgraded(self):
+        self.user.password = make_password("secret-pass-123", hasher="md5")
+        self.user.save()
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        token_cache.local_cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = User.objects.create_user(
+                username="carol", password="secret-pass-123", user_type="seeker"
+            )
+        self.key = AuthToken.objects.create(
+            user=self.user, key=AuthToken.generate_token()
+        ).key
+
+    def get(self, path):
+        return self.client.get(path, HTTP_AUTHORIZATION=f"Bearer {self.key}")
+
+    def test_profiles_are_created_with_the_user_type(self):
+        self.assertTrue(UserProfile.objects.filter(user=self.user).exists())
+        response = self.client.post(
+            "/api/profile/settype",
+            {"user_type": "employer"},
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {self.key}",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(EmployerProfile.objects.filter(user=self.user).exists())
+
+    def test_reads_do_not_write(self):
+        self.get("/api/dashboard/me")
+        with self.assertNumQueries(4):
+            response = self.get("/api/dashboard/me")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["first_name"], self.user.first_name)
+
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/dashboard/carol")
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_profile_is_not_created(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            UserProfile.objects.filter(user=self.user).delete()
+        self.assertEqual(self.get("/api/dashboard/me").status_code, 404)
+        self.assertEqual(self.client.get("/api/dashboard/carol").status_code, 404)
+        self.assertFalse(UserProfile.objects.exists())
+
+    def test_self_profile_without_resume(self):
+        response = self.get("/api/dashboard/self_profile/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()["cv"])
+
+    def test_summary_queries_do_not_grow(self):
+        profile = self.user.profile
+        Resume.objects.create(user=self.user, resume_file="resumes/carol.pdf")
+        self.get("/api/dashboard/me/summary")
+        for size in (1, 20):
+            skills = Skill.objects.bulk_create(
+                Skill(name=f"skill {size}-{i}", description="") for i in range(size)
+            )
+            courses = Course.objects.bulk_create(
+                Course(title=f"course {size}-{i}", description="") for i in range(size)
+            )
+            profile.verified_skills.add(*skills)
+            profile.completed_course.add(*courses)
+            with self.assertNumQueries(3):
+                response = self.get("/api/dashboard/me/summary")
+        body = response.json()
+        self.assertEqual(len(body["completed_course"]), 21)
+        self.assertEqual(len(body["verified_skills"]), 21)
+        self.assertIn("resumes/carol.pdf", body["cv"])
+
+    def test_backfill_profiles(self):
+        UserProfile.objects.all().delete()
+        User.objects.bulk_create(
+            [
+                User(username="dave", user_type="seeker"),
+                User(username="erin", user_type="employer"),
+                User(username="frank"),
+            ]
+        )
+        call_command("backfill_profiles", batch_size=1, stdout=StringIO())
+        self.assertCountEqual(
+            UserProfile.objects.values_list("user__username", flat=True),
+            ["carol", "dave"],
+        )
+        self.assertCountEqual(
+            EmployerProfile.objects.values_list("user__username", flat=True),
+            ["erin"],
+        )
+
+
+class PublicProfileTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.skill = Skill.objects.create(name="python", description="")
+        self.course = Course.objects.create(title="intro", description="")
+        self.course.skills.add(self.skill)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = User.objects.create(
+                username="gina", first_name="Gina", user_type="seeker"
+            )
+
+    def get_profile(self, username="gina"):
+        return self.client.get(f"/api/dashboard/{username}")
+
+    def test_follows_user_and_profile_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            complete_courses([(self.user.pk, self.course.pk)])
+            self.user.first_name = "Regina"
+            self.user.save()
+        body = self.get_profile().json()
+        self.assertEqual(body["first_name"], "Regina")
+        self.assertEqual(body["completed_course"], [self.course.pk])
+        self.assertEqual(body["verified_skills"], [self.skill.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.skill.delete()
+        self.assertEqual(self.get_profile().json()["verified_skills"], [])
+
+    def test_renamed_user(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.username = "regina"
+            self.user.save()
+        self.assertEqual(self.get_profile().status_code, 404)
+        self.assertEqual(self.get_profile("regina").status_code, 200)
+
+    def test_unknown_usernames_are_cached(self):
+        self.assertEqual(self.get_profile("hank").status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_profile("hank").status_code, 404)
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create(username="hank", user_type="seeker")
+        self.assertEqual(self.get_profile("hank").status_code, 200)
+
+    def test_employer_profile(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.create(username="ivy", user_type="employer")
+            user.employer_profile.company = "Acme"
+            user.employer_profile.save()
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/employer/profile/ivy")
+        self.assertEqual(response.json()["company"], "Acme")
+        self.assertEqual(self.get_profile("ivy").status_code, 404)
+
+
+class AdminTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username="root", password="secret-pass-123"
+        )
+        self.client.force_login(self.admin)
+        self.skill = Skill.objects.create(name="python", description="")
+        self.course = Course.objects.create(title="Python", description="")
+        self.course.skills.add(self.skill)
+
+    def add_profiles(self, size):
+        for i in range(UserProfile.objects.count(), size):
+            with self.captureOnCommitCallbacks(execute=True):
+                user = User.objects.create(username=f"user{i}", user_type="seeker")
+                user.profile.completed_course.add(self.course)
+
+    def test_changelists_run_constant_queries(self):
+        for path in (
+            "/admin/authentication/user/",
+            "/admin/authentication/userprofile/",
+            "/admin/authentication/resume/",
+            "/admin/authentication/authtoken/",
+        ):
+            assert_constant_queries(
+                lambda: self.assertEqual(self.client.get(path).status_code, 200),
+                self.add_profiles,
+            )
+
+    def test_large_tables_use_the_estimated_count(self):
+        self.add_profiles(5)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        with override_settings(ADMIN_COUNT_LIMIT=2):
+            response = self.client.get("/admin/authentication/user/")
+            self.assertContains(response, "6 users")
+            # Filtered lists stop counting past the limit.
+            response = self.client.get("/admin/authentication/user/?q=user")
+            self.assertContains(response, "3 users")
+        response = self.client.get("/admin/authentication/user/?q=user1")
+        self.assertContains(response, "1 user")
+
+    def test_bulk_verify_completed_skills(self):
+        self.add_profiles(3)
+        profiles = UserProfile.objects.order_by("id")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/admin/authentication/userprofile/",
+                {
+                    "action": "verify_completed_skills",
+                    "_selected_action": [profile.pk for profile in profiles[:2]],
+                },
+            )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            [profile.verified_skills.count() for profile in profiles], [1, 1, 0]
+        )
+
+
+# Resumes go to a moto bucket instead of the configured S3 endpoint.
+moto_storage = override_settings(
+    AWS_S3_ENDPOINT_URL=None,
+    STORAGES={
+        **settings.STORAGES,
+        "default": {
+            "BACKEND": "storages.backends.s3boto3.S3Boto3Storage",
+            "OPTIONS": {"bucket_name": "resumes", "region_name": "us-east-1"},
+        },
+    },
+)
+
+
+@mock_aws
+@moto_storage
+class DirectUploadTests(TestCase):
+    def setUp(self):
+        self.s3 = boto3.client("s3", region_name="us-east-1")
+        self.s3.create_bucket(Bucket="resumes")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = User.objects.create(username="erin", user_type="seeker")
+        self.key = AuthToken.objects.create(
+            user=self.user, key=AuthToken.generate_token()
+        ).key
+
+    def post(self, path, body):
+        return self.client.post(
+            path,
+            body,
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {self.key}",
+        )
+
+    def presign(self, filename="cv.pdf", content_type="application/pdf"):
+        return self.post(
+            "/api/profile/cv/upload",
+            {"filename": filename, "content_type": content_type},
+        )
+
+    def test_upload_and_confirm(self):
+        response = self.presign("My CV.pdf")
+        self.assertEqual(response.status_code, 200)
+        upload = response.json()
+        self.assertTrue(upload["key"].startswith(f"resumes/{self.user.id}/"))
+        self.assertTrue(upload["key"].endswith("/My_CV.pdf"))
+        stored = requests.post(
+            upload["url"],
+            data=upload["fields"],
+            files={"file": ("My CV.pdf", b"%PDF-1.4 cv")},
+        )
+        self.assertLess(stored.status_code, 300)
+
+        response = self.post("/api/profile/cv/confirm", {"key": upload["key"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(upload["key"], response.json()["cv"])
+        self.assertEqual(
+            Resume.objects.get(user=self.user).resume_file.name, upload["key"]
+        )
+
+    def test_long_names_fit_the_field(self):
+        max_length = Resume.resume_file.field.max_length
+        for filename, end in (
+            ("c" * 300 + ".pdf", "cc.pdf"),
+            # Oversized extensions are dropped.
+            ("cv." + "x" * 300, "/cv"),
+            ("." + "x" * 300, "xx"),
+        ):
+            with self.subTest(filename=filename[:12]):
+                key = self.presign(filename).json()["key"]
+                self.assertLessEqual(len(key), max_length)
+                self.assertTrue(key.endswith(end), key)
+
+    def test_refuses_other_types_and_keys(self):
+        self.assertEqual(self.presign(content_type="text/html").status_code, 400)
+
+        other = f"resumes/{self.user.id + 1}/x/cv.pdf"
+        self.s3.put_object(
+            Bucket="resumes", Key=other, Body=b"cv", ContentType="application/pdf"
+        )
+        response = self.post("/api/profile/cv/confirm", {"key": other})
+        self.assertEqual(response.status_code, 400)
+        missing = f"resumes/{self.user.id}/x/missing.pdf"
+        response = self.post("/api/profile/cv/confirm", {"key": missing})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Resume.objects.exists())
+
+    @override_settings(RESUME_MAX_SIZE=4)
+    def test_checks_the_stored_object(self):
+        for body, content_type in (
+            (b"cv", "text/html"),
+            (b"large cv", "application/pdf"),
+        ):
+            key = f"resumes/{self.user.id}/x/cv.pdf"
+            self.s3.put_object(
+                Bucket="resumes", Key=key, Body=body, ContentType=content_type
+            )
+            response = self.post("/api/profile/cv/confirm", {"key": key})
+            self.assertEqual(response.status_code, 400)
+            # Refused uploads are deleted.
+            self.assertEqual(self.s3.list_objects_v2(Bucket="resumes")["KeyCount"], 0)
+        self.assertFalse(Resume.objects.exists())
+
+
+@mock_aws
+@moto_storage
+class ResumeStorageTests(TestCase):
+    def setUp(self):
+        self.s3 = boto3.client("s3", region_name="us-east-1")
+        self.s3.create_bucket(Bucket="resumes")
+        self.keys = {}
+        for username in ("fred", "gina"):
+            with self.captureOnCommitCallbacks(execute=True):
+                user = User.objects.create(username=username, user_type="seeker")
+            self.keys[username] = AuthToken.objects.create(
+                user=user, key=AuthToken.generate_token()
+            ).key
+
+    def upload(self, username, content):
+        response = self.client.post(
+            "/api/profile/cv",
+            {"file": SimpleUploadedFile("CV.PDF", content)},
+            HTTP_AUTHORIZATION=f"Bearer {self.keys[username]}",
+        )
+        self.assertEqual(response.status_code, 200)
+        return Resume.objects.get(user__username=username).resume_file.name
+
+    def stored(self):
+        pages = self.s3.get_paginator("list_objects_v2").paginate(Bucket="resumes")
+        return sorted(obj["Key"] for page in pages for obj in page.get("Contents", []))
+
+    def test_identical_uploads_are_stored_once(self):
+        # The hash comes from the upload handler, the file is not read again.
+        with mock.patch.object(uploads, "digest_of", side_effect=AssertionError):
+            first = self.upload("fred", b"%PDF-1.4 same")
+        self.assertEqual(
+            first, f"resumes/sha256/{hashlib.sha256(b'%PDF-1.4 same').hexdigest()}.pdf"
+        )
+        with mock.patch.object(
+            Resume.resume_file.field.storage, "save", side_effect=AssertionError
+        ):
+            self.assertEqual(self.upload("gina", b"%PDF-1.4 same"), first)
+            self.assertEqual(self.upload("fred", b"%PDF-1.4 same"), first)
+        self.assertEqual(self.stored(), [first])
+
+    def test_resumes_point_at_the_saved_name(self):
+        renamed = "resumes/sha256/renamed.pdf"
+        with mock.patch.object(
+            Resume.resume_file.field.storage,
+            "get_available_name",
+            return_value=renamed,
+        ):
+            self.assertEqual(self.upload("fred", b"%PDF-1.4 renamed"), renamed)
+        self.assertEqual(self.stored(), [renamed])
+
+    def test_gc_deletes_unreferenced_objects(self):
+        self.upload("fred", b"%PDF-1.4 old")
+        kept = [self.upload("gina", b"%PDF-1.4 old"), self.upload("fred", b"new")]
+        for i in range(3):
+            self.s3.put_object(Bucket="resumes", Key=f"resumes/1/{i}/cv.pdf", Body=b"x")
+        self.s3.put_object(Bucket="resumes", Key="other/file", Body=b"x")
+
+        out = StringIO()
+        call_command("gc_resumes", stdout=out)
+        self.assertIn("Deleted 0 of 5 objects", out.getvalue())
+        call_command("gc_resumes", min_age=0, dry_run=True, stdout=out)
+        self.assertEqual(len(self.stored()), 6)
+        call_command("gc_resumes", min_age=0, page_size=2, stdout=out)
+        self.assertIn("Deleted 3 of 5 objects", out.getvalue())
+        self.assertEqual(self.stored(), sorted(kept + ["other/file"]))
+
+    def test_reused_objects_are_not_collected(self):
+        orphan = self.upload("fred", b"%PDF-1.4 old")
+        self.upload("fred", b"%PDF-1.4 new")
+        bucket = s3_backends[DEFAULT_ACCOUNT_ID]["global"].buckets["resumes"]
+        bucket.keys[orphan].last_modified -= timedelta(days=2)
+        content_type = self.s3.head_object(Bucket="resumes", Key=orphan)["ContentType"]
+        self.assertEqual(uploads.collect_garbage(dry_run=True), (2, 1))
+
+        # Gina uploads the same content and GC runs before her Resume is written.
+        self.assertEqual(
+            uploads.store(SimpleUploadedFile("cv.pdf", b"%PDF-1.4 old")), orphan
+        )
+        self.assertEqual(uploads.collect_garbage(), (2, 0))
+        head = self.s3.head_object(Bucket="resumes", Key=orphan)
+        self.assertEqual(head["ContentType"], content_type)
+
+
+@moto_storage
+class ResumeUrlTests(TestCase):
+    def setUp(self):
+        resume_urls.reset()
+        self.sign = mock.patch.object(
+            resume_urls.client(),
+            "generate_presigned_url",
+            wraps=resume_urls.client().generate_presigned_url,
+        ).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_urls_are_signed_once_per_name(self):
+        first = resume_urls.url("resumes/sha256/a.pdf")
+        self.assertIn("resumes/sha256/a.pdf", first)
+        self.assertIn("Signature", first)
+        self.assertEqual(resume_urls.url("resumes/sha256/a.pdf"), first)
+        found = resume_urls.urls(
+            ["resumes/sha256/a.pdf", "resumes/sha256/b.pdf", None, ""]
+        )
+        self.assertEqual(found["resumes/sha256/a.pdf"], first)
+        self.assertEqual(len(found), 2)
+        self.assertEqual(self.sign.call_count, 2)
+        self.assertIsNone(resume_urls.url(None))
+
+    def test_urls_are_signed_again_before_they_expire(self):
+        expire = Resume.resume_file.field.storage.querystring_expire
+        with override_settings(RESUME_URL_REFRESH_MARGIN=expire):
+            self.sign = mock.patch.object(
+                resume_urls.client(),
+                "generate_presigned_url",
+                wraps=resume_urls.client().generate_presigned_url,
+            ).start()
+            resume_urls.url("resumes/sha256/a.pdf")
+            resume_urls.url("resumes/sha256/a.pdf")
+        self.assertEqual(self.sign.call_count, 2)
+
+    def test_one_client_per_process(self):
+        clients = []
+        threads = [
+            threading.Thread(target=lambda: clients.append(resume_urls.client()))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(client) for client in clients}), 1)
+
+
+def make_pdf(*lines):
+    """
+    Return a one-page PDF showing `lines` in Helvetica.
+    """
+    text = " T* ".join(f"({line}) Tj" for line in lines)
+    stream = f"BT /F1 12 Tf 14 TL 72 720 Td {text} ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\n" % (len(objects) + 1)
+    return pdf + b"startxref\n%d\n%%%%EOF\n" % xref
+
+
+def make_docx(*paragraphs):
+    """
+    Return a DOCX holding `paragraphs`, each split into two runs.
+    """
+    body = "".join(
+        f"<w:p><w:r><w:t>{text[:3]}</w:t></w:r><w:r><w:t>{text[3:]}</w:t></w:r></w:p>"
+        for text in paragraphs
+    )
+    document = (
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/'
+        f'wordprocessingml/2006/main"><w:body>{body}</w:body></w:document>'
+    )
+    file = io.BytesIO()
+    with zipfile.ZipFile(file, "w") as archive:
+        archive.writestr("word/document.xml", document)
+    return file.getvalue()
+
+
+@mock_aws
+@moto_storage
+class ResumeParsingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        resume_urls.reset()
+        skill_matcher.reset()
+        self.s3 = boto3.client("s3", region_name="us-east-1")
+        self.s3.create_bucket(Bucket="resumes")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.skills = {
+                name: Skill.objects.create(name=name, description="").id
+                for name in ("Python", "Machine Learning", "SQL", "C++")
+            }
+            self.users = [
+                User.objects.create(username=f"resume{i}", user_type="seeker")
+                for i in range(3)
+            ]
+        self.key = AuthToken.objects.create(
+            user=self.users[0], key=AuthToken.generate_token()
+        ).key
+
+    def resume(self, user, content, name):
+        self.s3.put_object(Bucket="resumes", Key=name, Body=content)
+        return Resume.objects.create(user=user, resume_file=name)
+
+    def inferred(self, resume):
+        return {
+            skill_id: (mentions, confidence)
+            for skill_id, mentions, confidence in ResumeSkill.objects.filter(
+                resume=resume
+            ).values_list("skill_id", "mentions", "confidence")
+        }
+
+    def test_new_resumes_are_parsed_by_a_task(self):
+        pdf = make_pdf("Python and machine", "learning, SQL. More Python.")
+        resume = self.resume(self.users[0], pdf, "resumes/a.pdf")
+        # Saving again without a new file enqueues nothing more.
+        Resume.objects.get(pk=resume.pk).save()
+        self.assertEqual(
+            list(Task.objects.values_list("name", "args")),
+            [(resume_parsing.parse_resume.task_name, [resume.pk, "resumes/a.pdf"])],
+        )
+        self.assertEqual(run_due_tasks(), {"done": 1})
+        Resume.objects.get(pk=resume.pk).save()
+        self.assertFalse(Task.objects.exists())
+
+        skills = self.skills
+        self.assertEqual(
+            self.inferred(resume),
+            {
+                skills["Python"]: (2, 0.75),
+                skills["Machine Learning"]: (1, 0.8),
+                skills["SQL"]: (1, 0.5),
+            },
+        )
+        response = self.client.get(
+            "/api/profile/cv/skills", HTTP_AUTHORIZATION=f"Bearer {self.key}"
+        )
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertFalse(body["pending"])
+        self.assertEqual(
+            [skill["name"] for skill in body["skills"]],
+            ["Machine Learning", "Python", "SQL"],
+        )
+
+    def test_docx_and_unreadable_files(self):
+        docx = make_docx("Shipped C++ and SQL", "Python")
+        self.s3.put_object(Bucket="resumes", Key="resumes/cv.docx", Body=docx)
+        automaton = skill_matcher.ensure_fresh()
+        self.assertEqual(
+            resume_parsing.inspect("resumes/cv.docx", automaton),
+            (
+                {self.skills[name]: 1 for name in ("C++", "SQL", "Python")},
+                "",
+            ),
+        )
+        resume = self.resume(self.users[1], b"plain text", "resumes/cv.txt")
+        resume_parsing.parse_resume(resume.pk, "resumes/cv.txt")
+        resume.refresh_from_db()
+        self.assertEqual(resume.parse_error, "Unsupported file format")
+        self.assertEqual(resume.parsed_file, "resumes/cv.txt")
+
+        resume = self.resume(self.users[2], b"%PDF-1.4 broken", "resumes/bad.pdf")
+        # pypdf warns about the damaged file before giving up.
+        with self.assertLogs("pypdf", "WARNING"):
+            resume_parsing.parse_resume(resume.pk, "resumes/bad.pdf")
+        resume.refresh_from_db()
+        self.assertEqual(resume.parse_error, "Could not read the file")
+
+    def test_replaced_files_are_not_overwritten(self):
+        resume = self.resume(self.users[0], make_pdf("Python"), "resumes/old.pdf")
+        mentions, _ = resume_parsing.inspect(
+            "resumes/old.pdf", skill_matcher.ensure_fresh()
+        )
+        Resume.objects.filter(pk=resume.pk).update(resume_file="resumes/new.pdf")
+        self.assertFalse(resume_parsing.save(resume.pk, "resumes/old.pdf", mentions))
+        self.assertEqual(self.inferred(resume), {})
+
+    def test_batch_parses_over_a_process_pool(self):
+        parsed = self.resume(self.users[0], make_pdf("SQL"), "resumes/0.pdf")
+        resume_parsing.parse_resume(parsed.pk, "resumes/0.pdf")
+        self.resume(self.users[1], make_pdf("Python, SQL"), "resumes/1.pdf")
+        Resume.objects.create(user=self.users[2], resume_file="resumes/missing.pdf")
+
+        out = StringIO()
+        call_command("parse_resumes", processes=2, batch_size=2, stdout=out)
+        self.assertIn("Parsed 2 resumes, 1 could not be read", out.getvalue())
+        self.assertEqual(
+            set(self.inferred(Resume.objects.get(user=self.users[1]))),
+            {self.skills["Python"], self.skills["SQL"]},
+        )
+        call_command("parse_resumes", processes=1, stdout=out)
+        self.assertIn("Parsed 0 resumes", out.getvalue())
+        call_command("parse_resumes", processes=1, everything=True, stdout=out)
+        self.assertIn("Parsed 3 resumes, 1 could not be read", out.getvalue())
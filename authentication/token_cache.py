@@ -0,0 +1,143 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from config.metrics import AUTH_CACHE
+
+
+class LocalTokenCache:
+    """
+    Bounded, thread-safe LRU cache with a per-entry TTL.
+
+    Entries live in the memory of a single worker process, so the TTL is the
+    upper bound on how long a rotated token keeps working on other workers.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_cache = LocalTokenCache(
+    maxsize=settings.AUTH_TOKEN_LOCAL_CACHE_SIZE,
+    ttl=settings.AUTH_TOKEN_LOCAL_CACHE_TTL,
+)
+
+
+def _shared_cache():
+    alias = settings.AUTH_TOKEN_CACHE_ALIAS
+    return caches[alias] if alias else None
+
+
+def _cache_key(token):
+    # Never use the raw token as a cache key, it would leak into cache dumps.
+    return "authentication:token:" + hashlib.sha256(token.encode()).hexdigest()
+
+
+def get_user(token):
+    """
+    Return the cached user for `token`, or None on a miss.
+
+    A fresh copy is returned every time so per-request attributes and related
+    object caches never leak between requests.
+    """
+    key = _cache_key(token)
+    user = local_cache.get(key)
+    if user is not None:
+        AUTH_CACHE.labels("local_hit").inc()
+        return copy.copy(user)
+
+    shared = _shared_cache()
+    user = shared.get(key) if shared is not None else None
+    if user is None:
+        AUTH_CACHE.labels("miss").inc()
+        return None
+    AUTH_CACHE.labels("shared_hit").inc()
+    local_cache.set(key, user)
+    return copy.copy(user)
+
+
+def set_user(token, user):
+    key = _cache_key(token)
+    user = copy.copy(user)
+    local_cache.set(key, user)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.set(key, user, settings.AUTH_TOKEN_CACHE_TTL)
+
+
+def invalidate(*tokens):
+    """
+    Drop `tokens` from this worker's LRU and from the shared cache.
+
+    Other workers stop accepting the tokens once their local entries expire,
+    i.e. within AUTH_TOKEN_LOCAL_CACHE_TTL seconds.
+    """
+    keys = [_cache_key(token) for token in tokens if token]
+    for key in keys:
+        local_cache.delete(key)
+    shared = _shared_cache()
+    if shared is not None and keys:
+        shared.delete_many(keys)
+
+
+def _state_key(user_id):
+    return f"authentication:token_state:{user_id}"
+
+
+def get_user_state(user_id):
+    """
+    Return the cached signed-token state of a user, `False` when it is unknown.
+
+    The state is `None` for inactive or deleted users.
+    """
+    shared = _shared_cache()
+    if shared is None:
+        return False
+    return shared.get(_state_key(user_id), False)
+
+
+def set_user_state(user_id, state):
+    shared = _shared_cache()
+    if shared is not None:
+        shared.set(_state_key(user_id), state, settings.AUTH_TOKEN_CACHE_TTL)
+
+
+def invalidate_user_state(user_id):
+    shared = _shared_cache()
+    if shared is not None:
+        shared.delete(_state_key(user_id))
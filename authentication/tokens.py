@@ -0,0 +1,108 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.db.models import F
+from django.utils.functional import SimpleLazyObject, empty
+
+from . import token_cache
+from .models import AuthToken, User
+
+SIGNED_TOKEN_SALT = "authentication.tokens.signed"
+
+
+class TokenUser(SimpleLazyObject):
+    """
+    User behind a signed token.
+
+    `id`, `pk` and `user_type` are answered from the token, anything else loads
+    the user row on first access.
+    """
+
+    def __init__(self, user_id, user_type):
+        super().__init__(lambda: User.objects.get(pk=user_id))
+        self.__dict__.update(id=user_id, pk=user_id, user_type=user_type)
+
+    def __bool__(self):
+        # Auth backends truth-test the result, which must not hit the database.
+        return True
+
+    async def aload(self):
+        """
+        Load the user off the event loop and return the real instance.
+        """
+        if self._wrapped is empty:
+            await sync_to_async(self._setup)()
+        return self._wrapped
+
+
+def is_signed_token(token):
+    # Opaque keys are plain hex, signed tokens always contain separators.
+    return ":" in token
+
+
+def get_token_state(user_id):
+    """
+    Return `{"v": token_version, "t": user_type}` for an active user, else None.
+    """
+    state = token_cache.get_user_state(user_id)
+    if state is False:
+        row = (
+            User.objects.filter(pk=user_id, is_active=True)
+            .values_list("token_version", "user_type")
+            .first()
+        )
+        state = {"v": row[0], "t": row[1]} if row else None
+        token_cache.set_user_state(user_id, state)
+    return state
+
+
+def sign_token(user):
+    payload = {"u": user.pk, "t": user.user_type, "v": user.token_version}
+    return signing.dumps(payload, salt=SIGNED_TOKEN_SALT, compress=True)
+
+
+def verify_signed_token(token):
+    """
+    Return the TokenUser for a valid signed token, or None.
+
+    Only the cached per-user state is consulted, so a warm check needs no
+    database access.
+    """
+    try:
+        payload = signing.loads(
+            token,
+            salt=SIGNED_TOKEN_SALT,
+            max_age=settings.AUTH_SIGNED_TOKEN_MAX_AGE,
+        )
+    except signing.BadSignature:
+        return None
+    state = get_token_state(payload["u"])
+    if state is None or state["v"] != payload["v"]:
+        return None
+    # user_type may have changed since the token was issued.
+    return TokenUser(payload["u"], state["t"])
+
+
+def revoke_signed_tokens(user):
+    """
+    Invalidate every signed token issued to `user` so far.
+    """
+    User.objects.filter(pk=user.pk).update(token_version=F("token_version") + 1)
+    user.refresh_from_db(fields=["token_version"])
+    token_cache.invalidate_user_state(user.pk)
+
+
+def issue_token(user):
+    """
+    Issue a fresh token for `user`, revoking the previous one.
+
+    Tokens are signed when AUTH_TOKEN_MODE is "signed" and opaque AuthToken
+    keys otherwise.
+    """
+    if settings.AUTH_TOKEN_MODE == "signed":
+        revoke_signed_tokens(user)
+        return sign_token(user)
+
+    token, _ = AuthToken.objects.get_or_create(user=user)
+    token.rotate()
+    return token.key
@@ -0,0 +1,235 @@
+"""
+Direct-to-bucket resume uploads.
+
+Instead of streaming the file through a worker, the client asks for a
+presigned POST (`presign`), uploads the file straight to S3 and then
+confirms the key. The POST policy pins the key under `resumes/<user id>/`,
+the content type and the size range, and `check` looks at the stored object
+again with a HEAD request before the user's Resume points at it, so a client
+can neither attach another user's file nor one the policy would have refused.
+
+Files uploaded through the API instead are stored by content: the
+HashingUploadHandler hashes them while Django's multipart parser receives
+them and `store` skips the PUT when an object with that hash exists, so
+storage grows with unique content rather than with uploads. Objects no Resume
+points at any more are deleted by `collect_garbage`, run by
+`manage.py gc_resumes`. As an existing object may be an orphan about to be
+collected, `store` copies it onto itself to reset its age before a Resume
+points at it.
+
+`check`, `store` and `collect_garbage` make S3 requests, async views run
+them in the storage pool. `presign` only signs and runs inline.
+"""
+
+import hashlib
+import os
+import uuid
+from datetime import timedelta
+
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .models import Resume
+from .resume_urls import client, object_key, storage
+
+PREFIX = "resumes/"
+# Extensions longer than this are dropped from storage names.
+MAX_EXTENSION = 10
+# Object headers kept when `touch` copies an object onto itself.
+HEADERS = (
+    "CacheControl",
+    "ContentDisposition",
+    "ContentEncoding",
+    "ContentLanguage",
+    "ContentType",
+)
+
+
+class UploadError(ValueError):
+    pass
+
+
+class HashingUploadHandler(FileUploadHandler):
+    """
+    Record the SHA-256 of every uploaded file in `request.upload_digests`,
+    by field name, as its chunks are received. The file itself is left to
+    the next handlers.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.digest.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if not hasattr(self.request, "upload_digests"):
+            self.request.upload_digests = {}
+        self.request.upload_digests[self.field_name] = self.digest.hexdigest()
+        return None
+
+
+def prefix(user_id):
+    return f"{PREFIX}{user_id}/"
+
+
+def new_name(user_id, filename):
+    """
+    Return a fresh storage name under the user's prefix that keeps the
+    client's file name as far as the field's max_length allows.
+    """
+    directory = f"{prefix(user_id)}{uuid.uuid4().hex}/"
+    room = Resume.resume_file.field.max_length - len(directory)
+    base, extension = os.path.splitext(get_valid_filename(os.path.basename(filename)))
+    if len(extension) > MAX_EXTENSION:
+        extension = ""
+    return directory + (base[: room - len(extension)] + extension or "resume")
+
+
+def presign(user_id, filename, content_type):
+    """
+    Return the URL and form fields of a presigned POST uploading one resume.
+    """
+    if content_type not in settings.RESUME_CONTENT_TYPES:
+        raise UploadError(f"Unsupported content type {content_type!r}")
+    name = new_name(user_id, filename)
+    s3 = storage()
+    post = client().generate_presigned_post(
+        Bucket=s3.bucket_name,
+        Key=object_key(name),
+        Fields={"Content-Type": content_type},
+        Conditions=[
+            {"Content-Type": content_type},
+            ["content-length-range", 1, settings.RESUME_MAX_SIZE],
+        ],
+        ExpiresIn=settings.RESUME_UPLOAD_EXPIRES,
+    )
+    return {"url": post["url"], "fields": post["fields"], "key": name}
+
+
+def check(user_id, name):
+    """
+    Raise UploadError unless `name` is an upload of the user that passes the
+    size and type checks, deleting objects that fail them.
+    """
+    if not name.startswith(prefix(user_id)) or ".." in name.split("/"):
+        raise UploadError("Key outside of your upload prefix")
+    s3 = storage()
+    s3_client = client()
+    key = object_key(name)
+    try:
+        head = s3_client.head_object(Bucket=s3.bucket_name, Key=key)
+    except ClientError as exc:
+        if exc.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+            raise UploadError("Upload not found")
+        raise
+
+    problem = None
+    if not 0 < head["ContentLength"] <= settings.RESUME_MAX_SIZE:
+        problem = f"Resumes must be at most {settings.RESUME_MAX_SIZE} bytes"
+    elif head.get("ContentType") not in settings.RESUME_CONTENT_TYPES:
+        problem = f"Unsupported content type {head.get('ContentType')!r}"
+    if problem:
+        s3_client.delete_object(Bucket=s3.bucket_name, Key=key)
+        raise UploadError(problem)
+
+
+def digest_of(file):
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def content_name(digest, filename):
+    extension = os.path.splitext(filename)[1].lower()
+    if len(extension) > MAX_EXTENSION or not extension[1:].isalnum():
+        extension = ""
+    return f"{PREFIX}sha256/{digest}{extension}"
+
+
+def store(file, digest=None):
+    """
+    Save `file` under its content hash and return the storage name, without
+    uploading it again when the bucket already holds the same content.
+    """
+    name = content_name(digest or digest_of(file), file.name or "")
+    if touch(name):
+        return name
+    # Storages may save under another name, e.g. without AWS_S3_FILE_OVERWRITE.
+    return storage().save(name, file)
+
+
+def touch(name):
+    """
+    Reset the LastModified of the object `name`, so `collect_garbage` does not
+    delete it as an old orphan while a Resume is being pointed at it. Returns
+    False when there is no such object.
+    """
+    s3 = storage()
+    s3_client = client()
+    key = object_key(name)
+    try:
+        head = s3_client.head_object(Bucket=s3.bucket_name, Key=key)
+    except ClientError as exc:
+        if exc.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+    # Copying an object onto itself is only allowed when replacing its
+    # metadata, which is given back unchanged.
+    s3_client.copy_object(
+        Bucket=s3.bucket_name,
+        Key=key,
+        CopySource={"Bucket": s3.bucket_name, "Key": key},
+        MetadataDirective="REPLACE",
+        Metadata=head["Metadata"],
+        **{field: head[field] for field in HEADERS if field in head},
+    )
+    return True
+
+
+def collect_garbage(min_age=timedelta(days=1), page_size=1000, dry_run=False):
+    """
+    Delete the objects under resumes/ that no Resume points at and that are
+    older than `min_age`, which spares uploads whose Resume row is not
+    written yet. The bucket is listed `page_size` keys at a time.
+
+    Returns `(scanned, deleted)` counts.
+    """
+    s3 = storage()
+    s3_client = client()
+    location = object_key("")
+    cutoff = timezone.now() - min_age
+    scanned = deleted = 0
+    pages = s3_client.get_paginator("list_objects_v2").paginate(
+        Bucket=s3.bucket_name,
+        Prefix=object_key(PREFIX),
+        PaginationConfig={"PageSize": page_size},
+    )
+    for page in pages:
+        objects = page.get("Contents", [])
+        scanned += len(objects)
+        candidates = {
+            obj["Key"][len(location) :]: obj["Key"]
+            for obj in objects
+            if obj["LastModified"] < cutoff
+        }
+        referenced = set(
+            Resume.objects.filter(resume_file__in=candidates).values_list(
+                "resume_file", flat=True
+            )
+        )
+        orphans = [key for name, key in candidates.items() if name not in referenced]
+        if orphans and not dry_run:
+            s3_client.delete_objects(
+                Bucket=s3.bucket_name,
+                Delete={"Objects": [{"Key": key} for key in orphans], "Quiet": True},
+            )
+        deleted += len(orphans)
+    return scanned, deleted
@@ -1,14 +1,21 @@
 # api/auth.py
-from typing import Optional
+from datetime import datetime
+from typing import List, Optional
 
-from django.contrib.auth import authenticate
-from django.shortcuts import get_object_or_404
+from asgiref.sync import sync_to_async
+from django.contrib.auth import aauthenticate
+from django.contrib.auth.hashers import make_password
 from ninja import File, ModelSchema, Schema, UploadedFile
 from ninja_extra import api_controller, http_get, http_post
 
-from authentication.auth import SimpleTokenAuth
+from authentication.auth import SimpleTokenAuth, aget_user
+from config.executors import hashing_pool, run_in_pool, storage_pool
+from config.prefetch import for_schema
+from course.models import Course, Skill
 
-from .models import AuthToken, EmployerProfile, Resume, User, UserProfile
+from . import public, resume_urls, uploads
+from .models import EmployerProfile, Resume, ResumeSkill, User, UserProfile
+from .tokens import issue_token
 
 
 class LoginSchema(Schema):
@@ -33,7 +40,14 @@ class SelfUserResponse(ModelSchema):
 
     class Meta:
         model = User
-        exclude = "password", "is_superuser", "is_staff", "groups", "user_permissions"
+        exclude = (
+            "password",
+            "is_superuser",
+            "is_staff",
+            "groups",
+            "user_permissions",
+            "token_version",
+        )
 
 
 class ProfileResponse(ModelSchema):
@@ -63,86 +77,181 @@ class EmployerProfileResponse(ModelSchema):
 @api_controller("/auth", tags=["Authentication"])
 class AuthController:
     @http_post("/login", response={200: TokenResponse, 401: ErrorResponse})
-    def login(self, request, data: LoginSchema):
-        user = authenticate(username=data.username.lower(), password=data.password)
-        if not user:
+    async def login(self, request, data: LoginSchema):
+        # Passwords are checked in hashing_pool, see authentication/backends.py.
+        user = await aauthenticate(
+            request, username=data.username.lower(), password=data.password
+        )
+        if user is None:
             return 401, ErrorResponse(detail="Wrong creds.")
 
-        token, _ = AuthToken.objects.get_or_create(user=user)
-        token.key = AuthToken.generate_token()
-        token.save()
-
-        return 200, {"token": token.key}
+        return 200, {"token": await sync_to_async(issue_token)(user)}
 
     @http_post("/signup", response={201: TokenResponse, 400: ErrorResponse})
-    def signup(self, request, data: SignupSchema):
-        if User.objects.filter(username=data.username).exists():
+    async def signup(self, request, data: SignupSchema):
+        if await User.objects.filter(username=data.username).aexists():
             return 400, {"detail": "Username already exists"}
-        if User.objects.filter(email=data.email).exists():
+        if await User.objects.filter(email=data.email).aexists():
             return 400, {"detail": "Email already exists"}
 
-        user = User.objects.create_user(
-            username=data.username,
-            email=data.email,
+        user = User(
+            username=User.normalize_username(data.username),
+            email=User.objects.normalize_email(data.email),
             first_name=data.first_name,
             last_name=data.last_name,
         )
-        user.set_password(data.password)
-        user.save()
-        token, _ = AuthToken.objects.get_or_create(user=user)
-        token.key = AuthToken.generate_token()
-        token.save()
+        user.password = await run_in_pool(hashing_pool, make_password, data.password)
+        await user.asave()
+        return 201, {"token": await sync_to_async(issue_token)(user)}
+
+
+class DashboardCourse(ModelSchema):
+    class Meta:
+        model = Course
+        fields = ["id", "title"]
+
+
+class DashboardSkill(ModelSchema):
+    class Meta:
+        model = Skill
+        fields = ["id", "name"]
+
+
+class DashboardResponse(Schema):
+    username: str
+    first_name: str
+    last_name: str
+    email: str
+    bio: str
+    completed_course: List[DashboardCourse]
+    verified_skills: List[DashboardSkill]
+    cv: Optional[str] = None
 
-        return 201, {"token": token.key}
+
+USER_FIELDS = ("user__username", "user__first_name", "user__last_name", "user__email")
+
+
+def profiles(schema, *extra):
+    """
+    Profiles with their user, loading only what `schema` serialises.
+    """
+    return for_schema(
+        UserProfile.objects.select_related("user"), schema, *USER_FIELDS, *extra
+    )
+
+
+def with_user_fields(profile):
+    profile.username = profile.user.username
+    profile.first_name = profile.user.first_name
+    profile.last_name = profile.user.last_name
+    profile.email = profile.user.email
+    return profile
 
 
 @api_controller("/dashboard", auth=SimpleTokenAuth(), tags=["Dashboard"])
 class DashboardController:
-    @http_get("self_profile/", response=ProfileResponse)
-    def get_self_profile(self, request):
-        request.user.cv = request.user.resume.resume_file
-        return request.user
+    """
+    Read-only views of profiles. Profiles are created when a user gets their
+    type (see `ensure_profile`), so a missing profile is a 404 here.
+    """
+
+    @http_get("self_profile/", response=SelfUserResponse)
+    async def get_self_profile(self, request):
+        user = await aget_user(request)
+        user.cv = resume_urls.url(
+            await Resume.objects.filter(user_id=user.pk)
+            .values_list("resume_file", flat=True)
+            .afirst()
+        )
+        return user
 
-    @http_get("/me", response=SelfUserResponse)
-    def get_self(self, request):
-        UserProfile.objects.get_or_create(user=request.user)
-        request.user.profile.first_name = request.user.first_name
-        request.user.profile.last_name = request.user.last_name
-        request.user.profile.email = request.user.email
-        return request.user.profile
+    @http_get("/me", response={200: ProfileResponse, 404: ErrorResponse})
+    async def get_self(self, request):
+        profile = (
+            await profiles(ProfileResponse).filter(user_id=request.user.pk).afirst()
+        )
+        if profile is None:
+            return 404, {"detail": "Profile not found"}
+        return 200, with_user_fields(profile)
+
+    @http_get("/me/summary", response={200: DashboardResponse, 404: ErrorResponse})
+    async def get_summary(self, request):
+        """
+        The profile, completed courses, verified skills and resume URL of the
+        authenticated seeker, in three queries.
+        """
+        profile = (
+            await profiles(DashboardResponse, "user__resume__resume_file")
+            .select_related("user__resume")
+            .filter(user_id=request.user.pk)
+            .afirst()
+        )
+        if profile is None:
+            return 404, {"detail": "Profile not found"}
+        resume = getattr(profile.user, "resume", None)
+        profile.cv = resume_urls.url(resume and resume.resume_file.name)
+        return 200, with_user_fields(profile)
 
     @http_get(
         "/{username}", response={200: ProfileResponse, 404: ErrorResponse}, auth=None
     )
-    def get_user_by_username(self, request, username: str):
+    async def get_user_by_username(self, request, username: str):
         """
         Get user profile by username.
         """
-        try:
-            user = User.objects.get(username=username)
-            if user.user_type != "seeker":
-                return 404, {"detail": "User not found"}
-            UserProfile.objects.get_or_create(user=user)
-            user.profile.first_name = user.first_name
-            user.profile.last_name = user.last_name
-            user.profile.email = user.email
-            return user.profile
-        except User.DoesNotExist:
+        row = await public.aget(username, "profile")
+        if row is None or row[0] is None or row[1] != "seeker":
             return 404, {"detail": "User not found"}
+        return 200, row[0]
 
 
 class SetType(Schema):
     user_type: str
 
 
+class UploadRequest(Schema):
+    filename: str
+    content_type: str
+
+
+class PresignedUpload(Schema):
+    url: str
+    fields: dict[str, str]
+    key: str
+
+
+class ConfirmUpload(Schema):
+    key: str
+
+
+class CvResponse(Schema):
+    detail: str
+    cv: str
+
+
+class InferredSkill(Schema):
+    skill: int
+    name: str
+    mentions: int
+    confidence: float
+
+
+class CvSkillsResponse(Schema):
+    # The current file is not parsed yet, skills are from the previous one.
+    pending: bool
+    parsed_at: Optional[datetime]
+    error: str
+    skills: List[InferredSkill]
+
+
 @api_controller("/profile", auth=SimpleTokenAuth(), tags=["Profile"])
 class ProfileController:
     @http_get("/me", response=SelfUserResponse)
-    def me(self, request):
-        return request.user
+    async def me(self, request):
+        return await aget_user(request)
 
     @http_post("/settype", response={200: SelfUserResponse, 400: ErrorResponse})
-    def set_user_type(self, request, data: SetType):
+    async def set_user_type(self, request, data: SetType):
         """
         Set the user type for the authenticated user.
         Choices are 'seeker' and 'employer'."
@@ -150,21 +259,85 @@ class ProfileController:
         if data.user_type not in ["seeker", "employer"]:
             return 400, {"detail": "Invalid user type"}
 
-        user = request.user
-        user.user_type = data.user_type
-        user.save()
+        user = await aget_user(request)
+        await sync_to_async(user.set_user_type)(data.user_type)
         return 200, user
 
     @http_post("/cv")
-    def upload_cv(self, request, file: UploadedFile = File(...)):
-        user = request.user
-        cv_model, _ = Resume.objects.get_or_create(user=user)
-        cv_model.resume_file = file
-        cv_model.save()
+    async def upload_cv(self, request, file: UploadedFile = File(...)):
+        # Stored by content hash off the event loop, identical files are not
+        # uploaded again. Replaced files are left to `manage.py gc_resumes`.
+        digest = getattr(request, "upload_digests", {}).get("file")
+        name = await run_in_pool(storage_pool, uploads.store, file, digest)
+        await Resume.objects.aupdate_or_create(
+            user_id=request.user.pk, defaults={"resume_file": name}
+        )
 
         return 200, {
             "detail": "CV uploaded successfully",
-            "cv": cv_model.resume_file.url,
+            "cv": resume_urls.url(name),
+        }
+
+    @http_post("/cv/upload", response={200: PresignedUpload, 400: ErrorResponse})
+    async def presign_cv(self, request, data: UploadRequest):
+        """
+        Start a direct upload: POST the file to `url` with `fields` as form
+        data, then confirm `key` with /profile/cv/confirm.
+        """
+        try:
+            return 200, uploads.presign(
+                request.user.pk, data.filename, data.content_type
+            )
+        except uploads.UploadError as exc:
+            return 400, {"detail": str(exc)}
+
+    @http_post("/cv/confirm", response={200: CvResponse, 400: ErrorResponse})
+    async def confirm_cv(self, request, data: ConfirmUpload):
+        """
+        Make an uploaded file the user's CV once its size and type are checked.
+        """
+        try:
+            await run_in_pool(storage_pool, uploads.check, request.user.pk, data.key)
+        except uploads.UploadError as exc:
+            return 400, {"detail": str(exc)}
+        await Resume.objects.aupdate_or_create(
+            user_id=request.user.pk, defaults={"resume_file": data.key}
+        )
+        return 200, {
+            "detail": "CV uploaded successfully",
+            "cv": resume_urls.url(data.key),
+        }
+
+    @http_get("/cv/skills", response={200: CvSkillsResponse, 404: ErrorResponse})
+    async def cv_skills(self, request):
+        """
+        Skills found in the user's CV, most confident first.
+        """
+        resume = (
+            await Resume.objects.filter(user_id=request.user.pk)
+            .values("id", "resume_file", "parsed_file", "parsed_at", "parse_error")
+            .afirst()
+        )
+        if resume is None:
+            return 404, {"detail": "No CV uploaded"}
+        skills = ResumeSkill.objects.filter(resume_id=resume["id"]).order_by(
+            "-confidence", "skill_id"
+        )
+        return 200, {
+            "pending": resume["parsed_file"] != resume["resume_file"],
+            "parsed_at": resume["parsed_at"],
+            "error": resume["parse_error"],
+            "skills": [
+                {
+                    "skill": skill_id,
+                    "name": name,
+                    "mentions": mentions,
+                    "confidence": confidence,
+                }
+                async for skill_id, name, mentions, confidence in skills.values_list(
+                    "skill_id", "skill__name", "mentions", "confidence"
+                )
+            ],
         }
 
 
@@ -174,12 +347,11 @@ class EmployerController:
         "/profile/{username}",
         response={200: EmployerProfileResponse, 404: ErrorResponse},
     )
-    def employer_profile(self, request, username: str):
+    async def employer_profile(self, request, username: str):
         """
         Get employer profile
         """
-        profile = get_object_or_404(EmployerProfile, user__username=username)
-        profile.first_name = profile.user.first_name
-        profile.last_name = profile.user.last_name
-        profile.email = profile.user.email
-        return profile
+        row = await public.aget(username, "employer")
+        if row is None or row[0] is None:
+            return 404, {"detail": "Not Found"}
+        return 200, row[0]
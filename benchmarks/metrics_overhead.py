@@ -0,0 +1,65 @@
+"""
+Measure the per-request cost of MetricsMiddleware.
+
+    python -m benchmarks.metrics_overhead --requests 100000
+
+A resolved request is passed through the middleware wrapping a view that
+returns immediately, and the time is compared against calling that view
+directly. Also run it with PROMETHEUS_MULTIPROC_DIR set, which is how
+gunicorn workers write their samples.
+"""
+
+import argparse
+import os
+import time
+
+
+def measure(handler, request, requests):
+    started = time.perf_counter()
+    for _ in range(requests):
+        handler(request)
+    return (time.perf_counter() - started) / requests * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--path", default="/api/course/list")
+    parser.add_argument(
+        "--budget", type=float, default=50, help="Allowed overhead in µs."
+    )
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django
+
+    django.setup()
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+    from django.urls import resolve
+
+    from config.metrics import MetricsMiddleware
+
+    request = RequestFactory().get(args.path)
+    request.resolver_match = resolve(args.path)
+    response = HttpResponse(b"[]", content_type="application/json")
+
+    def view(request):
+        return response
+
+    middleware = MetricsMiddleware(view)
+    # Create the labelled children before timing.
+    measure(middleware, request, 1000)
+    bare = measure(view, request, args.requests)
+    wrapped = measure(middleware, request, args.requests)
+    overhead = wrapped - bare
+
+    print(f"bare view        {bare:8.2f} µs/request")
+    print(f"with middleware  {wrapped:8.2f} µs/request")
+    print(f"overhead         {overhead:8.2f} µs/request (budget {args.budget:g} µs)")
+    if overhead > args.budget:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Measure how fast resume text is matched against skill catalogs of growing
+size.
+
+    python -m benchmarks.skill_matching --sizes 100 1000 10000 100000
+
+The text is drawn from a vocabulary of 5000 words. A fixed set of 200 skills
+is named by those words, every other skill starts with one of them and goes
+on with a word the text does not use, so the automaton is walked as deep as
+in a real catalog while the number of matches stays the same. The automaton
+of course/skill_matcher.py costs at most two transitions per token, so the
+throughput levels off once every word of the text starts some skill name
+instead of falling with the catalog size.
+"""
+
+import argparse
+import os
+import random
+import time
+
+# Skills named in the text, the others are never found.
+FOUND = 200
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--tokens", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django
+
+    django.setup()
+    from course.skill_matcher import compile_skills
+
+    rng = random.Random(args.seed)
+    text_rng = random.Random(args.seed)
+    vocabulary = [f"word{number}" for number in range(5000)]
+    filler = [f"filler{number}" for number in range(500)]
+    tokens = text_rng.choices(vocabulary + filler, k=args.tokens)
+
+    print(f"{'skills':>8} {'states':>9} {'build s':>8} {'tokens/s':>11} {'matches':>8}")
+    for size in args.sizes:
+        skills = [
+            (number, " ".join(rng.choices(vocabulary, k=rng.randint(1, 3))))
+            for number in range(min(size, FOUND))
+        ]
+        skills += [
+            (number, f"{rng.choice(vocabulary)} unused{number}")
+            for number in range(len(skills), size)
+        ]
+        started = time.perf_counter()
+        automaton = compile_skills(skills)
+        built = time.perf_counter() - started
+        started = time.perf_counter()
+        found = automaton.count(tokens)
+        elapsed = time.perf_counter() - started
+        print(
+            f"{size:>8} {len(automaton):>9} {built:>8.2f} "
+            f"{args.tokens / elapsed:>11,.0f} {sum(found.values()):>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
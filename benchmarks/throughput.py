@@ -0,0 +1,92 @@
+"""
+Compare sync (WSGI) and async (ASGI) throughput at the same concurrency.
+
+Start both deployments against the same database, e.g.
+
+    gunicorn config.wsgi:application --bind 127.0.0.1:8001 --workers 4
+    gunicorn config.asgi:application -k uvicorn_worker.UvicornWorker \\
+        --bind 127.0.0.1:8002 --workers 4
+
+and run
+
+    python -m benchmarks.throughput \\
+        --target sync=http://127.0.0.1:8001 --target async=http://127.0.0.1:8002 \\
+        --path /api/course/list --path /api/skills/ --concurrency 64 --requests 2000
+
+Every target gets the same paths, request count and number of concurrent
+clients. Pass --token to hit authenticated endpoints.
+"""
+
+import argparse
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def fetch(url, token):
+    request = urllib.request.Request(url)
+    if token:
+        request.add_header("Authorization", f"Bearer {token}")
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except OSError:
+        status = 0
+    return status, time.perf_counter() - started
+
+
+def run(base_url, path, concurrency, requests, token):
+    url = base_url.rstrip("/") + path
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # Warm up connections, caches and lazy imports on the server.
+        list(pool.map(lambda _: fetch(url, token), range(concurrency)))
+        started = time.perf_counter()
+        results = list(pool.map(lambda _: fetch(url, token), range(requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for _, latency in results)
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "errors": sum(1 for status, _ in results if not 200 <= status < 400),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--target",
+        action="append",
+        required=True,
+        help="name=base_url, may be given several times",
+    )
+    parser.add_argument("--path", action="append", required=True)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--token")
+    args = parser.parse_args()
+
+    print(
+        f"{'target':<10} {'path':<30} {'req/s':>10} {'p50 ms':>9} "
+        f"{'p95 ms':>9} {'errors':>7}"
+    )
+    for path in args.path:
+        for target in args.target:
+            name, _, base_url = target.partition("=")
+            result = run(base_url, path, args.concurrency, args.requests, args.token)
+            print(
+                f"{name:<10} {path:<30} {result['rps']:>10.1f} "
+                f"{result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+                f"{result['errors']:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
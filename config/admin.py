@@ -0,0 +1,70 @@
+"""
+Admin changelists for tables too large to COUNT(*) on every page.
+
+The admin counts the rows of a changelist to paginate it, and by default
+counts the whole table a second time for the "n total" link. Both are full
+scans on Postgres. EstimatedCountPaginator reads the planner's estimate
+(pg_class.reltuples, or sqlite_stat1 after ANALYZE) for unfiltered lists
+and stops counting filtered ones at ADMIN_COUNT_LIMIT rows, so a page costs
+the same whatever the size of the table. Page links past the limit are not
+shown, searching or filtering narrows the list instead.
+"""
+
+from django.conf import settings
+from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, router
+from django.utils.functional import cached_property
+
+
+def estimated_count(model):
+    """
+    Return the estimated number of rows of `model`'s table, None without
+    statistics.
+    """
+    connection = connections[router.db_for_read(model)]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [connection.ops.quote_name(table)],
+            )
+            row = cursor.fetchone()
+            # -1 until the table was vacuumed or analyzed.
+            return row[0] if row and row[0] >= 0 else None
+        if connection.vendor == "sqlite":
+            try:
+                cursor.execute(
+                    "SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table]
+                )
+            except DatabaseError:
+                # No sqlite_stat1 before the first ANALYZE.
+                return None
+            row = cursor.fetchone()
+            return int(row[0].split()[0]) if row else None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        limit = settings.ADMIN_COUNT_LIMIT
+        if not queryset.query.has_filters():
+            estimate = estimated_count(queryset.model)
+            if estimate is not None and estimate > limit:
+                return estimate
+        # Counting a slice stops the scan at the limit.
+        return queryset[: limit + 1].count()
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    ModelAdmin base of tables with millions of rows. Subclasses should set
+    list_select_related and use raw_id_fields or autocomplete_fields for
+    relations, so neither the list nor the form loads a whole table.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -1,13 +1,17 @@
 from ninja_extra import NinjaExtraAPI
 
+from analytics.views import AnalyticsController
 from authentication.views import (
     AuthController,
     DashboardController,
     ProfileController,
     EmployerController,
 )
+from config.batch import BatchController
+from course.api.catalog import CatalogController
 from course.api.user import CourseController
 from course.api.skills import SkillsController
+from jobs.views import JobsController
 
 api = NinjaExtraAPI()
 
@@ -20,4 +24,8 @@ api.register_controllers(
 api.register_controllers(
     CourseController,
     SkillsController,
+    CatalogController,
 )
+api.register_controllers(JobsController)
+api.register_controllers(AnalyticsController)
+api.register_controllers(BatchController)
@@ -0,0 +1,142 @@
+"""
+Several GET API calls in one round trip.
+
+POST /api/batch takes `{"requests": [{"path": "/api/course/list?limit=5"},
+...]}` and answers `{"responses": [{"status": 200, "body": ...}, ...]}` in
+the same order. The bearer token is checked once for the whole batch and
+the sub-requests go straight to their ninja views, skipping the middleware
+stack. They run concurrently, at most BATCH_CONCURRENCY at a time; ORM calls
+still share the thread-sensitive executor, so the gain is in the overlapped
+cache, storage and serialisation work and the saved round trips.
+
+Only GET requests to /api/ routes are accepted, at most BATCH_MAX_REQUESTS
+per batch and never another batch. A sub-request that is refused or fails
+gets its own status code, the others are unaffected.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, List
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse, QueryDict
+from django.urls import Resolver404, resolve
+from ninja import Schema
+from ninja.errors import HttpError
+from ninja_extra import api_controller, http_post
+
+from authentication.auth import SimpleTokenAuth
+
+logger = logging.getLogger("django.request")
+
+PREFIX = "/api/"
+# Headers of the batch that must not leak into its sub-requests.
+DROPPED_META = ("CONTENT_LENGTH", "CONTENT_TYPE", "HTTP_IF_NONE_MATCH")
+
+
+class SubRequest(Schema):
+    path: str
+    method: str = "GET"
+
+
+class BatchRequest(Schema):
+    requests: List[SubRequest]
+
+
+class SubResponse(Schema):
+    status: int
+    body: Any = None
+
+
+class BatchResponse(Schema):
+    responses: List[SubResponse]
+
+
+def sub_request(request, path, query, user):
+    sub = HttpRequest()
+    sub.method = "GET"
+    sub.path = sub.path_info = path
+    sub.META = {
+        key: value for key, value in request.META.items() if key not in DROPPED_META
+    }
+    sub.META.update(REQUEST_METHOD="GET", PATH_INFO=path, QUERY_STRING=query)
+    sub.GET = QueryDict(query)
+    sub.COOKIES = request.COOKIES
+    # Read by SimpleTokenAuth instead of looking the token up again.
+    sub.batch_user = user
+    if user is not None:
+        sub.user = user
+    return sub
+
+
+def error(status, message):
+    return status, json.dumps({"detail": message}).encode()
+
+
+async def run(request, item, user):
+    """
+    Return `(status, JSON body bytes)` of one sub-request.
+    """
+    if item.method.upper() != "GET":
+        return error(405, "Only GET requests can be batched")
+    url = urlsplit(item.path)
+    if not url.path.startswith(PREFIX) or url.path.rstrip("/") == "/api/batch":
+        return error(400, f"Path must start with {PREFIX} and not be a batch")
+    try:
+        match = resolve(url.path)
+    except Resolver404:
+        return error(404, "Not Found")
+
+    sub = sub_request(request, url.path, url.query, user)
+    sub.resolver_match = match
+    view = match.func
+    if not iscoroutinefunction(view):
+        view = sync_to_async(view)
+    try:
+        response = await view(sub, *match.args, **match.kwargs)
+    except Exception:
+        logger.exception("Batched request to %s failed", item.path)
+        return error(500, "Internal Server Error")
+
+    content = getattr(response, "content", b"")
+    if response.get("Content-Type", "").startswith("application/json") and content:
+        return response.status_code, content
+    return response.status_code, json.dumps(content.decode() or None).encode()
+
+
+@api_controller("/batch", tags=["Batch"])
+class BatchController:
+    @http_post("", response=BatchResponse)
+    async def batch(self, request, data: BatchRequest):
+        """
+        Run several GET API calls at once, see config/batch.py.
+        """
+        if len(data.requests) > settings.BATCH_MAX_REQUESTS:
+            raise HttpError(
+                400, f"At most {settings.BATCH_MAX_REQUESTS} requests per batch"
+            )
+        user = None
+        if request.headers.get("Authorization"):
+            user = await sync_to_async(SimpleTokenAuth())(request)
+            if not user:
+                raise HttpError(401, "Unauthorized")
+
+        limit = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+        async def limited(item):
+            async with limit:
+                return await run(request, item, user)
+
+        results = await asyncio.gather(*(limited(item) for item in data.requests))
+        # Sub-responses are already JSON, splice them in instead of parsing
+        # and serialising them again.
+        body = b",".join(
+            b'{"status":%d,"body":%s}' % (status, content)
+            for status, content in results
+        )
+        return HttpResponse(
+            b'{"responses":[' + body + b"]}", content_type="application/json"
+        )
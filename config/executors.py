@@ -0,0 +1,24 @@
+"""
+Bounded thread pools for blocking work done from async views.
+
+Password hashing and boto3 calls would otherwise block the event loop, or
+queue up behind ORM calls in asgiref's single thread-sensitive executor.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+hashing_pool = ThreadPoolExecutor(
+    max_workers=settings.HASHING_THREADS, thread_name_prefix="hashing"
+)
+storage_pool = ThreadPoolExecutor(
+    max_workers=settings.STORAGE_THREADS, thread_name_prefix="storage"
+)
+
+
+async def run_in_pool(pool, func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool, functools.partial(func, *args, **kwargs))
@@ -0,0 +1,172 @@
+"""
+Per-endpoint query count and SQL time instrumentation.
+
+QueryInstrumentationMiddleware records every statement executed while a
+request is handled, adds a `Server-Timing` header and aggregates the numbers
+per route in this process. `query_stats` serves the aggregates to staff.
+"""
+
+import contextvars
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import JsonResponse
+
+_current = contextvars.ContextVar("request_queries", default=None)
+
+
+class RequestQueries:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = None
+        self.slowest_duration = 0.0
+
+    def add(self, sql, duration):
+        self.count += 1
+        self.duration += duration
+        if duration >= self.slowest_duration:
+            self.slowest = sql
+            self.slowest_duration = duration
+
+
+class OperationStats:
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.sql_time = 0.0
+        self.max_sql_time = 0.0
+        self.slowest = None
+        self.slowest_duration = 0.0
+
+    def add(self, queries):
+        self.requests += 1
+        self.queries += queries.count
+        self.max_queries = max(self.max_queries, queries.count)
+        self.sql_time += queries.duration
+        self.max_sql_time = max(self.max_sql_time, queries.duration)
+        if queries.slowest_duration >= self.slowest_duration:
+            self.slowest = queries.slowest
+            self.slowest_duration = queries.slowest_duration
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "avg_queries": self.queries / self.requests,
+            "max_queries": self.max_queries,
+            "avg_sql_ms": self.sql_time / self.requests * 1000,
+            "max_sql_ms": self.max_sql_time * 1000,
+            "slowest_sql": self.slowest,
+            "slowest_sql_ms": self.slowest_duration * 1000,
+        }
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def record_query(execute, sql, params, many, context):
+    queries = _current.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries.add(sql, time.perf_counter() - started)
+
+
+def install(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def install_on_connect(sender, connection, **kwargs):
+    install(connection)
+
+
+def operation_name(request):
+    match = request.resolver_match
+    # Never label by raw path, unmatched URLs would create unbounded series.
+    route = f"/{match.route}" if match else "<unmatched>"
+    return f"{request.method} {route}"
+
+
+def get_stats():
+    with _stats_lock:
+        return {name: stats.as_dict() for name, stats in sorted(_stats.items())}
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+class QueryInstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        # Connections opened before this middleware was loaded.
+        for connection in connections.all(initialized_only=True):
+            install(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        queries = RequestQueries()
+        token = _current.set(queries)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, queries, started)
+
+    async def __acall__(self, request):
+        queries = RequestQueries()
+        token = _current.set(queries)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, queries, started)
+
+    def finish(self, request, response, queries, started):
+        request.queries = queries
+        name = operation_name(request)
+        with _stats_lock:
+            _stats.setdefault(name, OperationStats()).add(queries)
+
+        if settings.SERVER_TIMING:
+            total = (time.perf_counter() - started) * 1000
+            response["Server-Timing"] = ", ".join(
+                [
+                    f'db;dur={queries.duration * 1000:.2f};desc="{queries.count} queries"',
+                    f"db-slowest;dur={queries.slowest_duration * 1000:.2f}",
+                    f"app;dur={total:.2f}",
+                ]
+            )
+        return response
+
+
+def query_stats(request):
+    """
+    Aggregated query statistics per route, for the worker serving the request.
+    """
+    # A 403 rather than the admin's login redirect, this is read by scripts.
+    if not (request.user.is_active and request.user.is_staff):
+        raise PermissionDenied
+    return JsonResponse(get_stats())
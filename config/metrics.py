@@ -0,0 +1,230 @@
+"""
+Prometheus metrics for the API.
+
+When PROMETHEUS_MULTIPROC_DIR is set (see gunicorn.conf.py) every worker
+writes its samples to memory-mapped files in that directory and `/metrics`
+aggregates all of them, otherwise the in-process registry is served. The
+directory must exist when this module is imported, so the variable is only
+set for gunicorn, which creates it, and not for manage.py commands.
+
+`run_tasks` workers record the task latencies and serve them on their own
+port with `serve`, see TASK_METRICS_PORT.
+"""
+
+import hmac
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils import timezone
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    GC_COLLECTOR,
+    PLATFORM_COLLECTOR,
+    PROCESS_COLLECTOR,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+from .instrumentation import operation_name
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling a request.",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Size of response bodies.",
+    ["method", "route"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+RESPONSES = Counter(
+    "http_responses_total",
+    "Responses by status code.",
+    ["method", "route", "status"],
+)
+IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests currently being handled.",
+    multiprocess_mode="livesum",
+)
+DB_QUERIES = Histogram(
+    "db_queries_per_request",
+    "Number of SQL statements run per request.",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250),
+)
+DB_TIME = Histogram(
+    "db_time_per_request_seconds",
+    "Time spent in SQL per request.",
+    ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+DB_CONNECTIONS = Counter(
+    "db_connections_opened_total",
+    "Database connections opened.",
+    ["alias"],
+)
+AUTH_CACHE = Counter(
+    "auth_token_cache_lookups_total",
+    "Token cache lookups by SimpleTokenAuth.",
+    ["result"],
+)
+CATALOG_CACHE = Counter(
+    "catalog_response_cache_total",
+    "Catalog responses by cache result.",
+    ["result"],
+)
+TASK_WAIT = Histogram(
+    "task_queue_wait_seconds",
+    "Time tasks waited between being due and starting.",
+    ["task"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600),
+)
+TASK_DURATION = Histogram(
+    "task_duration_seconds",
+    "Time spent running tasks.",
+    ["task"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300),
+)
+TASK_RUNS = Counter(
+    "task_runs_total",
+    "Task runs by outcome.",
+    ["task", "outcome"],
+)
+
+
+class TaskQueueCollector:
+    """
+    Depth and age of the task queue, read from the database when scraped so
+    every web worker reports the same numbers. Task latencies are recorded
+    by the `run_tasks` workers and served by them, see `serve`.
+    """
+
+    def describe(self):
+        return self.families()
+
+    def families(self):
+        return (
+            GaugeMetricFamily(
+                "task_queue_depth", "Stored tasks by status.", labels=["task", "status"]
+            ),
+            GaugeMetricFamily(
+                "task_queue_oldest_age_seconds",
+                "Time the oldest due task has been waiting.",
+                labels=["task"],
+            ),
+        )
+
+    def collect(self):
+        from tasks.queue import QUEUED, depth
+
+        count, age = self.families()
+        now = timezone.now()
+        for (name, status), (number, oldest) in sorted(depth().items()):
+            count.add_metric([name, status], number)
+            if status == QUEUED:
+                age.add_metric([name], max(0, (now - oldest).total_seconds()))
+        return count, age
+
+
+TASK_QUEUE = TaskQueueCollector()
+REGISTRY.register(TASK_QUEUE)
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    DB_CONNECTIONS.labels(connection.alias).inc()
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            IN_FLIGHT.dec()
+        self.observe(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            IN_FLIGHT.dec()
+        self.observe(request, response, started)
+        return response
+
+    def observe(self, request, response, started):
+        method = request.method
+        route = operation_name(request).partition(" ")[2]
+        REQUEST_LATENCY.labels(method, route).observe(time.perf_counter() - started)
+        RESPONSES.labels(method, route, response.status_code).inc()
+        if not response.streaming:
+            RESPONSE_SIZE.labels(method, route).observe(len(response.content))
+        queries = getattr(request, "queries", None)
+        if queries is not None:
+            DB_QUERIES.labels(method, route).observe(queries.count)
+            DB_TIME.labels(method, route).observe(queries.duration)
+
+
+def serve(port):
+    """
+    Serve the metrics of a `run_tasks` worker on `port` from a background
+    thread and return the server. The queue gauges are left to /metrics.
+    """
+    registry = CollectorRegistry()
+    for collector in (
+        PROCESS_COLLECTOR,
+        PLATFORM_COLLECTOR,
+        GC_COLLECTOR,
+        DB_CONNECTIONS,
+        TASK_WAIT,
+        TASK_DURATION,
+        TASK_RUNS,
+    ):
+        registry.register(collector)
+    server, thread = start_http_server(port, registry=registry)
+    return server
+
+
+def metrics(request):
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        given = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(given.encode(), expected.encode()):
+            return HttpResponse(status=401)
+
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(TASK_QUEUE)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
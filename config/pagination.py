@@ -0,0 +1,93 @@
+"""
+Opaque-cursor keyset pagination shared by the list endpoints.
+
+A cursor encodes the ordering values of the last item on a page, the next
+page continues strictly after it. Unlike OFFSET this never rescans skipped
+rows and pages stay stable while rows are inserted.
+"""
+
+import base64
+import binascii
+import json
+from typing import Generic, List, Optional, TypeVar
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from ninja import Schema
+from ninja.errors import HttpError
+
+T = TypeVar("T")
+
+
+class Page(Schema, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(values):
+    data = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_cursor(cursor, size):
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(data)
+    except (binascii.Error, ValueError):
+        raise HttpError(400, "Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HttpError(400, "Invalid cursor")
+    return values
+
+
+def page_size(limit=None):
+    if not limit or limit < 1:
+        return settings.API_PAGE_SIZE
+    return min(limit, settings.API_MAX_PAGE_SIZE)
+
+
+def keyset_filter(ordering, values):
+    """
+    Build the filter selecting rows that sort after `values`.
+
+    For ordering ("-a", "b") this is `a < va OR (a = va AND b > vb)`.
+    """
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        condition |= Q(**equal, **{f"{name}__{lookup}": value})
+        equal[name] = value
+    return condition
+
+
+def cursor_for(obj, ordering):
+    return encode_cursor([getattr(obj, field.lstrip("-")) for field in ordering])
+
+
+async def paginate(queryset, ordering, cursor=None, limit=None):
+    """
+    Return one page of `queryset` sorted by `ordering`.
+
+    The last field of `ordering` must be unique (usually "id") so every row
+    has a distinct position.
+    """
+    limit = page_size(limit)
+    queryset = queryset.order_by(*ordering)
+    try:
+        if cursor:
+            values = decode_cursor(cursor, len(ordering))
+            queryset = queryset.filter(keyset_filter(ordering, values))
+        items = [obj async for obj in queryset[: limit + 1]]
+    except (TypeError, ValueError, ValidationError):
+        if not cursor:
+            raise
+        # A well-formed cursor can still carry values the fields reject.
+        raise HttpError(400, "Invalid cursor")
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = cursor_for(items[-1], ordering)
+    return {"items": items, "next_cursor": next_cursor}
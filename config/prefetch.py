@@ -0,0 +1,57 @@
+"""
+Derive `only()` and `prefetch_related()` from a response schema.
+
+    Course.objects.for_schema(SingleCourseSchema)
+
+loads the columns the schema serialises and prefetches every relation it
+lists, recursively projected to the nested schema's fields, so serialising
+a page never falls back to a lazy related manager or deferred column.
+"""
+
+import typing
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from ninja import Schema
+
+
+def nested_schema(annotation):
+    """
+    Return the Schema of `list[Schema]`-like annotations, else None.
+    """
+    for arg in typing.get_args(annotation):
+        if isinstance(arg, type) and issubclass(arg, Schema):
+            return arg
+    return None
+
+
+def for_schema(queryset, schema, *extra):
+    """
+    Restrict `queryset` to what `schema` serialises, plus the `extra` fields.
+    """
+    model = queryset.model
+    only = {model._meta.pk.name, *extra}
+    prefetches = []
+    for name, info in schema.model_fields.items():
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Computed in the view, e.g. first_name on ProfileResponse.
+            continue
+
+        if not field.is_relation or field.many_to_one or field.one_to_one:
+            if field.concrete:
+                only.add(name)
+            continue
+
+        related = field.related_model._default_manager.order_by("pk")
+        # Prefetching a reverse foreign key matches rows on the foreign key.
+        link = (field.field.name,) if field.one_to_many else ()
+        nested = nested_schema(info.annotation)
+        if nested is None:
+            # Serialised as a list of primary keys.
+            related = related.only("pk", *link)
+        else:
+            related = for_schema(related, nested, *link)
+        prefetches.append(Prefetch(name, queryset=related))
+    return queryset.only(*only).prefetch_related(*prefetches)
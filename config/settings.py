@@ -48,12 +48,17 @@ INSTALLED_APPS = [
 INSTALLED_APPS += [
     "authentication",
     "course",
+    "jobs",
+    "analytics",
+    "tasks",
     "ninja",
     "ninja_extra",
     "corsheaders",
 ]
 
 MIDDLEWARE = [
+    "config.metrics.MetricsMiddleware",
+    "config.instrumentation.QueryInstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     # Cors
@@ -123,6 +128,14 @@ WSGI_APPLICATION = "config.wsgi.application"
 DATABASES = {"default": env.db(default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}")}
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Use a shared backend (redis/memcached) in production so invalidations reach
+# every worker immediately.
+
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -142,6 +155,157 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Checks passwords in a thread pool when called from async views.
+
+AUTHENTICATION_BACKENDS = ["authentication.backends.ModelBackend"]
+
+
+# Token authentication cache
+# Rotated or deactivated tokens keep working on other workers for at most
+# AUTH_TOKEN_LOCAL_CACHE_TTL seconds (AUTH_TOKEN_CACHE_TTL if CACHES is not shared).
+
+AUTH_TOKEN_CACHE_ALIAS = env("AUTH_TOKEN_CACHE_ALIAS", default="default")
+AUTH_TOKEN_CACHE_TTL = env.int("AUTH_TOKEN_CACHE_TTL", default=60)
+AUTH_TOKEN_LOCAL_CACHE_TTL = env.int("AUTH_TOKEN_LOCAL_CACHE_TTL", default=5)
+AUTH_TOKEN_LOCAL_CACHE_SIZE = env.int("AUTH_TOKEN_LOCAL_CACHE_SIZE", default=10000)
+
+# "opaque" issues AuthToken keys, "signed" issues stateless HMAC-signed tokens.
+# SimpleTokenAuth accepts both, so existing opaque tokens keep working.
+AUTH_TOKEN_MODE = env("AUTH_TOKEN_MODE", default="opaque")
+AUTH_SIGNED_TOKEN_MAX_AGE = env.int(
+    "AUTH_SIGNED_TOKEN_MAX_AGE", default=60 * 60 * 24 * 7
+)
+
+
+# Public profile read model, see authentication/public.py. Unknown usernames
+# are remembered for this many seconds, creating the user forgets them.
+
+PUBLIC_PROFILE_MISS_TIMEOUT = env.int("PUBLIC_PROFILE_MISS_TIMEOUT", default=300)
+
+
+# Thread pools used by async views for blocking work, see config/executors.py
+
+HASHING_THREADS = env.int("HASHING_THREADS", default=4)
+STORAGE_THREADS = env.int("STORAGE_THREADS", default=8)
+
+
+# Keyset pagination of list endpoints, see config/pagination.py
+
+API_PAGE_SIZE = env.int("API_PAGE_SIZE", default=50)
+API_MAX_PAGE_SIZE = env.int("API_MAX_PAGE_SIZE", default=200)
+# Search results carry snippets, a smaller default page keeps them cheap.
+SEARCH_PAGE_SIZE = env.int("SEARCH_PAGE_SIZE", default=20)
+
+
+# Versioned catalog response cache, see course/cache.py. Entries of old catalog
+# versions are never read again and expire after this many seconds.
+
+CATALOG_CACHE_TIMEOUT = env.int("CATALOG_CACHE_TIMEOUT", default=60 * 60)
+
+
+# Largest batch accepted by the course completion endpoints, see course/completion.py
+
+COURSE_COMPLETION_MAX_BATCH = env.int("COURSE_COMPLETION_MAX_BATCH", default=1000)
+
+
+# In-process skill -> profile index, see course/skill_index.py. Workers rebuild
+# it at least this often in case deltas from other workers were missed.
+
+SKILL_INDEX_MAX_AGE = env.int("SKILL_INDEX_MAX_AGE", default=300)
+
+
+# Skill name automaton of resume parsing, see course/skill_matcher.py. It is
+# rebuilt when skills are added or deleted and at least this often for renames.
+
+SKILL_MATCHER_MAX_AGE = env.int("SKILL_MATCHER_MAX_AGE", default=300)
+
+
+# In-process course recommendation matrix, see course/recommendations.py. It
+# is rebuilt on catalog changes and at least this often to refresh skill demand.
+
+RECOMMENDATION_MAX_AGE = env.int("RECOMMENDATION_MAX_AGE", default=300)
+
+
+# Resume uploads and storage, see authentication/uploads.py
+
+RESUME_MAX_SIZE = env.int("RESUME_MAX_SIZE", default=10 * 1024 * 1024)
+RESUME_CONTENT_TYPES = env.list(
+    "RESUME_CONTENT_TYPES",
+    default=[
+        "application/pdf",
+        "application/msword",
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ],
+)
+RESUME_UPLOAD_EXPIRES = env.int("RESUME_UPLOAD_EXPIRES", default=10 * 60)
+# Hashes uploads as they stream in, before the default handlers store them.
+FILE_UPLOAD_HANDLERS = [
+    "authentication.uploads.HashingUploadHandler",
+    "django.core.files.uploadhandler.MemoryFileUploadHandler",
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+# Signed resume URLs are cached per process until this many seconds before
+# they expire, see authentication/resume_urls.py.
+RESUME_URL_CACHE_SIZE = env.int("RESUME_URL_CACHE_SIZE", default=10000)
+RESUME_URL_REFRESH_MARGIN = env.int("RESUME_URL_REFRESH_MARGIN", default=5 * 60)
+
+
+# Skill extraction from resumes, see authentication/resume_parsing.py. Text
+# past the page and character limits is not matched.
+
+RESUME_PARSE_MAX_PAGES = env.int("RESUME_PARSE_MAX_PAGES", default=30)
+RESUME_PARSE_MAX_CHARS = env.int("RESUME_PARSE_MAX_CHARS", default=200_000)
+
+
+# Background tasks stored in the database, see tasks/queue.py, run by
+# `manage.py run_tasks`. Failed tasks are retried after TASK_RETRY_DELAY
+# seconds, doubling up to TASK_RETRY_MAX_DELAY. Tasks running for longer than
+# TASK_TIMEOUT seconds are taken for lost and run again. TASK_QUEUE_EAGER runs
+# them in-process after commit instead.
+
+TASK_QUEUE_EAGER = env.bool("TASK_QUEUE_EAGER", default=False)
+TASK_MAX_ATTEMPTS = env.int("TASK_MAX_ATTEMPTS", default=5)
+TASK_RETRY_DELAY = env.int("TASK_RETRY_DELAY", default=10)
+TASK_RETRY_MAX_DELAY = env.int("TASK_RETRY_MAX_DELAY", default=60 * 60)
+TASK_TIMEOUT = env.int("TASK_TIMEOUT", default=15 * 60)
+TASK_CONCURRENCY = env.int("TASK_CONCURRENCY", default=4)
+TASK_POLL_INTERVAL = env.float("TASK_POLL_INTERVAL", default=1.0)
+# Port the workers serve their task metrics on, see config/metrics.py. It is
+# not protected by METRICS_TOKEN, only expose it to the Prometheus server.
+TASK_METRICS_PORT = env.int("TASK_METRICS_PORT", default=0)
+
+
+# Analytics rollups, see analytics/rollups.py. The task workers check them
+# against exact counts this often, 0 turns the check off.
+
+ANALYTICS_RECONCILE_INTERVAL = env.int("ANALYTICS_RECONCILE_INTERVAL", default=60 * 60)
+
+
+# Batched API calls, see config/batch.py
+
+BATCH_MAX_REQUESTS = env.int("BATCH_MAX_REQUESTS", default=10)
+BATCH_CONCURRENCY = env.int("BATCH_CONCURRENCY", default=4)
+
+
+# Admin changelists of large tables, see config/admin.py. Unfiltered pages use
+# the planner's row estimate above this many rows, filtered ones stop counting.
+
+ADMIN_COUNT_LIMIT = env.int("ADMIN_COUNT_LIMIT", default=10000)
+
+
+# Query instrumentation, see config/instrumentation.py. Adds a Server-Timing
+# header with the SQL time and query count of every response.
+
+SERVER_TIMING = env.bool("SERVER_TIMING", default=True)
+
+
+# Prometheus metrics served on /metrics, see config/metrics.py. Set
+# PROMETHEUS_MULTIPROC_DIR for the gunicorn process only to aggregate across
+# its workers, gunicorn.conf.py creates the directory.
+
+METRICS_TOKEN = env("METRICS_TOKEN", default="")
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -0,0 +1,54 @@
+"""
+Test helpers shared by the app test suites. They raise AssertionError, so
+they work from Django TestCases as well as plain pytest tests.
+"""
+
+from collections import Counter
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+def assert_constant_queries(fetch, populate, sizes=(2, 20), using="default"):
+    """
+    Fail when the number of queries run by `fetch()` grows with result size.
+
+    `populate(size)` is called before each measurement and must make the
+    endpoint return `size` results, e.g. by creating the missing rows. The
+    error message lists the statements that were repeated the most.
+
+        assert_constant_queries(
+            lambda: client.get("/api/course/list?limit=200"),
+            lambda size: make_courses(size),
+        )
+    """
+    # Warm up lazily built caches and indexes so only per-row queries remain.
+    fetch()
+    measured = []
+    for size in sizes:
+        populate(size)
+        with CaptureQueriesContext(connections[using]) as context:
+            fetch()
+        measured.append((size, context.captured_queries))
+
+    counts = {size: len(queries) for size, queries in measured}
+    if len(set(counts.values())) > 1:
+        repeated = Counter(query["sql"] for query in measured[-1][1]).most_common(3)
+        details = "\n".join(f"  {count}x {sql}" for sql, count in repeated)
+        raise AssertionError(
+            f"Query count depends on result size {counts}, "
+            f"most repeated statements:\n{details}"
+        )
+
+
+def run_due_tasks():
+    """
+    Run the due background tasks in the calling thread, including the ones
+    they enqueue, and return how many ended with each outcome.
+    """
+    from tasks.queue import claim, run
+
+    outcomes = Counter()
+    while claimed := claim("tests", 100):
+        outcomes.update(run(task) for task in claimed)
+    return outcomes
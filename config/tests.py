@@ -0,0 +1,209 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY
+from prometheus_client.parser import text_string_to_metric_families
+
+from authentication import token_cache
+from authentication.models import AuthToken, User
+from course.models import Course
+
+from . import instrumentation
+
+SERVER_TIMING = re.compile(
+    r'db;dur=[\d.]+;desc="(\d+) queries", db-slowest;dur=[\d.]+, app;dur=[\d.]+'
+)
+
+
+class QueryInstrumentationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Course.objects.create(title="course", description="")
+        cls.staff = User.objects.create_user(
+            username="staff", password="secret-pass-123", is_staff=True
+        )
+        cls.user = User.objects.create_user(username="user", password="secret-pass-123")
+
+    def setUp(self):
+        # Catalog responses are cached, see course/cache.py.
+        cache.clear()
+        instrumentation.reset_stats()
+
+    def test_server_timing_counts_the_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/api/course/list")
+        match = SERVER_TIMING.fullmatch(response["Server-Timing"])
+        self.assertIsNotNone(match, response["Server-Timing"])
+        self.assertEqual(int(match[1]), len(context.captured_queries))
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_can_be_turned_off(self):
+        response = self.client.get("/api/course/list")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Server-Timing", response)
+        # Stats are still recorded.
+        self.assertEqual(
+            instrumentation.get_stats()["GET /api/course/list"]["requests"], 1
+        )
+
+    async def test_async_requests_are_instrumented(self):
+        response = await self.async_client.get("/api/course/list")
+        match = SERVER_TIMING.fullmatch(response["Server-Timing"])
+        self.assertIsNotNone(match, response["Server-Timing"])
+        self.assertGreater(int(match[1]), 0)
+        stats = instrumentation.get_stats()["GET /api/course/list"]
+        self.assertEqual(stats["requests"], 1)
+        self.assertEqual(stats["max_queries"], int(match[1]))
+
+    def test_query_stats_are_for_staff(self):
+        self.client.get("/api/course/list")
+        self.client.get("/api/course/list")
+        self.assertEqual(self.client.get("/admin/query-stats/").status_code, 403)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get("/admin/query-stats/").status_code, 403)
+
+        self.client.force_login(self.staff)
+        stats = self.client.get("/admin/query-stats/").json()
+        self.assertEqual(stats["GET /api/course/list"]["requests"], 2)
+        self.assertEqual(
+            set(stats["GET /api/course/list"]),
+            {
+                "requests",
+                "avg_queries",
+                "max_queries",
+                "avg_sql_ms",
+                "max_sql_ms",
+                "slowest_sql",
+                "slowest_sql_ms",
+            },
+        )
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Course.objects.create(title="course", description="")
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    @override_settings(METRICS_TOKEN="scrape-secret")
+    def test_token_is_required(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong-secret")
+        self.assertEqual(response.status_code, 401)
+        response = self.client.get(
+            "/metrics", HTTP_AUTHORIZATION="Bearer scrape-secret"
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_exposition(self):
+        self.client.get("/api/course/list")
+        response = self.client.get("/metrics")
+        self.assertEqual(response["Content-Type"], CONTENT_TYPE_LATEST)
+        families = {
+            family.name: family
+            for family in text_string_to_metric_families(response.content.decode())
+        }
+        for name in (
+            "http_request_duration_seconds",
+            "http_response_size_bytes",
+            "http_responses",
+            "http_requests_in_flight",
+            "db_queries_per_request",
+            "db_time_per_request_seconds",
+        ):
+            self.assertIn(name, families)
+        self.assertEqual(families["http_request_duration_seconds"].type, "histogram")
+
+    def test_requests_are_labelled_by_route(self):
+        labels = {"method": "GET", "route": "/api/course/list"}
+        requests = self.sample("http_request_duration_seconds_count", **labels)
+        ok = self.sample("http_responses_total", status="200", **labels)
+        queries = self.sample("db_queries_per_request_count", **labels)
+        self.client.get("/api/course/list")
+        self.client.get("/api/course/list?cursor=not-a-cursor")
+        self.assertEqual(
+            self.sample("http_request_duration_seconds_count", **labels),
+            requests + 2,
+        )
+        self.assertEqual(
+            self.sample("http_responses_total", status="200", **labels), ok + 1
+        )
+        self.assertEqual(
+            self.sample("db_queries_per_request_count", **labels), queries + 2
+        )
+        self.assertEqual(self.sample("http_requests_in_flight"), 0)
+
+    def test_unmatched_urls_share_one_label(self):
+        labels = {"method": "GET", "route": "<unmatched>", "status": "404"}
+        before = self.sample("http_responses_total", **labels)
+        self.client.get("/no/such/page")
+        self.client.get("/another/missing/page")
+        self.assertEqual(self.sample("http_responses_total", **labels), before + 2)
+
+
+@override_settings(BATCH_MAX_REQUESTS=4)
+class BatchTests(TestCase):
+    def setUp(self):
+        token_cache.local_cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = User.objects.create(username="dave", user_type="seeker")
+        self.key = AuthToken.objects.create(
+            user=self.user, key=AuthToken.generate_token()
+        ).key
+        Course.objects.create(title="Python", description="")
+
+    def batch(self, *items, key=None):
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {key}"} if key else {}
+        return self.client.post(
+            "/api/batch",
+            {
+                "requests": [
+                    {"path": item} if isinstance(item, str) else item for item in items
+                ]
+            },
+            content_type="application/json",
+            **headers,
+        )
+
+    def test_results_match_single_calls(self):
+        paths = [
+            "/api/profile/me",
+            "/api/dashboard/me/summary",
+            "/api/course/list?limit=1",
+            "/api/skills/",
+        ]
+        with CaptureQueriesContext(connection) as context:
+            response = self.batch(*paths, key=self.key)
+        self.assertEqual(response.status_code, 200)
+        # The token is looked up once for the whole batch.
+        self.assertEqual(
+            sum("authentication_authtoken" in query["sql"] for query in context), 1
+        )
+        for path, result in zip(paths, response.json()["responses"]):
+            single = self.client.get(path, HTTP_AUTHORIZATION=f"Bearer {self.key}")
+            self.assertEqual(result, {"status": 200, "body": single.json()})
+
+    def test_items_fail_on_their_own(self):
+        response = self.batch(
+            "/api/profile/me",
+            "/api/course/list",
+            {"path": "/api/course/list", "method": "POST"},
+            "/admin/",
+        )
+        self.assertEqual(
+            [result["status"] for result in response.json()["responses"]],
+            [401, 200, 405, 400],
+        )
+        response = self.batch("/api/nothing", "/api/batch", key=self.key)
+        self.assertEqual(
+            [result["status"] for result in response.json()["responses"]], [404, 400]
+        )
+
+    def test_limits(self):
+        self.assertEqual(self.batch(*["/api/skills/"] * 5).status_code, 400)
+        self.assertEqual(self.batch("/api/skills/", key="wrong").status_code, 401)
@@ -19,8 +19,12 @@ from django.contrib import admin
 from django.urls import path
 
 from .api import api
+from .instrumentation import query_stats
+from .metrics import metrics
 
 urlpatterns = [
+    path("admin/query-stats/", query_stats, name="query-stats"),
     path("admin/", admin.site.urls),
     path("api/", api.urls, name="api"),
+    path("metrics", metrics, name="metrics"),
 ]
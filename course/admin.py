@@ -1,6 +1,12 @@
 from django.contrib import admin
 
+from config.admin import LargeTableAdmin
+
 from .models import Course, Lesson, Skill
+from .search import search
+
+# Matches the course search can return to the admin at once.
+ADMIN_SEARCH_LIMIT = 1000
 
 
 class LessonInline(admin.StackedInline):
@@ -10,15 +16,32 @@ class LessonInline(admin.StackedInline):
 
 
 @admin.register(Course)
-class CourseAdmin(admin.ModelAdmin):
+class CourseAdmin(LargeTableAdmin):
     list_display = ("title", "get_skills")
+    # Searched through the full-text index, see get_search_results.
     search_fields = ("title",)
+    autocomplete_fields = ("skills",)
     inlines = [LessonInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related("skills")
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        course_ids = [
+            course_id for _, course_id in search(search_term, limit=ADMIN_SEARCH_LIMIT)
+        ]
+        return queryset.filter(id__in=course_ids), False
+
     def get_skills(self, obj):
         return ", ".join([skill.name for skill in obj.skills.all()])
 
     get_skills.short_description = "Skills"
 
 
-admin.site.register(Skill)
+@admin.register(Skill)
+class SkillAdmin(admin.ModelAdmin):
+    list_display = ("name", "external_id")
+    # The catalog holds a few thousand skills, needed by the autocompletes.
+    search_fields = ("name",)
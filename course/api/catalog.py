@@ -0,0 +1,40 @@
+from asgiref.sync import sync_to_async
+from ninja import File, Schema, UploadedFile
+from ninja.errors import HttpError
+from ninja_extra import api_controller, http_post
+
+from authentication.auth import SimpleTokenAuth, require_admin
+
+from ..importer import CatalogImportError, guess_format, import_catalog, text_stream
+
+
+class ImportErrorSchema(Schema):
+    line: int
+    error: str
+
+
+class ImportSummary(Schema):
+    skills: int
+    courses: int
+    lessons: int
+    course_skills: int
+    error_count: int
+    errors: list[ImportErrorSchema]
+
+
+@api_controller("/catalog", auth=SimpleTokenAuth(), tags=["Catalog"])
+class CatalogController:
+    @http_post("/import", response=ImportSummary)
+    async def import_file(
+        self, request, file: UploadedFile = File(...), format: str = None
+    ):
+        """
+        Import skills, courses, lessons and course-skill links from a JSON
+        lines or CSV upload. Admin only.
+        """
+        require_admin(request)
+        format = format or guess_format(file.name)
+        try:
+            return await sync_to_async(import_catalog)(text_stream(file.file), format)
+        except CatalogImportError as e:
+            raise HttpError(400, str(e))
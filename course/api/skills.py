@@ -1,42 +1,66 @@
 from typing import List
+from asgiref.sync import sync_to_async
+from ninja.errors import HttpError
 from ninja_extra import api_controller, http_get, http_post
+from ..cache import cached_response
 from ..models import Skill
+from ..skill_index import skill_index
 from .user import SkillSchema
 from authentication.views import ProfileResponse
-from authentication.models import UserProfile
-from django.db.models import Count, Q
+from authentication.models import PublicProfile
+from config.pagination import Page, decode_cursor, encode_cursor, page_size, paginate
 
 
 @api_controller("/skills", tags=["Skills"])
 class SkillsController:
-    @http_get("/", response=List[SkillSchema])
-    def get_skills(self, request):
+    @http_get("/", response=Page[SkillSchema])
+    async def get_skills(self, request, cursor: str = None, limit: int = None):
         """
         Get all skills
         """
-        return Skill.objects.all()
+        return await cached_response(
+            request,
+            Page[SkillSchema],
+            lambda: paginate(Skill.objects.all(), ("id",), cursor, limit),
+        )
 
-    @http_post("/filtered_user", response=List[ProfileResponse])
-    def filtered_user(self, request, skills: List[int] = None):
+    @http_post("/filtered_user", response=Page[ProfileResponse])
+    async def filtered_user(
+        self,
+        request,
+        skills: List[int] = None,
+        cursor: str = None,
+        limit: int = None,
+    ):
         """
-        Get all users with filter
+        Get all users with filter, best matching first
         """
-        profiles = UserProfile.objects.prefetch_related("user").all()
+        # Profiles are served from the denormalised PublicProfile documents.
+        profiles = PublicProfile.objects.filter(profile_id__isnull=False).only(
+            "profile_id", "profile"
+        )
         if skills:
-            # Annotate profiles with a count of how many verified skills match
-            profiles = profiles.annotate(
-                verified_skill_match_count=Count(
-                    "verified_skills", filter=Q(verified_skills__id__in=skills)
-                )
+            # Rank with the in-memory index, then load only the page's profiles.
+            # The cursor encodes (match count, id) of the last profile.
+            limit = page_size(limit)
+            after = decode_cursor(cursor, 2) if cursor else None
+            if after and not all(isinstance(value, int) for value in after):
+                raise HttpError(400, "Invalid cursor")
+            ranked = await sync_to_async(skill_index.rank)(skills, after, limit + 1)
+            found = await profiles.ain_bulk(
+                [profile_id for _, profile_id in ranked[:limit]],
+                field_name="profile_id",
             )
+            items = [
+                found[profile_id].profile
+                for _, profile_id in ranked[:limit]
+                if profile_id in found
+            ]
+            next_cursor = None
+            if len(ranked) > limit:
+                next_cursor = encode_cursor(list(ranked[limit - 1]))
+            return {"items": items, "next_cursor": next_cursor}
 
-            # Order profiles by the number of matching verified skills, in descending order
-            profiles = profiles.filter(verified_skill_match_count__gt=0).order_by(
-                "-verified_skill_match_count"
-            )
-        for profile in profiles:
-            profile.verified_skill_match_count = profile.verified_skills.count()
-            profile.first_name = profile.user.first_name
-            profile.last_name = profile.user.last_name
-            profile.email = profile.user.email
-        return profiles
+        page = await paginate(profiles, ("profile_id",), cursor, limit)
+        page["items"] = [row.profile for row in page["items"]]
+        return page
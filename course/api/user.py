@@ -1,13 +1,23 @@
 from typing import List
 
-from django.shortcuts import get_object_or_404
-from ninja import ModelSchema
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404
+from ninja import ModelSchema, Schema
+from ninja.errors import HttpError
 from ninja_extra import api_controller, http_get, http_post
 
-from authentication.auth import SimpleTokenAuth
+from authentication.auth import SimpleTokenAuth, require_admin
+from config.pagination import Page, decode_cursor, encode_cursor, page_size, paginate
 from django.db.models import Count, Q
 
+from authentication.models import PublicProfile
+
+from ..cache import aget_version, cached_response
+from ..completion import CompletionError, complete_courses
 from ..models import Course, Lesson, Skill
+from .. import search
+from ..recommendations import recommender
 from ninja import FilterSchema
 
 
@@ -40,46 +50,179 @@ class SingleCourseSchema(ModelSchema):
         fields = "__all__"
 
 
-@api_controller("/course", tags=["Course"])
-class CourseController:
-    @http_get("/list", response=List[CourseSchema])
-    def list_courses(self, request):
-        courses = Course.objects.all()
+class SearchResult(Schema):
+    course: CourseSchema
+    snippet: str
+    rank: float
+
+
+class Recommendation(Schema):
+    course: CourseSchema
+    score: int
+    gap_skills: list[int]
+
+
+class CompleteCourses(Schema):
+    course_ids: list[int]
+
+
+class Completion(Schema):
+    user_id: int
+    course_id: int
+
+
+class BackfillCompletions(Schema):
+    completions: list[Completion]
+
+
+class CompletionResult(Schema):
+    completed_courses: int
+    verified_skills: int
+
+
+async def complete(pairs):
+    if len(pairs) > settings.COURSE_COMPLETION_MAX_BATCH:
+        raise HttpError(
+            400, f"At most {settings.COURSE_COMPLETION_MAX_BATCH} completions"
+        )
+    try:
+        return await sync_to_async(complete_courses)(pairs)
+    except CompletionError as e:
+        raise HttpError(404, str(e))
 
-        return courses
 
-    @http_post("/filtered", response=List[CourseSchema])
-    def filtered_courses(self, request, skills: List[int] = None):
+@api_controller("/course", tags=["Course"])
+class CourseController:
+    @http_get("/list", response=Page[CourseSchema])
+    async def list_courses(self, request, cursor: str = None, limit: int = None):
+        courses = Course.objects.for_schema(CourseSchema)
+
+        return await cached_response(
+            request,
+            Page[CourseSchema],
+            lambda: paginate(courses, ("id",), cursor, limit),
+        )
+
+    @http_post("/filtered", response=Page[CourseSchema])
+    async def filtered_courses(
+        self,
+        request,
+        skills: List[int] = None,
+        cursor: str = None,
+        limit: int = None,
+    ):
         """
-        Get all courses with filter
+        Get all courses with filter, best matching first
         """
-        courses = Course.objects.all()
+        courses = Course.objects.for_schema(CourseSchema)
+        ordering = ("id",)
         if skills:
             courses = courses.annotate(
                 skill_match_count=Count("skills", filter=Q(skills__id__in=skills))
             )
             # courses = courses.filter(skills__id__in=skills).distinct()
-            courses = courses.filter(skill_match_count__gt=0).order_by(
-                "-skill_match_count"
-            )
-        return courses
+            courses = courses.filter(skill_match_count__gt=0)
+            ordering = ("-skill_match_count", "id")
+        return await paginate(courses, ordering, cursor, limit)
+
+    @http_get("/search", response=Page[SearchResult])
+    async def search_courses(
+        self, request, q: str, cursor: str = None, limit: int = None
+    ):
+        """
+        Search course titles, descriptions, skills and lessons, best match
+        first. Snippets are HTML escaped with matches wrapped in <mark>.
+        """
 
-    @http_get("/{course_id}", response=SingleCourseSchema)
-    def get_course(self, request, course_id: int):
-        try:
-            course = Course.objects.get(id=course_id)
-            return course
-        except Course.DoesNotExist:
-            return None
+        async def build():
+            size = page_size(limit or settings.SEARCH_PAGE_SIZE)
+            after = decode_cursor(cursor, 2) if cursor else None
+            if after and not (
+                isinstance(after[0], (int, float)) and isinstance(after[1], int)
+            ):
+                raise HttpError(400, "Invalid cursor")
+            ranked = await sync_to_async(search.search)(q, after, size + 1)
+            ids = [course_id for _, course_id in ranked[:size]]
+            courses = await Course.objects.for_schema(CourseSchema).ain_bulk(ids)
+            snippets = await sync_to_async(search.snippets)(q, ids)
+            items = [
+                {
+                    "course": courses[course_id],
+                    "snippet": snippets.get(course_id, ""),
+                    "rank": rank,
+                }
+                for rank, course_id in ranked[:size]
+                if course_id in courses
+            ]
+            next_cursor = None
+            if len(ranked) > size:
+                next_cursor = encode_cursor(list(ranked[size - 1]))
+            return {"items": items, "next_cursor": next_cursor}
+
+        return await cached_response(request, Page[SearchResult], build)
+
+    @http_get("/recommended", response=List[Recommendation], auth=SimpleTokenAuth())
+    async def recommended(self, request, limit: int = None):
+        """
+        Courses teaching the most in-demand skills the user has not verified,
+        excluding completed ones. `score` is the summed demand of `gap_skills`,
+        the number of profiles holding each of them.
+        """
+        profile = (
+            await PublicProfile.objects.filter(user_id=request.user.pk)
+            .values_list("profile", flat=True)
+            .afirst()
+        )
+        if profile is None:
+            raise HttpError(404, "Profile not found")
+        ranked = await sync_to_async(recommender.recommend)(
+            await aget_version(),
+            profile["verified_skills"],
+            profile["completed_course"],
+            page_size(limit),
+        )
+        courses = await Course.objects.for_schema(CourseSchema).ain_bulk(
+            [course_id for _, course_id, _ in ranked]
+        )
+        return [
+            {"course": courses[course_id], "score": score, "gap_skills": gap_skills}
+            for score, course_id, gap_skills in ranked
+            if course_id in courses
+        ]
+
+    @http_get("/{int:course_id}", response=SingleCourseSchema)
+    async def get_course(self, request, course_id: int):
+        async def build():
+            try:
+                return await Course.objects.for_schema(SingleCourseSchema).aget(
+                    id=course_id
+                )
+            except Course.DoesNotExist:
+                raise Http404
+
+        return await cached_response(request, SingleCourseSchema, build)
 
     @http_post("/mark_completed", response=CourseSchema, auth=SimpleTokenAuth())
-    def mark_completed(self, request, course_id: int):
+    async def mark_completed(self, request, course_id: int):
+        await complete([(request.user.id, course_id)])
         try:
-            user = request.user
-            course = get_object_or_404(Course, id=course_id)
-            user.profile.completed_course.add(Course)
-            for skill in course.skills.all():
-                user.profile.verified_skills.add(skill)
-            user.profile.save()
+            return await Course.objects.for_schema(CourseSchema).aget(id=course_id)
         except Course.DoesNotExist:
-            return None
+            raise Http404
+
+    @http_post("/complete", response=CompletionResult, auth=SimpleTokenAuth())
+    async def complete_many(self, request, data: CompleteCourses):
+        """
+        Mark many courses as completed by the authenticated user, all or none.
+        """
+        return await complete([(request.user.id, id) for id in data.course_ids])
+
+    @http_post("/complete/backfill", response=CompletionResult, auth=SimpleTokenAuth())
+    async def backfill_completions(self, request, data: BackfillCompletions):
+        """
+        Record course completions of many users in one transaction. Admin only.
+        """
+        require_admin(request)
+        return await complete(
+            [(item.user_id, item.course_id) for item in data.completions]
+        )
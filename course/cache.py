@@ -0,0 +1,107 @@
+"""
+Versioned response cache for the course catalog.
+
+Every change to a Course, Lesson, Skill or course-skill link bumps a catalog
+version stored in Django's cache once the transaction commits. Catalog
+responses are cached as serialised JSON bytes under the version and the
+request path, so all workers share them and a bump retires every entry at
+once; old entries simply expire.
+
+The ETag is derived from the same version and path, so a conditional GET is
+answered with 304 after a single cache lookup, without touching the ORM.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+from config.metrics import CATALOG_CACHE
+
+from .models import Course, Lesson, Skill
+
+VERSION_KEY = "course:catalog:version"
+RESPONSE_KEY = "course:catalog:response:{}:{}"
+
+
+def initial_version():
+    # Start from the clock so a version lost on cache eviction never comes
+    # back with the number of an older catalog.
+    return time.time_ns() // 1000
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, initial_version(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+async def aget_version():
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, initial_version(), None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    """
+    Retire all cached catalog responses once the current transaction commits.
+    """
+
+    def bump():
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            get_version()
+
+    transaction.on_commit(bump)
+
+
+async def cached_response(request, schema, build):
+    """
+    Return the response of `await build()` serialised with `schema`, from the
+    cache when possible. `build` may raise to skip caching, e.g. Http404.
+    """
+    version = await aget_version()
+    path = hashlib.sha256(request.get_full_path().encode()).hexdigest()[:16]
+    etag = f'"{version}-{path}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        CATALOG_CACHE.labels("not_modified").inc()
+        return HttpResponseNotModified(headers=headers)
+
+    key = RESPONSE_KEY.format(version, path)
+    content = await cache.aget(key)
+    if content is None:
+        CATALOG_CACHE.labels("miss").inc()
+        content = schema.model_validate(await build()).model_dump_json().encode()
+        await cache.aset(key, content, settings.CATALOG_CACHE_TIMEOUT)
+    else:
+        CATALOG_CACHE.labels("hit").inc()
+    return HttpResponse(content, content_type="application/json", headers=headers)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Lesson)
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Lesson)
+@receiver(post_delete, sender=Skill)
+def catalog_changed(sender, **kwargs):
+    bump_version()
+
+
+@receiver(m2m_changed, sender=Course.skills.through)
+def course_skills_changed(sender, action, **kwargs):
+    if action.startswith("post_"):
+        bump_version()
@@ -0,0 +1,141 @@
+"""
+Batch course completion.
+
+Completing a course adds it to the profile's `completed_course` and adds the
+course's skills to `verified_skills`. All through rows of a batch are written
+with two bulk inserts in one transaction, so the number of queries does not
+depend on the number of courses, skills or profiles in the batch.
+
+bulk_create does not send m2m_changed, so the pre_add/post_add signals
+`add()` would send are sent by hand, with the rows that were actually new.
+"""
+
+from collections import defaultdict
+
+from django.db import router, transaction
+from django.db.models.signals import m2m_changed
+
+from authentication.models import UserProfile
+
+from .models import Course, Skill
+
+CompletedCourse = UserProfile.completed_course.through
+VerifiedSkill = UserProfile.verified_skills.through
+CourseSkill = Course.skills.through
+
+
+class CompletionError(ValueError):
+    def __init__(self, users=(), courses=()):
+        self.users = sorted(users)
+        self.courses = sorted(courses)
+        parts = []
+        if self.users:
+            parts.append(f"no profile for users {self.users}")
+        if self.courses:
+            parts.append(f"unknown courses {self.courses}")
+        super().__init__(", ".join(parts))
+
+
+def complete_courses(pairs):
+    """
+    Mark every `(user_id, course_id)` pair as completed and verify the
+    courses' skills. Nothing is written if a user has no profile or a course
+    does not exist.
+
+    Returns the number of new completed-course and verified-skill rows.
+    """
+    pairs = {(int(user_id), int(course_id)) for user_id, course_id in pairs}
+    user_ids = {user_id for user_id, _ in pairs}
+    course_ids = {course_id for _, course_id in pairs}
+
+    with transaction.atomic():
+        profiles = dict(
+            UserProfile.objects.filter(user_id__in=user_ids).values_list(
+                "user_id", "id"
+            )
+        )
+        found = set(
+            Course.objects.filter(id__in=course_ids).values_list("id", flat=True)
+        )
+        if len(profiles) != len(user_ids) or len(found) != len(course_ids):
+            raise CompletionError(user_ids - profiles.keys(), course_ids - found)
+
+        course_skills = defaultdict(set)
+        for course_id, skill_id in CourseSkill.objects.filter(
+            course_id__in=course_ids
+        ).values_list("course_id", "skill_id"):
+            course_skills[course_id].add(skill_id)
+
+        completed = defaultdict(set)
+        verified = defaultdict(set)
+        for user_id, course_id in pairs:
+            completed[profiles[user_id]].add(course_id)
+            verified[profiles[user_id]] |= course_skills[course_id]
+
+        new_completed = new_rows(CompletedCourse, "course_id", completed, course_ids)
+        new_verified = new_rows(
+            VerifiedSkill,
+            "skill_id",
+            verified,
+            set().union(*verified.values()),
+        )
+        add(CompletedCourse, Course, "course_id", new_completed)
+        add(VerifiedSkill, Skill, "skill_id", new_verified)
+
+    return {
+        "completed_courses": sum(map(len, new_completed.values())),
+        "verified_skills": sum(map(len, new_verified.values())),
+    }
+
+
+def new_rows(through, field, wanted, ids):
+    """
+    Drop the rows of `wanted` (profile id -> ids) that already exist.
+    """
+    if not ids:
+        return {}
+    existing = set(
+        through.objects.filter(
+            userprofile_id__in=wanted.keys(), **{f"{field}__in": ids}
+        ).values_list("userprofile_id", field)
+    )
+    result = {}
+    for profile_id, targets in wanted.items():
+        targets = {target for target in targets if (profile_id, target) not in existing}
+        if targets:
+            result[profile_id] = targets
+    return result
+
+
+def add(through, model, field, rows):
+    """
+    Insert `rows` (profile id -> ids) like `profile.<m2m>.add()` would.
+    """
+    if not rows:
+        return
+    using = router.db_for_write(through)
+    profiles = {profile_id: UserProfile(id=profile_id) for profile_id in rows}
+    send(through, model, profiles, rows, "pre_add", using)
+    # Ignore rows a concurrent request inserted since they were read.
+    through.objects.using(using).bulk_create(
+        [
+            through(userprofile_id=profile_id, **{field: target})
+            for profile_id, targets in rows.items()
+            for target in targets
+        ],
+        ignore_conflicts=True,
+    )
+    send(through, model, profiles, rows, "post_add", using)
+
+
+def send(through, model, profiles, rows, action, using):
+    for profile_id, targets in rows.items():
+        m2m_changed.send(
+            sender=through,
+            action=action,
+            instance=profiles[profile_id],
+            reverse=False,
+            model=model,
+            pk_set=targets,
+            using=using,
+        )
@@ -0,0 +1,295 @@
+"""
+Streaming catalog import.
+
+The input is UTF-8 JSON lines or CSV with one record per line. Every record
+has a `type` and a stable `id` chosen by the catalog source:
+
+    {"type": "skill", "id": "py", "name": "Python", "description": "..."}
+    {"type": "course", "id": "c1", "title": "Intro", "description": "..."}
+    {"type": "lesson", "id": "c1-1", "course": "c1", "title": "...", "content": "...", "video_url": null}
+    {"type": "course_skill", "course": "c1", "skill": "py"}
+
+CSV files use the same keys as columns, e.g.
+`type,id,name,title,description,content,video_url,course,skill`, leaving
+unused cells empty.
+
+Records are read lazily and imported in chunks of `batch_size`, each in its
+own transaction, so memory use does not depend on the input size. Skills,
+courses and lessons are upserted on `external_id`, course-skill links are
+only ever added. A record may refer to anything defined earlier in the input
+or already in the database. Search documents of the courses the import
+touched are rebuilt once all chunks are in.
+"""
+
+import csv
+import io
+import json
+from collections import Counter
+from itertools import islice
+
+from django.db import transaction
+
+from .cache import bump_version
+from .models import Course, Lesson, Skill
+from .search import index_courses
+
+BATCH_SIZE = 2000
+MAX_ERRORS = 100
+
+CourseSkill = Course.skills.through
+
+FIELDS = {
+    "skill": (Skill, ("name", "description")),
+    "course": (Course, ("title", "description")),
+    "lesson": (Lesson, ("title", "content", "video_url")),
+}
+REQUIRED = {"skill": "name", "course": "title", "lesson": "title"}
+# Keys holding external ids, which JSON lines may give as numbers.
+REFERENCES = ("id", "course", "skill")
+
+
+class CatalogImportError(ValueError):
+    pass
+
+
+def read_records(stream, format):
+    """
+    Return an iterator of `(line_number, record, error)` over a text stream,
+    `record` is None for lines that could not be parsed.
+    """
+    if format == "jsonl":
+        return _read_jsonl(_decoded(stream))
+    if format == "csv":
+        return _read_csv(_decoded(stream))
+    raise CatalogImportError(f"Unknown format {format!r}, use 'jsonl' or 'csv'")
+
+
+def _decoded(stream):
+    """
+    Yield the lines of `stream`, raising CatalogImportError if it is not UTF-8.
+    """
+    line_number = 0
+    try:
+        for line_number, line in enumerate(stream, 1):
+            yield line
+    except UnicodeDecodeError as e:
+        raise CatalogImportError(
+            f"Input is not valid UTF-8 after line {line_number}: {e.reason}"
+        ) from e
+
+
+def _read_jsonl(stream):
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"Invalid JSON: {e}"
+            continue
+        if isinstance(record, dict):
+            yield line_number, record, None
+        else:
+            yield line_number, None, "Expected a JSON object"
+
+
+def _read_csv(stream):
+    reader = csv.DictReader(stream)
+    for record in reader:
+        record = {
+            key: value for key, value in record.items() if value not in ("", None)
+        }
+        yield reader.line_num, record, None
+
+
+def guess_format(name):
+    return "csv" if name.lower().endswith(".csv") else "jsonl"
+
+
+def text_stream(binary):
+    return io.TextIOWrapper(binary, encoding="utf-8-sig", newline="")
+
+
+class CatalogImporter:
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.counts = Counter()
+        self.errors = []
+        self.error_count = 0
+
+    def error(self, line_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"line": line_number, "error": message})
+
+    def run(self, records):
+        records = iter(records)
+        # A course's lessons usually span several chunks, so search documents
+        # are rebuilt once at the end rather than after every chunk.
+        courses = set()
+        try:
+            while chunk := list(islice(records, self.batch_size)):
+                with transaction.atomic():
+                    courses |= self.import_chunk(chunk)
+                    # bulk_create sends no signals.
+                    bump_version()
+        finally:
+            index_courses(courses)
+            bump_version()
+        return self
+
+    def summary(self):
+        return {
+            "skills": self.counts["skill"],
+            "courses": self.counts["course"],
+            "lessons": self.counts["lesson"],
+            "course_skills": self.counts["course_skill"],
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+    def import_chunk(self, chunk):
+        """
+        Import one chunk and return the ids of the courses it changed.
+        """
+        # Later records win, upserting the same row twice in one statement
+        # fails on Postgres.
+        rows = {kind: {} for kind in FIELDS}
+        links = []
+        for line_number, record, error in chunk:
+            if error:
+                self.error(line_number, error)
+                continue
+            kind = record.get("type")
+            if message := check_references(record):
+                self.error(line_number, message)
+            elif kind == "course_skill":
+                if record.get("course") and record.get("skill"):
+                    links.append((line_number, record))
+                else:
+                    self.error(line_number, "course_skill needs course and skill")
+            elif kind not in FIELDS:
+                self.error(line_number, f"Unknown type {kind!r}")
+            elif message := self.validate(kind, record):
+                self.error(line_number, message)
+            else:
+                rows[kind][str(record["id"])] = (line_number, record)
+
+        for kind in ("skill", "course"):
+            self.upsert(
+                kind,
+                [
+                    self.build(kind, external_id, record)
+                    for external_id, (_, record) in rows[kind].items()
+                ],
+            )
+        course_ids = set(resolve(Course, rows["course"]).values())
+        course_ids |= self.upsert_lessons(rows["lesson"])
+        course_ids |= self.add_links(links)
+        if rows["skill"]:
+            # Renamed skills change the text of their courses.
+            course_ids.update(
+                CourseSkill.objects.filter(
+                    skill__external_id__in=rows["skill"]
+                ).values_list("course_id", flat=True)
+            )
+        return course_ids
+
+    def validate(self, kind, record):
+        if not record.get("id"):
+            return f"{kind} needs an id"
+        if not record.get(REQUIRED[kind]):
+            return f"{kind} needs a {REQUIRED[kind]}"
+        model, fields = FIELDS[kind]
+        for name in fields:
+            if not isinstance(record.get(name) or "", str):
+                return f"{name} must be a string"
+            max_length = model._meta.get_field(name).max_length
+            if max_length and len(record.get(name) or "") > max_length:
+                return f"{name} is longer than {max_length} characters"
+        if kind == "lesson" and not record.get("course"):
+            return "lesson needs a course"
+        return None
+
+    def build(self, kind, external_id, record, **extra):
+        model, fields = FIELDS[kind]
+        values = {name: record.get(name) or "" for name in fields}
+        if kind == "lesson":
+            values["video_url"] = record.get("video_url") or None
+        return model(external_id=external_id, **values, **extra)
+
+    def upsert(self, kind, objects):
+        if not objects:
+            return
+        model, fields = FIELDS[kind]
+        model.objects.bulk_create(
+            objects,
+            update_conflicts=True,
+            unique_fields=["external_id"],
+            update_fields=list(fields) + (["course"] if kind == "lesson" else []),
+        )
+        self.counts[kind] += len(objects)
+
+    def upsert_lessons(self, rows):
+        if not rows:
+            return set()
+        course_ids = resolve(Course, {record["course"] for _, record in rows.values()})
+        objects = []
+        for external_id, (line_number, record) in rows.items():
+            course_id = course_ids.get(str(record["course"]))
+            if course_id is None:
+                self.error(line_number, f"Unknown course {record['course']!r}")
+            else:
+                objects.append(
+                    self.build("lesson", external_id, record, course_id=course_id)
+                )
+        self.upsert("lesson", objects)
+        return {lesson.course_id for lesson in objects}
+
+    def add_links(self, links):
+        if not links:
+            return set()
+        course_ids = resolve(Course, {record["course"] for _, record in links})
+        skill_ids = resolve(Skill, {record["skill"] for _, record in links})
+        objects = {}
+        for line_number, record in links:
+            course_id = course_ids.get(str(record["course"]))
+            skill_id = skill_ids.get(str(record["skill"]))
+            if course_id is None:
+                self.error(line_number, f"Unknown course {record['course']!r}")
+            elif skill_id is None:
+                self.error(line_number, f"Unknown skill {record['skill']!r}")
+            else:
+                objects[course_id, skill_id] = CourseSkill(
+                    course_id=course_id, skill_id=skill_id
+                )
+        # Existing links are left alone by the unique (course, skill) constraint.
+        CourseSkill.objects.bulk_create(objects.values(), ignore_conflicts=True)
+        self.counts["course_skill"] += len(objects)
+        return {course_id for course_id, _ in objects}
+
+
+def check_references(record):
+    for name in REFERENCES:
+        value = record.get(name)
+        if isinstance(value, bool) or not isinstance(value, (str, int, type(None))):
+            return f"{name} must be a string or an integer"
+    return None
+
+
+def resolve(model, external_ids):
+    """
+    Map external ids to primary keys.
+    """
+    return dict(
+        model.objects.filter(
+            external_id__in=[str(external_id) for external_id in external_ids]
+        ).values_list("external_id", "id")
+    )
+
+
+def import_catalog(stream, format, batch_size=BATCH_SIZE):
+    """
+    Import records from a text stream and return a summary of the changes.
+    """
+    return CatalogImporter(batch_size).run(read_records(stream, format)).summary()
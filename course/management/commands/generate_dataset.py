@@ -0,0 +1,261 @@
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from analytics import rollups
+from authentication import public
+from authentication.models import EmployerProfile, Resume, User, UserProfile
+from course.cache import bump_version
+from course.models import Course, Lesson, Skill
+from course.search import rebuild_index
+from course.skill_index import GENERATION_KEY, get_generation
+
+PASSWORD = "benchmark"
+
+TOPICS = [
+    "Python", "Django", "SQL", "PostgreSQL", "React", "TypeScript", "Docker",
+    "Kubernetes", "AWS", "Linux", "Git", "Testing", "Security", "Networking",
+    "Data Analysis", "Machine Learning", "Statistics", "Excel", "Figma",
+    "Product Management", "Communication", "Leadership", "Go", "Rust", "Java",
+    "Spring", "Android", "iOS", "GraphQL", "REST APIs",
+]  # fmt: skip
+LEVELS = ["Fundamentals", "Intermediate", "Advanced", "Applied", "Practical"]
+FIRST_NAMES = [
+    "Amina", "Rahim", "Nusrat", "Tanvir", "Farhana", "Sakib", "Mim", "Arif",
+    "Jannat", "Imran", "Sadia", "Rafi", "Tania", "Hasan", "Priya", "Omar",
+]  # fmt: skip
+LAST_NAMES = [
+    "Rahman", "Hossain", "Islam", "Ahmed", "Khan", "Chowdhury", "Sarkar",
+    "Das", "Roy", "Uddin", "Akter", "Begum", "Karim", "Siddique",
+]  # fmt: skip
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-generate a synthetic catalog and user base for benchmarks. "
+        "Skill popularity follows a Zipf distribution, so a few skills are "
+        "held by many profiles and most by few. All users get the password "
+        f"'{PASSWORD}'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10_000)
+        parser.add_argument(
+            "--profiles",
+            type=int,
+            default=None,
+            help="Seeker profiles among the users, default half of them.",
+        )
+        parser.add_argument(
+            "--employers",
+            type=int,
+            default=None,
+            help="Employer profiles among the users, default 1%% of them.",
+        )
+        parser.add_argument("--courses", type=int, default=None)
+        parser.add_argument("--lessons-per-course", type=int, default=8)
+        parser.add_argument("--skills", type=int, default=None)
+        parser.add_argument("--skills-per-course", type=int, default=4)
+        parser.add_argument("--skills-per-profile", type=int, default=8)
+        parser.add_argument("--completed-per-profile", type=int, default=3)
+        parser.add_argument(
+            "--resumes",
+            type=float,
+            default=0.3,
+            help="Share of seekers with a resume (only the database row).",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--prefix",
+            default="bench",
+            help="Username prefix, followed by a running number.",
+        )
+
+    def handle(self, *args, **options):
+        users = options["users"]
+        if options["profiles"] is None:
+            options["profiles"] = users // 2
+        if options["employers"] is None:
+            options["employers"] = users // 100
+        if options["courses"] is None:
+            options["courses"] = max(10, users // 100)
+        if options["skills"] is None:
+            options["skills"] = max(20, min(2000, users // 500))
+        self.options = options
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+
+        started = time.perf_counter()
+        skill_ids = self.timed("skills", self.create_skills)
+        # Zipf-like popularity, skill_ids[0] is the most common one.
+        self.skill_weights = self.cumulative(len(skill_ids))
+        self.skill_ids = skill_ids
+        course_ids = self.timed("courses", self.create_courses)
+        self.course_ids = course_ids
+        self.course_weights = self.cumulative(len(course_ids))
+        self.timed("users", self.create_users)
+        self.timed("search index", rebuild_index)
+        self.timed("public profiles", public.rebuild)
+        self.timed("analytics rollups", rollups.reconcile)
+
+        # Running workers rebuild their skill index on next use.
+        get_generation()
+        cache.incr(GENERATION_KEY)
+        bump_version()
+        self.stdout.write(f"Done in {time.perf_counter() - started:.1f}s")
+
+    def timed(self, label, func):
+        started = time.perf_counter()
+        result = func()
+        self.stdout.write(f"Created {label} in {time.perf_counter() - started:.1f}s")
+        return result
+
+    def cumulative(self, count):
+        total, weights = 0.0, []
+        for rank in range(count):
+            total += 1 / (rank + 1) ** 0.9
+            weights.append(total)
+        return weights
+
+    def pick(self, population, cum_weights, count):
+        if not population or count <= 0:
+            return set()
+        count = min(count, len(population))
+        return set(self.rng.choices(population, cum_weights=cum_weights, k=count))
+
+    def create_skills(self):
+        count = self.options["skills"]
+        skills = []
+        for number in range(count):
+            topic = TOPICS[number % len(TOPICS)]
+            level = LEVELS[number // len(TOPICS) % len(LEVELS)]
+            name = f"{topic} {level}"
+            if number >= len(TOPICS) * len(LEVELS):
+                name = f"{name} {number}"
+            skills.append(
+                Skill(name=name, description=f"Can apply {topic} at {level} level.")
+            )
+        with transaction.atomic():
+            skills = Skill.objects.bulk_create(skills, batch_size=self.batch_size)
+        return [skill.id for skill in skills]
+
+    def create_courses(self):
+        CourseSkill = Course.skills.through
+        options = self.options
+        course_ids = []
+        for start in range(0, options["courses"], self.batch_size):
+            stop = min(start + self.batch_size, options["courses"])
+            with transaction.atomic():
+                courses = Course.objects.bulk_create(
+                    Course(
+                        title=f"{TOPICS[number % len(TOPICS)]} course {number}",
+                        description="Hands-on course with exercises. " * 8,
+                    )
+                    for number in range(start, stop)
+                )
+                lessons, links = [], []
+                for course in courses:
+                    for number in range(options["lessons_per_course"]):
+                        lessons.append(
+                            Lesson(
+                                course_id=course.id,
+                                title=f"Lesson {number + 1}",
+                                content="Lesson text. " * 40,
+                                video_url=f"https://videos.example.com/{course.id}/{number}",
+                            )
+                        )
+                    count = self.rng.randint(1, options["skills_per_course"])
+                    for skill_id in self.pick(
+                        self.skill_ids, self.skill_weights, count
+                    ):
+                        links.append(
+                            CourseSkill(course_id=course.id, skill_id=skill_id)
+                        )
+                Lesson.objects.bulk_create(lessons, batch_size=self.batch_size)
+                CourseSkill.objects.bulk_create(links, batch_size=self.batch_size)
+            course_ids += [course.id for course in courses]
+        return course_ids
+
+    def create_users(self):
+        options = self.options
+        password = make_password(PASSWORD)
+        offset = User.objects.count()
+        seekers = options["profiles"]
+        employers = seekers + options["employers"]
+        for start in range(0, options["users"], self.batch_size):
+            stop = min(start + self.batch_size, options["users"])
+            users = []
+            for number in range(start, stop):
+                if number < seekers:
+                    user_type = User.USER_TYPE_CHOICES.SEEKER
+                elif number < employers:
+                    user_type = User.USER_TYPE_CHOICES.EMPLOYER
+                else:
+                    user_type = None
+                first_name = self.rng.choice(FIRST_NAMES)
+                last_name = self.rng.choice(LAST_NAMES)
+                username = f"{options['prefix']}{offset + number}"
+                users.append(
+                    User(
+                        username=username,
+                        password=password,
+                        first_name=first_name,
+                        last_name=last_name,
+                        email=f"{username}@example.com",
+                        user_type=user_type,
+                    )
+                )
+            with transaction.atomic():
+                users = User.objects.bulk_create(users)
+                self.create_profiles(
+                    [user for user in users if user.user_type == "seeker"]
+                )
+                EmployerProfile.objects.bulk_create(
+                    EmployerProfile(
+                        user_id=user.id,
+                        company=f"{user.last_name} Ltd",
+                        location="Dhaka",
+                    )
+                    for user in users
+                    if user.user_type == "employer"
+                )
+            self.stdout.write(f"  {stop}/{options['users']} users")
+
+    def create_profiles(self, users):
+        """
+        Create profiles of `users` and fill the m2m through tables directly,
+        post_save and m2m_changed receivers do not run for bulk_create.
+        """
+        if not users:
+            return
+        options = self.options
+        VerifiedSkill = UserProfile.verified_skills.through
+        CompletedCourse = UserProfile.completed_course.through
+        profiles = UserProfile.objects.bulk_create(
+            UserProfile(user_id=user.id, bio="Looking for my next role.")
+            for user in users
+        )
+        verified, completed = [], []
+        for profile in profiles:
+            count = self.rng.randint(0, options["skills_per_profile"] * 2)
+            for skill_id in self.pick(self.skill_ids, self.skill_weights, count):
+                verified.append(
+                    VerifiedSkill(userprofile_id=profile.id, skill_id=skill_id)
+                )
+            count = self.rng.randint(0, options["completed_per_profile"] * 2)
+            for course_id in self.pick(self.course_ids, self.course_weights, count):
+                completed.append(
+                    CompletedCourse(userprofile_id=profile.id, course_id=course_id)
+                )
+        VerifiedSkill.objects.bulk_create(verified, batch_size=self.batch_size)
+        CompletedCourse.objects.bulk_create(completed, batch_size=self.batch_size)
+        Resume.objects.bulk_create(
+            Resume(user_id=user.id, resume_file=f"resumes/{user.username}.pdf")
+            for user in users
+            if self.rng.random() < options["resumes"]
+        )
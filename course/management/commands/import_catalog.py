@@ -0,0 +1,55 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from course.importer import (
+    BATCH_SIZE,
+    CatalogImportError,
+    guess_format,
+    import_catalog,
+    text_stream,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Import skills, courses, lessons and course-skill links from JSON lines "
+        "or CSV, upserting on the records' ids. See course/importer.py for the "
+        "record format."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, '-' for stdin.")
+        parser.add_argument(
+            "--format",
+            choices=("jsonl", "csv"),
+            help="Input format, guessed from the file extension by default.",
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        format = options["format"] or guess_format(path)
+        started = time.perf_counter()
+        try:
+            if path == "-":
+                summary = import_catalog(
+                    text_stream(sys.stdin.buffer), format, options["batch_size"]
+                )
+            else:
+                with open(path, "rb") as binary:
+                    summary = import_catalog(
+                        text_stream(binary), format, options["batch_size"]
+                    )
+        except (OSError, CatalogImportError) as e:
+            raise CommandError(e)
+
+        for error in summary["errors"]:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        self.stdout.write(
+            f"Imported {summary['skills']} skills, {summary['courses']} courses, "
+            f"{summary['lessons']} lessons and {summary['course_skills']} "
+            f"course-skill links in {time.perf_counter() - started:.1f}s, "
+            f"{summary['error_count']} errors"
+        )
@@ -0,0 +1,57 @@
+import random
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q
+
+from authentication.models import UserProfile
+from course.models import Skill
+from course.skill_index import GENERATION_KEY, get_generation, skill_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the skill -> profile index and make every worker reload it. "
+        "With --verify, compare its rankings against the SQL aggregate."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            type=int,
+            default=0,
+            metavar="N",
+            help="Check N random skill sets against the SQL ranking.",
+        )
+
+    def handle(self, *args, **options):
+        # Workers see a generation without a delta and rebuild on next use.
+        get_generation()
+        cache.incr(GENERATION_KEY)
+
+        started = time.perf_counter()
+        skill_index.rebuild()
+        self.stdout.write(
+            f"Indexed {len(skill_index)} skills "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+
+        skill_ids = list(Skill.objects.values_list("id", flat=True))
+        for _ in range(options["verify"]):
+            chosen = random.sample(skill_ids, min(len(skill_ids), 3))
+            expected = list(
+                UserProfile.objects.annotate(
+                    match_count=Count(
+                        "verified_skills", filter=Q(verified_skills__id__in=chosen)
+                    )
+                )
+                .filter(match_count__gt=0)
+                .order_by("-match_count", "id")
+                .values_list("match_count", "id")
+            )
+            got = skill_index.rank(chosen, limit=len(expected) + 1)
+            if got != expected:
+                raise CommandError(f"Index ranking differs from SQL for {chosen}")
+        if options["verify"]:
+            self.stdout.write(f"Verified {options['verify']} rankings against SQL")
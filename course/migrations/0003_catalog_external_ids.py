@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("course", "0002_lesson"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="course",
+            name="external_id",
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name="lesson",
+            name="external_id",
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name="skill",
+            name="external_id",
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:35
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+TABLE = "course_coursesearchdocument"
+COLUMNS = "title, skills, description, lesson_titles, lesson_content"
+NEW_VALUES = (
+    "new.title, new.skills, new.description, new.lesson_titles, new.lesson_content"
+)
+OLD_VALUES = (
+    "old.title, old.skills, old.description, old.lesson_titles, old.lesson_content"
+)
+
+SQLITE_INDEX = [
+    f"""
+    CREATE VIRTUAL TABLE course_search_fts USING fts5(
+        {COLUMNS}, content='{TABLE}', content_rowid='course_id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER course_search_fts_insert AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO course_search_fts(rowid, {COLUMNS})
+        VALUES (new.course_id, {NEW_VALUES});
+    END
+    """,
+    f"""
+    CREATE TRIGGER course_search_fts_delete AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO course_search_fts(course_search_fts, rowid, {COLUMNS})
+        VALUES ('delete', old.course_id, {OLD_VALUES});
+    END
+    """,
+    f"""
+    CREATE TRIGGER course_search_fts_update AFTER UPDATE ON {TABLE} BEGIN
+        INSERT INTO course_search_fts(course_search_fts, rowid, {COLUMNS})
+        VALUES ('delete', old.course_id, {OLD_VALUES});
+        INSERT INTO course_search_fts(rowid, {COLUMNS})
+        VALUES (new.course_id, {NEW_VALUES});
+    END
+    """,
+]
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS course_search_fts_insert",
+    "DROP TRIGGER IF EXISTS course_search_fts_delete",
+    "DROP TRIGGER IF EXISTS course_search_fts_update",
+    "DROP TABLE IF EXISTS course_search_fts",
+]
+POSTGRES_INDEX = [
+    f"CREATE INDEX course_search_document_gin ON {TABLE} USING gin (document)",
+]
+POSTGRES_DROP = ["DROP INDEX IF EXISTS course_search_document_gin"]
+
+
+def run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_index(apps, schema_editor):
+    run(schema_editor, {"sqlite": SQLITE_INDEX, "postgresql": POSTGRES_INDEX})
+
+
+def drop_index(apps, schema_editor):
+    run(schema_editor, {"sqlite": SQLITE_DROP, "postgresql": POSTGRES_DROP})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("course", "0003_catalog_external_ids"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CourseSearchDocument",
+            fields=[
+                (
+                    "course",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_document",
+                        serialize=False,
+                        to="course.course",
+                    ),
+                ),
+                ("title", models.TextField()),
+                ("skills", models.TextField()),
+                ("description", models.TextField()),
+                ("lesson_titles", models.TextField()),
+                ("lesson_content", models.TextField()),
+                (
+                    "document",
+                    django.contrib.postgres.search.SearchVectorField(null=True),
+                ),
+            ],
+        ),
+        # Backend specific, the model only carries the text.
+        migrations.RunPython(create_index, drop_index),
+    ]
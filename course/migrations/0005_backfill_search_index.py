@@ -0,0 +1,90 @@
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+BATCH_SIZE = 500
+CONFIG = "english"
+# Same weights as course/search.py, which builds the documents from now on.
+VECTOR = (
+    SearchVector("title", weight="A", config=CONFIG)
+    + SearchVector("skills", weight="B", config=CONFIG)
+    + SearchVector("description", "lesson_titles", weight="C", config=CONFIG)
+    + SearchVector("lesson_content", weight="D", config=CONFIG)
+)
+
+
+def index_batch(apps, schema_editor, course_ids):
+    using = schema_editor.connection.alias
+    Course = apps.get_model("course", "Course")
+    Lesson = apps.get_model("course", "Lesson")
+    CourseSearchDocument = apps.get_model("course", "CourseSearchDocument")
+    CourseSkill = Course.skills.through
+
+    skills = defaultdict(list)
+    for course_id, name in (
+        CourseSkill.objects.using(using)
+        .filter(course_id__in=course_ids)
+        .order_by("skill_id")
+        .values_list("course_id", "skill__name")
+    ):
+        skills[course_id].append(name)
+    titles, content = defaultdict(list), defaultdict(list)
+    for course_id, title, text in (
+        Lesson.objects.using(using)
+        .filter(course_id__in=course_ids)
+        .order_by("id")
+        .values_list("course_id", "title", "content")
+        .iterator(chunk_size=2000)
+    ):
+        titles[course_id].append(title)
+        content[course_id].append(text)
+
+    # Inserting fills the SQLite FTS5 table through the triggers of 0004.
+    CourseSearchDocument.objects.using(using).bulk_create(
+        CourseSearchDocument(
+            course_id=course_id,
+            title=title,
+            skills="\n".join(skills[course_id]),
+            description=description,
+            lesson_titles="\n".join(titles[course_id]),
+            lesson_content="\n".join(content[course_id]),
+        )
+        for course_id, title, description in Course.objects.using(using)
+        .filter(id__in=course_ids)
+        .values_list("id", "title", "description")
+    )
+    if schema_editor.connection.vendor == "postgresql":
+        CourseSearchDocument.objects.using(using).filter(
+            course_id__in=course_ids
+        ).update(document=VECTOR)
+
+
+def backfill(apps, schema_editor):
+    """
+    Index the courses that existed before search, later changes are indexed
+    by the signals of course/search.py.
+    """
+    Course = apps.get_model("course", "Course")
+    CourseSearchDocument = apps.get_model("course", "CourseSearchDocument")
+    using = schema_editor.connection.alias
+    indexed = CourseSearchDocument.objects.using(using).values("course_id")
+    ids = list(
+        Course.objects.using(using)
+        .exclude(id__in=indexed)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    for start in range(0, len(ids), BATCH_SIZE):
+        index_batch(apps, schema_editor, ids[start : start + BATCH_SIZE])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("course", "0004_course_search"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
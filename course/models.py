@@ -1,9 +1,22 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
+from config.prefetch import for_schema
+
+
+class CourseQuerySet(models.QuerySet):
+    def for_schema(self, schema):
+        """
+        Load exactly what `schema` serialises, see config/prefetch.py.
+        """
+        return for_schema(self, schema)
+
 
 class Skill(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField()
+    # Stable id from the catalog source, used to upsert imports.
+    external_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
 
     def __str__(self):
         return self.name
@@ -13,6 +26,9 @@ class Course(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
     skills = models.ManyToManyField(Skill, related_name="courses")
+    external_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
+
+    objects = CourseQuerySet.as_manager()
 
     def __str__(self):
         return self.title
@@ -23,6 +39,30 @@ class Lesson(models.Model):
     content = models.TextField()
     video_url = models.URLField(blank=True, null=True)
     course = models.ForeignKey(Course, related_name="lessons", on_delete=models.CASCADE)
+    external_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
 
     def __str__(self):
         return self.title
+
+
+class CourseSearchDocument(models.Model):
+    """
+    Searchable text of a course, its skills and lessons, see course/search.py.
+
+    On Postgres `document` holds the weighted tsvector behind a GIN index. On
+    SQLite triggers mirror the text columns into the course_search_fts FTS5
+    table and `document` stays empty.
+    """
+
+    course = models.OneToOneField(
+        Course,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name="search_document",
+    )
+    title = models.TextField()
+    skills = models.TextField()
+    description = models.TextField()
+    lesson_titles = models.TextField()
+    lesson_content = models.TextField()
+    document = SearchVectorField(null=True)
@@ -0,0 +1,153 @@
+"""
+In-process course recommendations by skill-gap coverage.
+
+A course scores the demand of every skill it teaches that the seeker has not
+verified. A skill's demand is the number of profiles holding it in the skill
+index, i.e. among the profiles employers rank with /skills/filtered_user,
+plus one so rare skills still count. Completed courses are never
+recommended.
+
+The catalog is held as a sparse course x skill matrix: `totals` is every
+course's score for a seeker without verified skills, sorted descending, and
+`postings` maps a skill to the positions of the courses teaching it. A
+seeker's scores are `totals` minus the demand of their verified skills, which
+only touches the postings of those skills. Courses are then walked in
+`totals` order until no later course can enter the top k, so a query costs
+about the size of the seeker's postings plus k, not the catalog size.
+
+The matrix is rebuilt when the catalog version (see course/cache.py) changes
+and at least every RECOMMENDATION_MAX_AGE seconds to pick up new demand.
+"""
+
+import heapq
+import threading
+import time
+from array import array
+from collections import defaultdict
+from typing import NamedTuple
+
+from django.conf import settings
+
+from .models import Course
+from .skill_index import skill_index
+
+CourseSkill = Course.skills.through
+
+
+class Matrix(NamedTuple):
+    courses: array  # course ids, by descending total
+    totals: array  # total demand of each course's skills
+    skills: list  # skill ids of each course
+    postings: dict  # skill id -> positions of the courses teaching it
+    demand: dict  # skill id -> demand
+
+
+class Recommender:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._matrix = None
+        self.version = None
+        self.built_at = None
+
+    def reset(self):
+        with self._lock:
+            self._matrix = None
+            self.version = None
+            self.built_at = None
+
+    def rebuild(self, version):
+        course_skills = defaultdict(list)
+        rows = CourseSkill.objects.order_by("course_id", "skill_id").values_list(
+            "course_id", "skill_id"
+        )
+        for course_id, skill_id in rows.iterator(chunk_size=10000):
+            course_skills[course_id].append(skill_id)
+
+        demand = {
+            skill_id: count + 1
+            for skill_id, count in skill_index.holder_counts().items()
+        }
+        for skill_ids in course_skills.values():
+            for skill_id in skill_ids:
+                demand.setdefault(skill_id, 1)
+        totals = {
+            course_id: sum(demand[skill_id] for skill_id in skill_ids)
+            for course_id, skill_ids in course_skills.items()
+        }
+        order = sorted(totals, key=lambda course_id: (-totals[course_id], course_id))
+        postings = defaultdict(lambda: array("I"))
+        for position, course_id in enumerate(order):
+            for skill_id in course_skills[course_id]:
+                postings[skill_id].append(position)
+
+        self._matrix = Matrix(
+            courses=array("q", order),
+            totals=array("q", (totals[course_id] for course_id in order)),
+            skills=[tuple(course_skills[course_id]) for course_id in order],
+            postings=dict(postings),
+            demand=demand,
+        )
+        self.version = version
+        self.built_at = time.monotonic()
+
+    def is_fresh(self, version):
+        return (
+            self.built_at is not None
+            and self.version == version
+            and time.monotonic() - self.built_at <= settings.RECOMMENDATION_MAX_AGE
+        )
+
+    def ensure_fresh(self, version):
+        if not self.is_fresh(version):
+            with self._lock:
+                if not self.is_fresh(version):
+                    self.rebuild(version)
+
+    def recommend(self, version, verified, completed, limit=20):
+        """
+        Return up to `limit` `(score, course_id, gap_skill_ids)` triples, best
+        first and by ascending course id on ties.
+        """
+        self.ensure_fresh(version)
+        matrix = self._matrix
+        verified = set(verified)
+        completed = set(completed)
+
+        covered = defaultdict(int)
+        for skill_id in verified:
+            weight = matrix.demand.get(skill_id, 0)
+            for position in matrix.postings.get(skill_id, ()):
+                covered[position] += weight
+
+        # Min-heap of (score, -course_id, position) holding the best so far.
+        top = []
+        courses = matrix.courses
+        for position, total in enumerate(matrix.totals):
+            course_id = courses[position]
+            # Later courses score at most their total, which is no better.
+            if len(top) == limit and (total, -course_id) < top[0][:2]:
+                break
+            score = total - covered.get(position, 0)
+            if score <= 0 or course_id in completed:
+                continue
+            item = (score, -course_id, position)
+            if len(top) < limit:
+                heapq.heappush(top, item)
+            elif item > top[0]:
+                heapq.heapreplace(top, item)
+
+        return [
+            (
+                score,
+                -negated_id,
+                [
+                    skill_id
+                    for skill_id in matrix.skills[position]
+                    if skill_id not in verified
+                ],
+            )
+            for score, negated_id, position in sorted(top, reverse=True)
+        ]
+
+
+recommender = Recommender()
@@ -0,0 +1,159 @@
+"""
+Finds the skills of the catalog named in a text, e.g. a resume.
+
+Skill names and texts are split into the same case-folded word tokens, so
+"Machine  Learning" matches "machine learning" and "C++" or "Node.js" stay
+one token. The names are compiled into an Aho–Corasick automaton over
+tokens: a trie of the names whose failure links point every node at the
+longest suffix that is also a name prefix, and whose outputs include the
+names ending in that suffix. A text is then read one token at a time with a
+dictionary lookup per token, whatever the number of skills, and names nested
+in longer ones ("learning" in "machine learning") are found as well.
+
+The automaton is rebuilt when skills are added or deleted, which changes
+their count or highest id, and at least every SKILL_MATCHER_MAX_AGE seconds
+for renames. Both are read from the database rather than from the catalog
+version of course/cache.py, which task workers do not share with the web
+processes unless CACHES is.
+"""
+
+import re
+import threading
+import time
+from collections import Counter, deque
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .models import Skill
+
+# A word, plus the symbols that belong to names like C++, C# or Node.js.
+TOKEN = re.compile(r"[^\W_]+(?:[.+#][^\W_.+#]*)*")
+
+
+def tokenize(text):
+    """
+    Yield the case-folded tokens of `text`.
+    """
+    for match in TOKEN.finditer(text.casefold()):
+        yield match.group().rstrip(".")
+
+
+class Automaton:
+    """
+    Aho–Corasick automaton over token sequences.
+    """
+
+    def __init__(self, patterns):
+        """
+        `patterns` are `(tokens, value)` pairs, `value` is reported for every
+        occurrence of the token sequence.
+        """
+        goto = [{}]
+        outputs = [[]]
+        for tokens, value in patterns:
+            state = 0
+            for token in tokens:
+                following = goto[state].get(token)
+                if following is None:
+                    following = goto[state][token] = len(goto)
+                    goto.append({})
+                    outputs.append([])
+                state = following
+            if state:
+                outputs[state].append(value)
+
+        # Breadth first, so the failure state of a node is always done.
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, following in goto[state].items():
+                queue.append(following)
+                suffix = fail[state]
+                while suffix and token not in goto[suffix]:
+                    suffix = fail[suffix]
+                fail[following] = goto[suffix].get(token, 0)
+                outputs[following].extend(outputs[fail[following]])
+
+        self.goto = goto
+        self.fail = fail
+        self.outputs = [tuple(values) for values in outputs]
+
+    def __len__(self):
+        return len(self.goto)
+
+    def count(self, tokens):
+        """
+        Return value -> number of occurrences in `tokens`.
+        """
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        found = Counter()
+        state = 0
+        for token in tokens:
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+
+def compile_skills(skills):
+    """
+    Return the automaton of `(skill id, name)` pairs, reporting skill ids.
+    """
+    return Automaton((tuple(tokenize(name)), skill_id) for skill_id, name in skills)
+
+
+def catalog():
+    return Skill.objects.order_by("id").values_list("id", "name")
+
+
+def catalog_state():
+    """
+    Return the number of skills and their highest id.
+    """
+    state = Skill.objects.aggregate(count=Count("id"), last=Max("id"))
+    return state["count"], state["last"]
+
+
+class SkillMatcher:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.automaton = None
+        self.state = None
+        self.built_at = None
+
+    def reset(self):
+        with self._lock:
+            self.automaton = None
+            self.state = None
+            self.built_at = None
+
+    def stale(self, state):
+        return (
+            self.automaton is None
+            or self.state != state
+            or time.monotonic() - self.built_at > settings.SKILL_MATCHER_MAX_AGE
+        )
+
+    def ensure_fresh(self):
+        state = catalog_state()
+        if self.stale(state):
+            with self._lock:
+                if self.stale(state):
+                    self.automaton = compile_skills(catalog().iterator(10000))
+                    self.state = state
+                    self.built_at = time.monotonic()
+        return self.automaton
+
+    def count(self, tokens):
+        """
+        Return skill id -> mentions in `tokens`, with the automaton of the
+        current catalog.
+        """
+        return self.ensure_fresh().count(tokens)
+
+
+skill_matcher = SkillMatcher()
@@ -1,3 +1,737 @@
-from django.test import TestCase
+import io
+import json
+import random
+import tempfile
+from collections import Counter
+from unittest import skipUnless
 
-# Create your tests here.
+from django.contrib.postgres.search import SearchQuery
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Count, Q
+from django.test import TestCase, override_settings
+
+from authentication.models import AuthToken, User, UserProfile
+from config.pagination import encode_cursor
+from config.testing import assert_constant_queries
+
+from .importer import CatalogImportError, import_catalog, text_stream
+from .models import Course, CourseSearchDocument, Lesson, Skill
+from .recommendations import recommender
+from .skill_index import GENERATION_KEY, skill_index
+from .skill_matcher import compile_skills, skill_matcher, tokenize
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.skills = Skill.objects.bulk_create(
+            Skill(name=f"skill {i}", description="") for i in range(4)
+        )
+        # Public profiles are written on commit.
+        with cls.captureOnCommitCallbacks(execute=True):
+            for i in range(12):
+                user = User.objects.create(username=f"user{i}", user_type="seeker")
+                user.profile.verified_skills.set(cls.skills[: i % 4])
+        for i in range(7):
+            Course.objects.create(title=f"course {i}", description="")
+
+    def setUp(self):
+        skill_index.reset()
+        cache.clear()
+
+    def walk(self, path, body=None, limit=5):
+        items, cursor = [], None
+        while True:
+            url = f"{path}?limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+            if body is None:
+                page = self.client.get(url).json()
+            else:
+                page = self.client.post(url, body, content_type="application/json")
+                page = page.json()
+            items += page["items"]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return items
+
+    def test_list_courses_pages_cover_all_rows(self):
+        ids = [course["id"] for course in self.walk("/api/course/list")]
+        self.assertEqual(
+            ids, list(Course.objects.order_by("id").values_list("id", flat=True))
+        )
+
+    def test_filtered_user_pages_are_ranked(self):
+        skill_ids = [skill.id for skill in self.skills[:3]]
+        items = self.walk("/api/skills/filtered_user", skill_ids, limit=2)
+        expected = sorted(
+            ((-len(set(p["verified_skills"]) & set(skill_ids)), p["id"]) for p in items)
+        )
+        self.assertEqual(
+            [p["id"] for p in items], [profile_id for _, profile_id in expected]
+        )
+        self.assertEqual(
+            len(items),
+            UserProfile.objects.filter(verified_skills__in=skill_ids)
+            .distinct()
+            .count(),
+        )
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get("/api/course/list?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_values_of_the_wrong_type_are_rejected(self):
+        for values in (["abc"], [{"id": 1}], [None]):
+            with self.subTest(values=values):
+                cursor = encode_cursor(values)
+                response = self.client.get(f"/api/course/list?cursor={cursor}")
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {"detail": "Invalid cursor"})
+
+
+class SkillIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(5)
+        cls.skill_ids = [
+            skill.id
+            for skill in Skill.objects.bulk_create(
+                Skill(name=f"skill {i}", description="") for i in range(20)
+            )
+        ]
+        for i in range(150):
+            user = User.objects.create(username=f"user{i}", user_type="seeker")
+            user.profile.verified_skills.set(
+                rng.sample(cls.skill_ids, rng.randint(0, 8))
+            )
+
+    def setUp(self):
+        skill_index.reset()
+
+    def sql_ranking(self, skill_ids):
+        return list(
+            UserProfile.objects.annotate(
+                match_count=Count(
+                    "verified_skills", filter=Q(verified_skills__id__in=skill_ids)
+                )
+            )
+            .filter(match_count__gt=0)
+            .order_by("-match_count", "id")
+            .values_list("match_count", "id")
+        )
+
+    def test_ranking_matches_sql(self):
+        rng = random.Random(7)
+        for size in (1, 2, 3, 5, 9):
+            chosen = rng.sample(self.skill_ids, size)
+            expected = self.sql_ranking(chosen)
+            self.assertEqual(skill_index.rank(chosen, limit=1000), expected)
+            # Resuming after any position yields the rest of the ranking.
+            position = len(expected) // 2
+            self.assertEqual(
+                skill_index.rank(chosen, after=expected[position], limit=1000),
+                expected[position + 1 :],
+            )
+
+    def test_index_follows_verified_skill_changes(self):
+        chosen = self.skill_ids[:4]
+        skill_index.rank(chosen)
+        profile = UserProfile.objects.order_by("id").first()
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.verified_skills.add(*chosen)
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.get(id=chosen[0]).verified_users.remove(
+                *UserProfile.objects.exclude(id=profile.id)
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            UserProfile.objects.order_by("-id").first().verified_skills.clear()
+        self.assertEqual(skill_index.rank(chosen, limit=1000), self.sql_ranking(chosen))
+
+    def test_index_survives_generation_eviction(self):
+        chosen = self.skill_ids[:4]
+        first, second = UserProfile.objects.order_by("id")[:2]
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            first.verified_skills.remove(*chosen)
+        skill_index.rank(chosen)
+        cache.delete(GENERATION_KEY)
+        # Deltas published after the eviction must not be numbered like the
+        # ones the index already applied.
+        for profile in (first, second):
+            with self.captureOnCommitCallbacks(execute=True):
+                profile.verified_skills.add(*chosen)
+        self.assertEqual(skill_index.rank(chosen, limit=1000), self.sql_ranking(chosen))
+
+
+class QueryCountTests(TestCase):
+    def setUp(self):
+        skill_index.reset()
+        cache.clear()
+        self.skill = Skill.objects.create(name="python", description="")
+
+    def add_courses(self, size):
+        # Committing bumps the catalog version, so responses aren't cached.
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(Course.objects.count(), size):
+                course = Course.objects.create(title=f"course {i}", description="")
+                course.skills.add(self.skill)
+
+    def add_profiles(self, size):
+        for i in range(UserProfile.objects.count(), size):
+            with self.captureOnCommitCallbacks(execute=True):
+                user = User.objects.create(username=f"user{i}", user_type="seeker")
+                user.profile.verified_skills.add(self.skill)
+
+    def test_list_courses(self):
+        assert_constant_queries(
+            lambda: self.client.get("/api/course/list?limit=100"), self.add_courses
+        )
+
+    def test_filtered_courses(self):
+        assert_constant_queries(
+            lambda: self.client.post(
+                "/api/course/filtered?limit=100",
+                [self.skill.id],
+                content_type="application/json",
+            ),
+            self.add_courses,
+        )
+
+    def test_filtered_user(self):
+        assert_constant_queries(
+            lambda: self.client.post(
+                "/api/skills/filtered_user?limit=100",
+                [self.skill.id],
+                content_type="application/json",
+            ),
+            self.add_profiles,
+        )
+
+    def test_admin_course_list(self):
+        self.client.force_login(
+            User.objects.create_superuser(username="root", password="secret-pass-123")
+        )
+        assert_constant_queries(
+            lambda: self.client.get("/admin/course/course/"), self.add_courses
+        )
+        response = self.client.get("/admin/course/course/?q=course+1")
+        self.assertContains(response, "course 1<")
+
+
+class CourseQuerysetTests(TestCase):
+    """
+    The course endpoints run the same queries for 10 and 10,000 courses.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.skills = Skill.objects.bulk_create(
+            Skill(name=f"skill {i}", description="") for i in range(3)
+        )
+
+    def add_courses(self, size):
+        courses = Course.objects.bulk_create(
+            Course(title=f"course {i}", description="")
+            for i in range(Course.objects.count(), size)
+        )
+        Course.skills.through.objects.bulk_create(
+            Course.skills.through(course_id=course.id, skill_id=skill.id)
+            for course in courses
+            for skill in self.skills[: course.id % 3 + 1]
+        )
+        Lesson.objects.bulk_create(
+            Lesson(course_id=course.id, title="lesson", content="")
+            for course in courses
+        )
+        # bulk_create sends no signals, drop cached responses by hand.
+        cache.clear()
+
+    def test_list_courses(self):
+        def fetch():
+            return self.client.get("/api/course/list?limit=200")
+
+        assert_constant_queries(fetch, self.add_courses, sizes=(10, 10_000))
+        cache.clear()
+        with self.assertNumQueries(2):
+            self.assertEqual(len(fetch().json()["items"]), 200)
+
+    def test_filtered_courses(self):
+        assert_constant_queries(
+            lambda: self.client.post(
+                "/api/course/filtered?limit=200",
+                [skill.id for skill in self.skills],
+                content_type="application/json",
+            ),
+            self.add_courses,
+            sizes=(10, 10_000),
+        )
+
+    def test_get_course(self):
+        course = Course.objects.create(title="course", description="")
+
+        def add_relations(size):
+            course.skills.add(*self.skills[: min(size, 3)])
+            Lesson.objects.bulk_create(
+                Lesson(course=course, title=f"lesson {i}", content="")
+                for i in range(course.lessons.count(), size)
+            )
+            cache.clear()
+
+        def fetch():
+            return self.client.get(f"/api/course/{course.id}")
+
+        assert_constant_queries(fetch, add_relations, sizes=(10, 10_000))
+        cache.clear()
+        with self.assertNumQueries(3):
+            self.assertEqual(len(fetch().json()["lessons"]), 10_000)
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course = Course.objects.create(title="Backend", description="")
+            self.course.skills.add(Skill.objects.create(name="python", description=""))
+
+    def test_conditional_get_skips_database(self):
+        path = f"/api/course/{self.course.id}"
+        response = self.client.get(path)
+        etag = response["ETag"]
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(path).content, response.content)
+            response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_catalog_changes_invalidate_responses(self):
+        response = self.client.get("/api/course/list")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.lessons.create(title="Models", content="")
+            self.course.skills.add(Skill.objects.create(name="sql", description=""))
+        changed = self.client.get(
+            "/api/course/list", HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], response["ETag"])
+        self.assertEqual(len(changed.json()["items"][0]["skills"]), 2)
+
+    def test_missing_course_is_not_cached(self):
+        path = f"/api/course/{self.course.id + 1}"
+        self.assertEqual(self.client.get(path).status_code, 404)
+        Course.objects.create(id=self.course.id + 1, title="New", description="")
+        self.assertEqual(self.client.get(path).status_code, 200)
+
+
+class CourseSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.skill = Skill.objects.create(name="Databases", description="")
+            self.titled = Course.objects.create(
+                title="Python for beginners", description="First steps"
+            )
+            self.lesson_only = Course.objects.create(
+                title="Web development", description="Build <b>sites</b>"
+            )
+            self.lesson_only.lessons.create(
+                title="Scripting", content="A short detour into python tooling."
+            )
+            self.lesson_only.skills.add(self.skill)
+            for i in range(5):
+                Course.objects.create(title=f"Python extra {i}", description="")
+
+    def search(self, query, **params):
+        params["q"] = query
+        return self.client.get("/api/course/search", params).json()
+
+    def test_ranks_title_matches_first(self):
+        items = self.search("python")["items"]
+        self.assertEqual(len(items), 7)
+        self.assertEqual(items[-1]["course"]["id"], self.lesson_only.id)
+        self.assertIn("<mark>python</mark>", items[-1]["snippet"])
+
+    def test_pages_cover_all_matches(self):
+        ids, cursor = [], None
+        while True:
+            page = self.search(
+                "pyth", limit=2, **({"cursor": cursor} if cursor else {})
+            )
+            ids += [item["course"]["id"] for item in page["items"]]
+            if not (cursor := page["next_cursor"]):
+                break
+        self.assertEqual(len(ids), 7)
+        self.assertEqual(len(set(ids)), 7)
+
+    def test_index_follows_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.skill.name = "Postgres"
+            self.skill.save()
+            self.lesson_only.lessons.update(content="")
+            self.lesson_only.lessons.first().save()
+        self.assertEqual(
+            self.search("postgres")["items"][0]["course"]["id"], self.lesson_only.id
+        )
+        self.assertEqual(len(self.search("python")["items"]), 6)
+
+    def test_snippets_are_escaped(self):
+        snippet = self.search("sites")["items"][0]["snippet"]
+        self.assertIn("&lt;b&gt;<mark>sites</mark>&lt;/b&gt;", snippet)
+
+    @skipUnless(connection.vendor == "postgresql", "tsvector search needs Postgres")
+    def test_postgres_documents_are_weighted_and_indexed(self):
+        document = CourseSearchDocument.objects.get(course=self.lesson_only).document
+        # Title, skills, description and lesson words get weights A to D,
+        # D is the default and not shown.
+        for lexeme in (r"'web':\d+A", r"'databas':\d+B", r"'site':\d+C"):
+            self.assertRegex(document, lexeme)
+        self.assertRegex(document, r"'python':\d+(?![\dA-C])")
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            plan = (
+                CourseSearchDocument.objects.filter(
+                    document=SearchQuery("python", config="english")
+                )
+                .values("course_id")
+                .explain()
+            )
+        self.assertIn("course_search_document_gin", plan)
+
+
+def jsonl(*records):
+    return "".join(json.dumps(record) + "\n" for record in records)
+
+
+CATALOG = jsonl(
+    {"type": "skill", "id": "py", "name": "Python", "description": "Language"},
+    {"type": "skill", "id": "sql", "name": "SQL"},
+    {"type": "course", "id": "c1", "title": "Backend", "description": "APIs"},
+    {"type": "lesson", "id": "c1-1", "course": "c1", "title": "Models"},
+    {"type": "lesson", "id": "c1-2", "course": "c1", "title": "Views"},
+    {"type": "course_skill", "course": "c1", "skill": "py"},
+    {"type": "course_skill", "course": "c1", "skill": "sql"},
+)
+
+
+class CatalogImportTests(TestCase):
+    def test_import_links_records_across_chunks(self):
+        summary = import_catalog(io.StringIO(CATALOG), "jsonl", batch_size=2)
+        self.assertEqual(summary["error_count"], 0)
+        course = Course.objects.get(external_id="c1")
+        self.assertEqual(
+            sorted(course.skills.values_list("name", flat=True)), ["Python", "SQL"]
+        )
+        self.assertEqual(
+            sorted(course.lessons.values_list("title", flat=True)), ["Models", "Views"]
+        )
+
+    def test_reimport_updates_in_place(self):
+        import_catalog(io.StringIO(CATALOG), "jsonl")
+        changed = "type,id,name,title,course,skill\n"
+        changed += "skill,py,Python 3,,,\n"
+        changed += "lesson,c1-1,,Models and migrations,c1,\n"
+        changed += "course_skill,,,,c1,py\n"
+        summary = import_catalog(io.StringIO(changed), "csv")
+
+        self.assertEqual(summary["error_count"], 0)
+        self.assertEqual(Skill.objects.count(), 2)
+        self.assertEqual(Skill.objects.get(external_id="py").name, "Python 3")
+        self.assertEqual(Lesson.objects.count(), 2)
+        self.assertEqual(
+            Lesson.objects.get(external_id="c1-1").title, "Models and migrations"
+        )
+        self.assertEqual(Course.objects.get(external_id="c1").skills.count(), 2)
+
+    def test_bad_records_are_reported(self):
+        records = CATALOG + "not json\n"
+        records += jsonl(
+            {"type": "lesson", "id": "x-1", "course": "missing", "title": "Orphan"},
+            {"type": "skill", "id": "long", "name": "x" * 101},
+        )
+        summary = import_catalog(io.StringIO(records), "jsonl")
+        self.assertCountEqual(
+            [error["line"] for error in summary["errors"]], [8, 9, 10]
+        )
+        self.assertEqual(Lesson.objects.count(), 2)
+
+    def test_values_must_be_strings(self):
+        records = CATALOG + jsonl(
+            {"type": "skill", "id": "a", "name": ["a"], "description": ""},
+            {"type": "skill", "id": "b", "name": "b", "description": {"a": 1}},
+            {
+                "type": "lesson",
+                "id": "c1-3",
+                "course": "c1",
+                "title": "t",
+                "video_url": 1,
+            },
+            {"type": "course", "id": {"a": 1}, "title": "Dict id"},
+            {"type": "course_skill", "course": "c1", "skill": ["py"]},
+            {"type": "course", "id": 2, "title": "Number id"},
+        )
+        summary = import_catalog(io.StringIO(records), "jsonl")
+        self.assertEqual(
+            summary["errors"],
+            [
+                {"line": 8, "error": "name must be a string"},
+                {"line": 9, "error": "description must be a string"},
+                {"line": 10, "error": "video_url must be a string"},
+                {"line": 11, "error": "id must be a string or an integer"},
+                {"line": 12, "error": "skill must be a string or an integer"},
+            ],
+        )
+        self.assertEqual(Skill.objects.count(), 2)
+        self.assertEqual(Lesson.objects.count(), 2)
+        self.assertTrue(Course.objects.filter(external_id="2").exists())
+
+    def test_input_must_be_utf8(self):
+        binary = io.BytesIO(CATALOG.encode() + b"\xff\xfe\x00bad\n")
+        with self.assertRaisesMessage(CatalogImportError, "not valid UTF-8"):
+            import_catalog(text_stream(binary), "jsonl")
+        with tempfile.NamedTemporaryFile(suffix=".csv") as file:
+            file.write(b"type,id,name\nskill,\xff,bad\n")
+            file.flush()
+            with self.assertRaisesMessage(CommandError, "not valid UTF-8"):
+                call_command("import_catalog", file.name)
+
+    def test_endpoint_is_admin_only(self):
+        tokens = {}
+        for user_type in ("seeker", "admin"):
+            user = User.objects.create(username=user_type, user_type=user_type)
+            tokens[user_type] = AuthToken.objects.create(
+                user=user, key=AuthToken.generate_token()
+            ).key
+
+        def upload(user_type, content=CATALOG.encode()):
+            return self.client.post(
+                "/api/catalog/import",
+                {"file": SimpleUploadedFile("catalog.jsonl", content)},
+                HTTP_AUTHORIZATION=f"Bearer {tokens[user_type]}",
+            )
+
+        self.assertEqual(upload("seeker").status_code, 403)
+        response = upload("admin")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["lessons"], 2)
+        response = upload("admin", b"\xff\xfe\x00bad")
+        self.assertEqual(response.status_code, 400)
+
+
+class CourseCompletionTests(TestCase):
+    def setUp(self):
+        skill_index.reset()
+        self.user = User.objects.create(username="seeker", user_type="seeker")
+        self.token = AuthToken.objects.create(
+            user=self.user, key=AuthToken.generate_token()
+        )
+        self.courses = [
+            Course.objects.create(title=f"course {i}", description="") for i in range(3)
+        ]
+
+    def post(self, path, body, token=None):
+        return self.client.post(
+            path,
+            body,
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {(token or self.token).key}",
+        )
+
+    def add_skills(self, size):
+        for course in self.courses:
+            for i in range(course.skills.count(), size):
+                course.skills.add(
+                    Skill.objects.create(name=f"{course.title} {i}", description="")
+                )
+
+    def test_query_count_does_not_depend_on_skills(self):
+        def fetch():
+            UserProfile.completed_course.through.objects.all().delete()
+            UserProfile.verified_skills.through.objects.all().delete()
+            response = self.post(
+                "/api/course/complete",
+                {"course_ids": [course.id for course in self.courses]},
+            )
+            self.assertEqual(response.json()["completed_courses"], 3)
+
+        assert_constant_queries(fetch, self.add_skills)
+
+    def test_completion_verifies_skills_and_updates_index(self):
+        self.add_skills(2)
+        skill_ids = list(
+            Skill.objects.filter(courses=self.courses[0]).values_list("id", flat=True)
+        )
+        self.assertEqual(skill_index.rank(skill_ids), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post(
+                f"/api/course/mark_completed?course_id={self.courses[0].id}", None
+            )
+        self.assertEqual(response.status_code, 200)
+        profile = self.user.profile
+        self.assertEqual(list(profile.completed_course.all()), [self.courses[0]])
+        self.assertCountEqual(
+            profile.verified_skills.values_list("id", flat=True), skill_ids
+        )
+        self.assertEqual(skill_index.rank(skill_ids), [(2, profile.id)])
+
+        # Completing again adds nothing.
+        response = self.post(
+            "/api/course/complete", {"course_ids": [self.courses[0].id]}
+        )
+        self.assertEqual(
+            response.json(), {"completed_courses": 0, "verified_skills": 0}
+        )
+
+    def test_unknown_course_writes_nothing(self):
+        response = self.post(
+            "/api/course/complete", {"course_ids": [self.courses[0].id, 10**6]}
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(self.user.profile.completed_course.exists())
+
+    def test_backfill_is_admin_only(self):
+        admin = User.objects.create(username="admin", user_type="admin")
+        admin_token = AuthToken.objects.create(
+            user=admin, key=AuthToken.generate_token()
+        )
+        body = {
+            "completions": [
+                {"user_id": self.user.id, "course_id": course.id}
+                for course in self.courses
+            ]
+        }
+        response = self.post("/api/course/complete/backfill", body)
+        self.assertEqual(response.status_code, 403)
+        response = self.post("/api/course/complete/backfill", body, admin_token)
+        self.assertEqual(response.json()["completed_courses"], 3)
+
+
+class RecommendationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        skill_index.reset()
+        recommender.reset()
+        self.skills = Skill.objects.bulk_create(
+            Skill(name=f"skill {i}", description="") for i in range(4)
+        )
+        # Demand: skill 0 is held by three profiles, skill 1 by one.
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(3):
+                user = User.objects.create(username=f"holder{i}", user_type="seeker")
+                user.profile.verified_skills.add(*self.skills[: 1 if i else 2])
+            self.user = User.objects.create(username="seeker", user_type="seeker")
+        self.token = AuthToken.objects.create(
+            user=self.user, key=AuthToken.generate_token()
+        )
+
+    def add_course(self, *skills):
+        with self.captureOnCommitCallbacks(execute=True):
+            course = Course.objects.create(title="course", description="")
+            course.skills.add(*skills)
+        return course
+
+    def get(self, limit=10):
+        return self.client.get(
+            f"/api/course/recommended?limit={limit}",
+            HTTP_AUTHORIZATION=f"Bearer {self.token.key}",
+        ).json()
+
+    def test_ranks_by_skill_gap_demand(self):
+        a, b, c, d = self.skills
+        basic = self.add_course(a)
+        wide = self.add_course(a, b, c)
+        rare = self.add_course(c, d)
+        known = self.add_course(b)
+        done = self.add_course(a, b)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile.verified_skills.add(b)
+            self.user.profile.completed_course.add(done)
+
+        results = self.get()
+        self.assertEqual(
+            [result["course"]["id"] for result in results],
+            [wide.id, basic.id, rare.id],
+        )
+        self.assertEqual(results[0]["score"], 4 + 1)
+        self.assertEqual(results[0]["gap_skills"], [a.id, c.id])
+        self.assertNotIn(known.id, [result["course"]["id"] for result in results])
+        self.assertEqual(len(self.get(limit=1)), 1)
+
+        # Catalog changes rebuild the matrix.
+        new = self.add_course(a, c, d)
+        self.assertEqual(self.get(limit=1)[0]["course"]["id"], new.id)
+
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        courses = [
+            self.add_course(*rng.sample(self.skills, rng.randint(0, 4)))
+            for _ in range(30)
+        ]
+        verified = rng.sample(self.skills, 2)
+        completed = rng.sample(courses, 5)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile.verified_skills.add(*verified)
+            self.user.profile.completed_course.add(*completed)
+
+        demand = {skill.id: skill.verified_users.count() + 1 for skill in self.skills}
+        expected = []
+        for course in courses:
+            gap = [s.id for s in course.skills.all() if s not in verified]
+            score = sum(demand[skill_id] for skill_id in gap)
+            if score and course not in completed:
+                expected.append((-score, course.id))
+        expected.sort()
+        results = self.get(limit=8)
+        self.assertEqual(
+            [(-result["score"], result["course"]["id"]) for result in results],
+            expected[:8],
+        )
+
+
+class SkillMatcherTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        skill_matcher.reset()
+
+    def test_matches_brute_force(self):
+        rng = random.Random(3)
+        words = ["data", "machine", "learning", "deep", "go", "c++", "sql", "ops"]
+        skills = [
+            (number, " ".join(rng.choices(words, k=rng.randint(1, 3))).title())
+            for number in range(40)
+        ]
+        automaton = compile_skills(skills)
+        tokens = rng.choices(words + ["and", "with"], k=500)
+
+        expected = Counter()
+        for skill_id, name in skills:
+            pattern = list(tokenize(name))
+            for start in range(len(tokens) - len(pattern) + 1):
+                if tokens[start : start + len(pattern)] == pattern:
+                    expected[skill_id] += 1
+        self.assertEqual(automaton.count(tokens), expected)
+
+    def test_tokens_keep_symbols_of_skill_names(self):
+        self.assertEqual(
+            list(tokenize("C++/C#, Node.js and .NET; Machine  LEARNING.")),
+            ["c++", "c#", "node.js", "and", "net", "machine", "learning"],
+        )
+
+    def test_follows_the_catalog(self):
+        # Task workers may not share the catalog version of course/cache.py
+        # with the web processes, the database is checked instead.
+        rust = Skill.objects.create(name="Rust", description="")
+        text = "Rust services and Kubernetes operators"
+        self.assertEqual(skill_matcher.count(tokenize(text)), {rust.id: 1})
+        kubernetes = Skill.objects.create(name="kubernetes", description="")
+        self.assertEqual(
+            skill_matcher.count(tokenize(text)), {rust.id: 1, kubernetes.id: 1}
+        )
+        rust.delete()
+        self.assertEqual(skill_matcher.count(tokenize(text)), {kubernetes.id: 1})
+
+        # Renames are picked up once the automaton is SKILL_MATCHER_MAX_AGE old.
+        Skill.objects.filter(pk=kubernetes.pk).update(name="Docker")
+        self.assertEqual(skill_matcher.count(tokenize(text)), {kubernetes.id: 1})
+        with override_settings(SKILL_MATCHER_MAX_AGE=-1):
+            self.assertEqual(skill_matcher.count(tokenize(text)), {})
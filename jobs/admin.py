@@ -0,0 +1,13 @@
+from django.contrib import admin
+
+from .models import JobPosting
+
+
+@admin.register(JobPosting)
+class JobPostingAdmin(admin.ModelAdmin):
+    list_display = ("title", "employer", "is_open", "created_at")
+    list_select_related = ("employer__user",)
+    list_filter = ("is_open",)
+    search_fields = ("title",)
+    raw_id_fields = ("employer",)
+    autocomplete_fields = ("required_skills", "optional_skills")
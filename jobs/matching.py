@@ -0,0 +1,223 @@
+"""
+Materialised posting -> candidate matches.
+
+A seeker matches a posting when they verified at least one of its skills.
+JobMatch stores how many of the required and optional skills they hold and
+`score = REQUIRED_WEIGHT * required_count + optional_count`, so employers
+page through candidates on the (posting, -score, profile) index instead of
+aggregating verified skills per request.
+
+Rows are maintained incrementally after commit:
+
+- changing the skills of a posting recomputes that posting's rows from the
+  holders of its skills only;
+- changing a seeker's verified skills recomputes that seeker's rows for the
+  postings asking for one of the changed skills only.
+
+Changes are collected per thread and handed to one `refresh_matches` task
+per transaction (see tasks/queue.py), so a batch completion refreshes all of
+its profiles together and neither completions nor posting edits wait for the
+fan-out. Recomputing is idempotent, a task run twice or two tasks touching
+the same rows leave the same matches.
+"""
+
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, pre_delete
+from django.dispatch import receiver
+
+from authentication.models import UserProfile
+from course.models import Skill
+from tasks.queue import enqueue, task
+
+from .models import JobMatch, JobPosting
+
+REQUIRED_WEIGHT = 2
+BATCH_SIZE = 1000
+
+VerifiedSkill = UserProfile.verified_skills.through
+RequiredSkill = JobPosting.required_skills.through
+OptionalSkill = JobPosting.optional_skills.through
+
+_pending = threading.local()
+
+
+def posting_skills(posting_ids):
+    """
+    Return posting id -> (required skill ids, optional skill ids).
+    """
+    skills = defaultdict(lambda: (set(), set()))
+    for index, through in enumerate((RequiredSkill, OptionalSkill)):
+        for posting_id, skill_id in through.objects.filter(
+            jobposting_id__in=posting_ids
+        ).values_list("jobposting_id", "skill_id"):
+            skills[posting_id][index].add(skill_id)
+    return skills
+
+
+def postings_asking_for(skill_ids):
+    postings = set()
+    for through in (RequiredSkill, OptionalSkill):
+        postings.update(
+            through.objects.filter(skill_id__in=skill_ids).values_list(
+                "jobposting_id", flat=True
+            )
+        )
+    return postings
+
+
+def build_match(posting_id, profile_id, required, optional, held):
+    """
+    Return the JobMatch of a profile holding `held`, None without overlap.
+    """
+    required_count = len(required & held)
+    # A skill listed as both required and optional only counts as required.
+    optional_count = len((optional - required) & held)
+    if not required_count and not optional_count:
+        return None
+    return JobMatch(
+        posting_id=posting_id,
+        profile_id=profile_id,
+        required_count=required_count,
+        optional_count=optional_count,
+        score=REQUIRED_WEIGHT * required_count + optional_count,
+    )
+
+
+def rebuild_postings(posting_ids):
+    """
+    Recompute every match of `posting_ids`.
+    """
+    skills = posting_skills(posting_ids)
+    for posting_id in sorted(posting_ids):
+        required, optional = skills[posting_id]
+        held = defaultdict(set)
+        rows = VerifiedSkill.objects.filter(
+            skill_id__in=required | optional
+        ).values_list("userprofile_id", "skill_id")
+        for profile_id, skill_id in rows.iterator(chunk_size=10000):
+            held[profile_id].add(skill_id)
+
+        matches = (
+            build_match(posting_id, profile_id, required, optional, profile_skills)
+            for profile_id, profile_skills in held.items()
+        )
+        with transaction.atomic():
+            JobMatch.objects.filter(posting_id=posting_id).delete()
+            JobMatch.objects.bulk_create(
+                [match for match in matches if match], batch_size=BATCH_SIZE
+            )
+
+
+def refresh_profiles(profile_ids, skill_ids, exclude=()):
+    """
+    Recompute the matches of `profile_ids` for the postings asking for one of
+    `skill_ids`, skipping the postings in `exclude`.
+    """
+    posting_ids = postings_asking_for(skill_ids) - set(exclude)
+    if not posting_ids:
+        return
+    skills = posting_skills(posting_ids)
+    wanted = set().union(
+        *(required | optional for required, optional in skills.values())
+    )
+    profile_ids = sorted(set(profile_ids))
+    for start in range(0, len(profile_ids), BATCH_SIZE):
+        batch = profile_ids[start : start + BATCH_SIZE]
+        held = defaultdict(set)
+        for profile_id, skill_id in VerifiedSkill.objects.filter(
+            userprofile_id__in=batch, skill_id__in=wanted
+        ).values_list("userprofile_id", "skill_id"):
+            held[profile_id].add(skill_id)
+
+        matches = [
+            build_match(posting_id, profile_id, required, optional, profile_skills)
+            for posting_id, (required, optional) in skills.items()
+            for profile_id, profile_skills in held.items()
+        ]
+        with transaction.atomic():
+            JobMatch.objects.filter(
+                posting_id__in=posting_ids, profile_id__in=batch
+            ).delete()
+            JobMatch.objects.bulk_create(
+                [match for match in matches if match], batch_size=BATCH_SIZE
+            )
+
+
+def schedule(postings=(), profiles=(), skills=()):
+    """
+    Rebuild `postings` and refresh `profiles` for changes of `skills` once
+    the current transaction commits.
+    """
+    if not hasattr(_pending, "postings"):
+        _pending.postings, _pending.profiles, _pending.skills = set(), set(), set()
+    _pending.postings.update(postings)
+    _pending.profiles.update(profiles)
+    _pending.skills.update(skills)
+    # Registered every time, flushing empty sets is free. A callback lost to
+    # a savepoint rollback is covered by the ones registered after it.
+    transaction.on_commit(flush)
+
+
+def flush():
+    postings, profiles, skills = _pending.postings, _pending.profiles, _pending.skills
+    _pending.postings, _pending.profiles, _pending.skills = set(), set(), set()
+    if postings or profiles and skills:
+        enqueue(refresh_matches, sorted(postings), sorted(profiles), sorted(skills))
+
+
+@task
+def refresh_matches(postings, profiles, skills):
+    # Postings deleted since are gone with their matches.
+    postings = set(
+        JobPosting.objects.filter(id__in=postings).values_list("id", flat=True)
+    )
+    if postings:
+        rebuild_postings(postings)
+    if profiles and skills:
+        refresh_profiles(profiles, skills, exclude=postings)
+
+
+@receiver(m2m_changed, sender=RequiredSkill)
+@receiver(m2m_changed, sender=OptionalSkill)
+def posting_skills_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith("post_"):
+            schedule(postings=[instance.pk])
+    elif action in ("post_add", "post_remove"):
+        schedule(postings=pk_set)
+    elif action == "pre_clear":
+        schedule(postings=postings_asking_for([instance.pk]))
+
+
+@receiver(m2m_changed, sender=VerifiedSkill)
+def verified_skills_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ("post_add", "post_remove"):
+        if reverse:
+            schedule(profiles=pk_set, skills=[instance.pk])
+        else:
+            schedule(profiles=[instance.pk], skills=pk_set)
+    elif action == "pre_clear":
+        if reverse:
+            schedule(
+                profiles=VerifiedSkill.objects.filter(skill_id=instance.pk).values_list(
+                    "userprofile_id", flat=True
+                ),
+                skills=[instance.pk],
+            )
+        else:
+            schedule(
+                profiles=[instance.pk],
+                skills=VerifiedSkill.objects.filter(
+                    userprofile_id=instance.pk
+                ).values_list("skill_id", flat=True),
+            )
+
+
+@receiver(pre_delete, sender=Skill)
+def skill_deleted(sender, instance, **kwargs):
+    # Posting and verified skill links go by cascade without m2m_changed,
+    # rebuilding the postings that asked for the skill covers both.
+    schedule(postings=postings_asking_for([instance.pk]))
@@ -0,0 +1,105 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("authentication", "0008_public_profile"),
+        ("course", "0004_course_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JobPosting",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("title", models.CharField(max_length=255)),
+                ("description", models.TextField(blank=True)),
+                ("is_open", models.BooleanField(default=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "employer",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="postings",
+                        to="authentication.employerprofile",
+                    ),
+                ),
+                (
+                    "optional_skills",
+                    models.ManyToManyField(
+                        blank=True,
+                        related_name="optional_for_postings",
+                        to="course.skill",
+                    ),
+                ),
+                (
+                    "required_skills",
+                    models.ManyToManyField(
+                        blank=True,
+                        related_name="required_by_postings",
+                        to="course.skill",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="JobMatch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("required_count", models.PositiveIntegerField()),
+                ("optional_count", models.PositiveIntegerField()),
+                ("score", models.PositiveIntegerField()),
+                (
+                    "profile",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="job_matches",
+                        to="authentication.userprofile",
+                    ),
+                ),
+                (
+                    "posting",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="matches",
+                        to="jobs.jobposting",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["posting", "-score", "profile"], name="job_match_rank"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("posting", "profile"), name="unique_job_match"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+from django.db import models
+
+from authentication.models import EmployerProfile, UserProfile
+from course.models import Skill
+
+
+class JobPosting(models.Model):
+    """
+    An opening of an employer, described by the skills it asks for.
+    """
+
+    employer = models.ForeignKey(
+        EmployerProfile, on_delete=models.CASCADE, related_name="postings"
+    )
+    title = models.CharField(max_length=255)
+    description = models.TextField(blank=True)
+    required_skills = models.ManyToManyField(
+        Skill, related_name="required_by_postings", blank=True
+    )
+    optional_skills = models.ManyToManyField(
+        Skill, related_name="optional_for_postings", blank=True
+    )
+    is_open = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.title
+
+
+class JobMatch(models.Model):
+    """
+    A seeker holding at least one skill of a posting, maintained by
+    jobs/matching.py. Candidates are read in `job_match_rank` order.
+    """
+
+    posting = models.ForeignKey(
+        JobPosting, on_delete=models.CASCADE, related_name="matches"
+    )
+    profile = models.ForeignKey(
+        UserProfile, on_delete=models.CASCADE, related_name="job_matches"
+    )
+    required_count = models.PositiveIntegerField()
+    optional_count = models.PositiveIntegerField()
+    score = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["posting", "profile"], name="unique_job_match"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["posting", "-score", "profile"], name="job_match_rank")
+        ]
+
+    def __str__(self):
+        return f"{self.profile} for {self.posting}"
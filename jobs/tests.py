@@ -0,0 +1,168 @@
+import random
+
+from django.test import TestCase, override_settings
+
+from authentication.models import AuthToken, Resume, User
+from course.completion import complete_courses
+from course.models import Course, Skill
+
+from .matching import REQUIRED_WEIGHT
+from .models import JobMatch, JobPosting
+
+
+# Matches are refreshed by a task, run it as soon as the change commits.
+@override_settings(TASK_QUEUE_EAGER=True)
+class JobMatchTests(TestCase):
+    def setUp(self):
+        self.skills = Skill.objects.bulk_create(
+            Skill(name=f"skill {i}", description="") for i in range(4)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.employer = User.objects.create(username="acme", user_type="employer")
+            self.seekers = [
+                User.objects.create(username=f"seeker{i}", user_type="seeker")
+                for i in range(3)
+            ]
+        self.token = AuthToken.objects.create(
+            user=self.employer, key=AuthToken.generate_token()
+        )
+
+    def request(self, method, path, body=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, method)(
+                path,
+                body,
+                content_type="application/json",
+                HTTP_AUTHORIZATION=f"Bearer {self.token.key}",
+            )
+
+    def create_posting(self, required, optional=()):
+        response = self.request(
+            "post",
+            "/api/jobs/",
+            {
+                "title": "Engineer",
+                "required_skills": [skill.id for skill in required],
+                "optional_skills": [skill.id for skill in optional],
+            },
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()["id"]
+
+    def verify(self, user, *skills):
+        with self.captureOnCommitCallbacks(execute=True):
+            user.profile.verified_skills.add(*skills)
+
+    def candidates(self, posting_id, limit=10):
+        response = self.request(
+            "get", f"/api/jobs/{posting_id}/candidates?limit={limit}"
+        )
+        self.assertEqual(response.status_code, 200)
+        return [
+            (item["profile"]["user"], item["score"])
+            for item in response.json()["items"]
+        ]
+
+    def expected(self, posting_id):
+        """
+        Recompute the matches of a posting from scratch.
+        """
+        posting = JobPosting.objects.get(pk=posting_id)
+        required = set(posting.required_skills.all())
+        optional = set(posting.optional_skills.all()) - required
+        rows = []
+        for user in User.objects.filter(profile__isnull=False):
+            held = set(user.profile.verified_skills.all())
+            score = REQUIRED_WEIGHT * len(held & required) + len(held & optional)
+            if score:
+                rows.append((-score, user.profile.id, user.id))
+        return [(user_id, -score) for score, _, user_id in sorted(rows)]
+
+    def test_ranks_required_over_optional(self):
+        a, b, c, _ = self.skills
+        self.verify(self.seekers[0], c)
+        self.verify(self.seekers[1], a, c)
+        self.verify(self.seekers[2], a, b)
+        posting_id = self.create_posting(required=[a, b], optional=[c])
+        self.assertEqual(
+            self.candidates(posting_id),
+            [
+                (self.seekers[2].id, 2 * REQUIRED_WEIGHT),
+                (self.seekers[1].id, REQUIRED_WEIGHT + 1),
+                (self.seekers[0].id, 1),
+            ],
+        )
+
+    def test_follows_seeker_and_posting_changes(self):
+        a, b, c, d = self.skills
+        posting_id = self.create_posting(required=[a], optional=[b])
+        other_id = self.create_posting(required=[d])
+        self.verify(self.seekers[0], b)
+        self.assertEqual(self.candidates(posting_id), self.expected(posting_id))
+
+        # Completing a course verifies its skills through the batch path.
+        course = Course.objects.create(title="course", description="")
+        course.skills.add(a, d)
+        with self.captureOnCommitCallbacks(execute=True):
+            complete_courses([(self.seekers[1].id, course.id)])
+        self.assertEqual(self.candidates(posting_id), self.expected(posting_id))
+        self.assertEqual(self.candidates(other_id), self.expected(other_id))
+
+        response = self.request(
+            "patch", f"/api/jobs/{posting_id}", {"required_skills": [c.id]}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.candidates(posting_id), self.expected(posting_id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.seekers[0].profile.verified_skills.clear()
+            b.delete()
+        self.assertEqual(self.candidates(posting_id), self.expected(posting_id))
+
+    def test_matches_full_rebuild(self):
+        rng = random.Random(3)
+        posting_ids = [
+            self.create_posting(
+                required=rng.sample(self.skills, 2), optional=rng.sample(self.skills, 1)
+            )
+            for _ in range(3)
+        ]
+        for _ in range(20):
+            user = rng.choice(self.seekers)
+            with self.captureOnCommitCallbacks(execute=True):
+                if rng.random() < 0.7:
+                    user.profile.verified_skills.add(rng.choice(self.skills))
+                else:
+                    user.profile.verified_skills.remove(rng.choice(self.skills))
+        for posting_id in posting_ids:
+            self.assertEqual(self.candidates(posting_id), self.expected(posting_id))
+
+    def test_candidates_are_paged_with_constant_queries(self):
+        a = self.skills[0]
+        posting_id = self.create_posting(required=[a])
+        for user in self.seekers:
+            self.verify(user, a)
+        # Ownership, the page of matches and their profiles, the token is cached.
+        with self.assertNumQueries(3):
+            self.candidates(posting_id, limit=2)
+        self.assertEqual(JobMatch.objects.filter(posting_id=posting_id).count(), 3)
+
+    def test_candidates_carry_signed_cv_links(self):
+        posting_id = self.create_posting(required=[self.skills[0]])
+        for user in self.seekers[:2]:
+            self.verify(user, self.skills[0])
+        Resume.objects.create(user=self.seekers[0], resume_file="resumes/sha256/a.pdf")
+        response = self.request("get", f"/api/jobs/{posting_id}/candidates")
+        cvs = {item["profile"]["user"]: item["cv"] for item in response.json()["items"]}
+        self.assertIn("resumes/sha256/a.pdf", cvs[self.seekers[0].id])
+        self.assertIsNone(cvs[self.seekers[1].id])
+
+    def test_only_the_owner_sees_candidates(self):
+        posting_id = self.create_posting(required=[self.skills[0]])
+        self.token = AuthToken.objects.create(
+            user=self.seekers[0], key=AuthToken.generate_token()
+        )
+        response = self.request("get", f"/api/jobs/{posting_id}/candidates")
+        self.assertEqual(response.status_code, 404)
+        response = self.request("post", "/api/jobs/", {"title": "Nope"})
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,165 @@
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from ninja import ModelSchema, Schema
+from ninja.errors import HttpError
+from ninja_extra import api_controller, http_get, http_patch, http_post
+
+from authentication import resume_urls
+from authentication.auth import SimpleTokenAuth
+from authentication.models import EmployerProfile, PublicProfile
+from authentication.views import ProfileResponse
+from config.pagination import Page, paginate
+from course.models import Skill
+
+from .models import JobMatch, JobPosting
+
+
+class PostingSchema(ModelSchema):
+    class Meta:
+        model = JobPosting
+        fields = "__all__"
+
+
+class CreatePosting(Schema):
+    title: str
+    description: str = ""
+    required_skills: list[int] = []
+    optional_skills: list[int] = []
+    is_open: bool = True
+
+
+class UpdatePosting(Schema):
+    title: Optional[str] = None
+    description: Optional[str] = None
+    required_skills: Optional[list[int]] = None
+    optional_skills: Optional[list[int]] = None
+    is_open: Optional[bool] = None
+
+
+class Candidate(Schema):
+    profile: ProfileResponse
+    cv: Optional[str] = None
+    score: int
+    required_count: int
+    optional_count: int
+
+
+def save_posting(posting, data):
+    """
+    Apply the fields set on `data` to `posting` and save it with its skills.
+    """
+    values = data.dict(exclude_unset=True)
+    skills = {
+        name: values.pop(name)
+        for name in ("required_skills", "optional_skills")
+        if values.get(name) is not None
+    }
+    wanted = set().union(*skills.values())
+    unknown = wanted - set(
+        Skill.objects.filter(id__in=wanted).values_list("id", flat=True)
+    )
+    if unknown:
+        raise HttpError(400, f"Unknown skills {sorted(unknown)}")
+
+    for name, value in values.items():
+        if value is not None:
+            setattr(posting, name, value)
+    with transaction.atomic():
+        posting.save()
+        for name, skill_ids in skills.items():
+            getattr(posting, name).set(skill_ids)
+    return JobPosting.objects.prefetch_related(
+        "required_skills", "optional_skills"
+    ).get(pk=posting.pk)
+
+
+async def employer_id(request):
+    employer = (
+        await EmployerProfile.objects.filter(user_id=request.user.pk)
+        .values_list("id", flat=True)
+        .afirst()
+    )
+    if employer is None:
+        raise HttpError(403, "Employers only")
+    return employer
+
+
+async def own_posting(request, posting_id):
+    posting = await JobPosting.objects.filter(
+        pk=posting_id, employer__user_id=request.user.pk
+    ).afirst()
+    if posting is None:
+        raise HttpError(404, "Posting not found")
+    return posting
+
+
+@api_controller("/jobs", auth=SimpleTokenAuth(), tags=["Jobs"])
+class JobsController:
+    @http_post("/", response={201: PostingSchema})
+    async def create_posting(self, request, data: CreatePosting):
+        """
+        Create a job posting for the authenticated employer.
+        """
+        posting = JobPosting(employer_id=await employer_id(request))
+        return 201, await sync_to_async(save_posting)(posting, data)
+
+    @http_get("/{int:posting_id}", response=PostingSchema)
+    async def get_posting(self, request, posting_id: int):
+        posting = (
+            await JobPosting.objects.prefetch_related(
+                "required_skills", "optional_skills"
+            )
+            .filter(pk=posting_id)
+            .afirst()
+        )
+        if posting is None:
+            raise HttpError(404, "Posting not found")
+        return posting
+
+    @http_patch("/{int:posting_id}", response=PostingSchema)
+    async def update_posting(self, request, posting_id: int, data: UpdatePosting):
+        """
+        Change the fields given, skill lists replace the current ones.
+        """
+        posting = await own_posting(request, posting_id)
+        return await sync_to_async(save_posting)(posting, data)
+
+    @http_get("/{int:posting_id}/candidates", response=Page[Candidate])
+    async def candidates(
+        self, request, posting_id: int, cursor: str = None, limit: int = None
+    ):
+        """
+        Seekers holding skills of the posting, best match first. Required
+        skills count twice as much as optional ones.
+        """
+        await own_posting(request, posting_id)
+        page = await paginate(
+            JobMatch.objects.filter(posting_id=posting_id).only(
+                "profile_id", "score", "required_count", "optional_count"
+            ),
+            ("-score", "profile_id"),
+            cursor,
+            limit,
+        )
+        profiles = {
+            profile_id: (profile, resume)
+            async for profile_id, profile, resume in PublicProfile.objects.filter(
+                profile_id__in=[match.profile_id for match in page["items"]]
+            ).values_list("profile_id", "profile", "user__resume__resume_file")
+        }
+        # Signed in one batch, mostly from the URL cache.
+        cvs = resume_urls.urls(resume for _, resume in profiles.values())
+        page["items"] = [
+            {
+                "profile": profiles[match.profile_id][0],
+                "cv": cvs.get(profiles[match.profile_id][1]),
+                "score": match.score,
+                "required_count": match.required_count,
+                "optional_count": match.optional_count,
+            }
+            for match in page["items"]
+            if match.profile_id in profiles
+        ]
+        return page
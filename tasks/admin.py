@@ -0,0 +1,28 @@
+from django.contrib import admin, messages
+from django.utils import timezone
+
+from config.admin import LargeTableAdmin
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(LargeTableAdmin):
+    list_display = ("name", "status", "attempts", "run_at", "started_at", "key")
+    list_filter = ("status", "name")
+    search_fields = ("key",)
+    readonly_fields = ("enqueued_at", "started_at", "claimed_by", "last_error")
+    actions = ("retry",)
+
+    @admin.action(description="Retry selected failed tasks")
+    def retry(self, request, queryset):
+        pending = Task.objects.exclude(status=Task.Status.FAILED).filter(
+            key__isnull=False
+        )
+        # A failed task whose key was enqueued again is left alone.
+        retried = (
+            queryset.filter(status=Task.Status.FAILED)
+            .exclude(key__in=pending.values("key"))
+            .update(status=Task.Status.QUEUED, attempts=0, run_at=timezone.now())
+        )
+        self.message_user(request, f"Queued {retried} tasks again.", messages.SUCCESS)
@@ -0,0 +1,57 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from config.metrics import serve
+from tasks.queue import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background tasks from the database queue until stopped. SIGTERM "
+        "and SIGINT let the running tasks finish first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.TASK_CONCURRENCY,
+            help="Tasks run at the same time, each in its own thread.",
+        )
+        parser.add_argument(
+            "--poll-interval", type=float, default=settings.TASK_POLL_INTERVAL
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Exit once no task is due."
+        )
+        parser.add_argument(
+            "--metrics-port",
+            type=int,
+            default=settings.TASK_METRICS_PORT,
+            help="Serve Prometheus metrics of the tasks on this port, 0 for none.",
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            concurrency=options["concurrency"],
+            poll_interval=options["poll_interval"],
+        )
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *args: worker.stop())
+        server = None
+        if options["metrics_port"]:
+            server = serve(options["metrics_port"])
+        try:
+            outcomes = worker.run(once=options["once"])
+        finally:
+            if server:
+                server.shutdown()
+                server.server_close()
+        self.stdout.write(
+            ", ".join(
+                f"{outcomes[outcome]} {outcome}"
+                for outcome in ("done", "retried", "failed", "lost")
+            )
+        )
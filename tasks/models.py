@@ -0,0 +1,56 @@
+from django.db import models
+from django.db.models import Q
+
+
+class Task(models.Model):
+    """
+    Deferred call of a function registered with `tasks.queue.task`. Tasks
+    that succeed are deleted, failed ones are kept for inspection.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        FAILED = "failed", "Failed"
+
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    # Idempotency key, unique among the tasks not run yet.
+    key = models.CharField(max_length=200, null=True, blank=True)
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.QUEUED
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField()
+    run_at = models.DateTimeField()
+    enqueued_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Worker and claim of the current run.
+    claimed_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["key"],
+                condition=Q(status__in=["queued", "running"]),
+                name="task_key_pending",
+            )
+        ]
+        indexes = [
+            # Partial, so the ready scan never walks failed tasks.
+            models.Index(
+                fields=["run_at", "id"],
+                condition=Q(status="queued"),
+                name="task_ready",
+            ),
+            models.Index(
+                fields=["claimed_by"],
+                condition=Q(status="running"),
+                name="task_running",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
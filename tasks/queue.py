@@ -0,0 +1,275 @@
+"""
+Background tasks stored in the database.
+
+A function decorated with `@task` is deferred with `enqueue(func, *args)`,
+which inserts a Task row with the JSON arguments. Called inside a
+transaction the task commits or rolls back with the work that asked for it,
+and request handlers return without waiting for it. `manage.py run_tasks`
+workers run the due tasks, a few threads each.
+
+Workers claim tasks with one UPDATE of the oldest due rows. On Postgres the
+rows are picked with `SELECT ... FOR UPDATE SKIP LOCKED`, so concurrent
+workers take different rows instead of waiting on each other's locks; on
+SQLite, which has no row locks and serialises writers, the same UPDATE only
+takes rows still queued. Either way a task is claimed by one worker.
+
+A task that raises is retried after TASK_RETRY_DELAY seconds, doubling with
+every attempt up to TASK_RETRY_MAX_DELAY and jittered, until it has run
+`max_attempts` times; then it is kept as failed. A task still running after
+TASK_TIMEOUT seconds is taken for lost with its worker and run again, so
+tasks must be safe to run twice.
+
+Tasks enqueued with a `key` are idempotent: another task with the same key
+is not enqueued while the first one waits or runs.
+
+Tasks declared with `@task(every=seconds)` are periodic: once the previous
+run ended, the next check for lost tasks of a running worker enqueues the
+task again, due `every` seconds later. It is keyed by name, so one run waits
+at a time however many workers there are.
+
+With TASK_QUEUE_EAGER, e.g. in tests, tasks run in-process once the current
+transaction commits instead.
+"""
+
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+import uuid
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from config.metrics import TASK_DURATION, TASK_RUNS, TASK_WAIT
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, FAILED = Task.Status.QUEUED, Task.Status.RUNNING, Task.Status.FAILED
+
+registry = {}
+# Task name -> seconds between runs of the periodic tasks.
+periodic = {}
+
+
+def task(func=None, *, name=None, max_attempts=None, every=None):
+    """
+    Register `func` as a task, under its dotted path unless `name` is given,
+    run every `every` seconds if given.
+    """
+
+    def register(func):
+        func.task_name = name or f"{func.__module__}.{func.__qualname__}"
+        func.max_attempts = max_attempts
+        registry[func.task_name] = func
+        if every:
+            periodic[func.task_name] = every
+        return func
+
+    return register(func) if func else register
+
+
+def enqueue(func, *args, key=None, delay=0, **kwargs):
+    """
+    Run the task `func(*args, **kwargs)` in a worker once the current
+    transaction commits, and not before `delay` seconds from now. Arguments
+    must be JSON serialisable. Nothing is enqueued while a task with the same
+    `key` waits or runs.
+    """
+    if settings.TASK_QUEUE_EAGER:
+        transaction.on_commit(lambda: func(*args, **kwargs))
+        return
+    Task.objects.bulk_create(
+        [
+            Task(
+                name=func.task_name,
+                args=list(args),
+                kwargs=kwargs,
+                key=key,
+                max_attempts=func.max_attempts or settings.TASK_MAX_ATTEMPTS,
+                run_at=timezone.now() + timedelta(seconds=delay),
+            )
+        ],
+        ignore_conflicts=key is not None,
+    )
+
+
+def claim(worker, limit):
+    """
+    Mark up to `limit` due tasks as run by `worker` and return them.
+    """
+    now = timezone.now()
+    token = f"{worker}:{uuid.uuid4().hex[:12]}"
+    ready = (
+        Task.objects.filter(status=QUEUED, run_at__lte=now)
+        .order_by("run_at", "id")
+        .values("id")[:limit]
+    )
+    if connection.features.has_select_for_update_skip_locked:
+        ready = ready.select_for_update(skip_locked=True)
+    with transaction.atomic():
+        claimed = Task.objects.filter(id__in=ready, status=QUEUED).update(
+            status=RUNNING,
+            claimed_by=token,
+            started_at=now,
+            attempts=F("attempts") + 1,
+        )
+    if not claimed:
+        return []
+    return list(
+        Task.objects.filter(status=RUNNING, claimed_by=token).order_by("run_at", "id")
+    )
+
+
+def backoff(attempts):
+    delay = min(
+        settings.TASK_RETRY_MAX_DELAY, settings.TASK_RETRY_DELAY * 2 ** (attempts - 1)
+    )
+    return delay * random.uniform(0.5, 1)
+
+
+def run(task):
+    """
+    Run a claimed task and record the outcome: "done", "retried" or
+    "failed".
+    """
+    func = registry.get(task.name)
+    TASK_WAIT.labels(task.name).observe(
+        max(0, (task.started_at - task.run_at).total_seconds())
+    )
+    started = time.perf_counter()
+    mine = Task.objects.filter(pk=task.pk, status=RUNNING, claimed_by=task.claimed_by)
+    try:
+        if func is None:
+            raise LookupError(f"Unknown task {task.name}")
+        func(*task.args, **task.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        if func is not None and task.attempts < task.max_attempts:
+            logger.warning("Task %s failed, retrying", task, exc_info=True)
+            outcome = "retried"
+            mine.update(
+                status=QUEUED,
+                run_at=timezone.now() + timedelta(seconds=backoff(task.attempts)),
+                claimed_by="",
+                last_error=error,
+            )
+        else:
+            logger.error("Task %s failed", task, exc_info=True)
+            outcome = "failed"
+            mine.update(status=FAILED, last_error=error)
+    else:
+        outcome = "done"
+        mine.delete()
+    TASK_DURATION.labels(task.name).observe(time.perf_counter() - started)
+    TASK_RUNS.labels(task.name, outcome).inc()
+    return outcome
+
+
+def requeue_lost():
+    """
+    Queue the tasks running for longer than TASK_TIMEOUT again, or fail them
+    when they have no attempt left. Returns how many were found.
+    """
+    lost = Task.objects.filter(
+        status=RUNNING,
+        started_at__lt=timezone.now() - timedelta(seconds=settings.TASK_TIMEOUT),
+    )
+    failed = lost.filter(attempts__gte=F("max_attempts")).update(
+        status=FAILED, last_error="Timed out"
+    )
+    return failed + lost.update(
+        status=QUEUED, run_at=timezone.now(), claimed_by="", last_error="Timed out"
+    )
+
+
+def schedule_periodic():
+    """
+    Enqueue the next run of every periodic task that has none waiting or
+    running.
+    """
+    for name, every in periodic.items():
+        enqueue(registry[name], key=f"periodic:{name}", delay=every)
+
+
+def depth():
+    """
+    Return `(task name, status) -> (count, oldest run_at)` of the stored
+    tasks.
+    """
+    rows = (
+        Task.objects.values_list("name", "status")
+        .annotate(count=Count("*"), oldest=Min("run_at"))
+        .order_by()
+    )
+    return {(name, status): (count, oldest) for name, status, count, oldest in rows}
+
+
+def run_task(task):
+    try:
+        return run(task)
+    except Exception:
+        # The task stays running until requeue_lost() picks it up.
+        logger.exception("Could not record the outcome of task %s", task)
+        return "lost"
+    finally:
+        close_old_connections()
+
+
+class Worker:
+    """
+    Claims due tasks and runs up to `concurrency` of them at a time in
+    threads, polling every `poll_interval` seconds when idle.
+    """
+
+    def __init__(self, concurrency=4, poll_interval=1.0, name=None):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = threading.Event()
+        self.outcomes = Counter()
+
+    def stop(self):
+        self.stopping.set()
+
+    def run(self, once=False):
+        """
+        Run tasks until stopped, or until none is due with `once`.
+        """
+        running = set()
+        checked = 0
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix="task") as pool:
+            while not self.stopping.is_set():
+                if time.monotonic() - checked > settings.TASK_TIMEOUT / 10:
+                    if lost := requeue_lost():
+                        logger.warning("Requeued %d lost tasks", lost)
+                    if not once:
+                        schedule_periodic()
+                    checked = time.monotonic()
+                free = self.concurrency - len(running)
+                claimed = claim(self.name, free) if free else []
+                running.update(pool.submit(run_task, task) for task in claimed)
+                if once and not running:
+                    break
+                if running:
+                    # Claim again as soon as a slot is free.
+                    done, running = wait(
+                        running, self.poll_interval, return_when=FIRST_COMPLETED
+                    )
+                    for future in done:
+                        self.outcomes[future.result()] += 1
+                elif not claimed:
+                    close_old_connections()
+                    self.stopping.wait(self.poll_interval)
+            for future in running:
+                self.outcomes[future.result()] += 1
+        return self.outcomes
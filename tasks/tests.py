@@ -0,0 +1,176 @@
+from datetime import timedelta
+from io import StringIO
+from urllib.request import urlopen
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from prometheus_client import REGISTRY, generate_latest
+from prometheus_client.parser import text_string_to_metric_families
+
+from config.metrics import serve
+from config.testing import run_due_tasks
+
+from . import queue
+from .models import Task
+from .queue import claim, enqueue, task
+
+calls = []
+
+
+@task
+def record(value):
+    calls.append(value)
+
+
+@task(max_attempts=2)
+def broken():
+    raise RuntimeError("broken")
+
+
+@task(every=60)
+def tick():
+    calls.append("tick")
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_tasks_commit_with_the_transaction(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            enqueue(record, 1)
+            raise RuntimeError
+        enqueue(record, 2, delay=60)
+        enqueue(record, value=3)
+        self.assertEqual(run_due_tasks(), {"done": 1})
+        self.assertEqual(calls, [3])
+        # The delayed task waits.
+        self.assertEqual(Task.objects.get().args, [2])
+
+    def test_idempotency_keys(self):
+        enqueue(record, 1, key="once")
+        enqueue(record, 2, key="once")
+        claimed = claim("worker", 10)
+        enqueue(record, 3, key="once")
+        self.assertEqual([task.args for task in claimed], [[1]])
+        self.assertEqual(Task.objects.count(), 1)
+
+        queue.run(claimed[0])
+        enqueue(record, 4, key="once")
+        run_due_tasks()
+        self.assertEqual(calls, [1, 4])
+
+    def test_each_task_is_claimed_once(self):
+        for value in range(5):
+            enqueue(record, value)
+        first, second = claim("a", 3), claim("b", 10)
+        self.assertEqual([task.args[0] for task in first + second], list(range(5)))
+        self.assertEqual({task.attempts for task in first + second}, {1})
+        self.assertEqual(claim("c", 10), [])
+
+    @override_settings(TASK_RETRY_DELAY=60)
+    def test_failures_are_retried_with_backoff(self):
+        enqueue(broken)
+        self.assertEqual(run_due_tasks(), {"retried": 1})
+        retry = Task.objects.get()
+        self.assertEqual(retry.status, Task.Status.QUEUED)
+        self.assertGreater(retry.run_at, timezone.now() + timedelta(seconds=25))
+        self.assertIn("RuntimeError: broken", retry.last_error)
+        # Doubling stops at TASK_RETRY_MAX_DELAY, jitter takes up to half off.
+        self.assertTrue(1800 <= queue.backoff(20) <= 3600)
+
+        Task.objects.update(run_at=timezone.now())
+        self.assertEqual(run_due_tasks(), {"failed": 1})
+        self.assertEqual(Task.objects.get().status, Task.Status.FAILED)
+
+        Task.objects.create(name="gone", max_attempts=5, run_at=timezone.now())
+        self.assertEqual(run_due_tasks(), {"failed": 1})
+
+    def test_lost_tasks_run_again(self):
+        enqueue(record, 1)
+        enqueue(broken)
+        claim("crashed", 10)
+        self.assertEqual(queue.requeue_lost(), 0)
+        Task.objects.update(started_at=timezone.now() - timedelta(days=1))
+        Task.objects.filter(name=broken.task_name).update(attempts=2)
+        self.assertEqual(queue.requeue_lost(), 2)
+        self.assertEqual(
+            dict(Task.objects.values_list("name", "status")),
+            {record.task_name: "queued", broken.task_name: "failed"},
+        )
+        self.assertEqual(run_due_tasks(), {"done": 1})
+
+    def test_periodic_tasks(self):
+        queue.schedule_periodic()
+        queue.schedule_periodic()
+        scheduled = Task.objects.get(name=tick.task_name)
+        self.assertEqual(scheduled.key, f"periodic:{tick.task_name}")
+        self.assertGreater(scheduled.run_at, timezone.now() + timedelta(seconds=50))
+
+        Task.objects.filter(pk=scheduled.pk).update(run_at=timezone.now())
+        self.assertEqual(run_due_tasks(), {"done": 1})
+        self.assertEqual(calls, ["tick"])
+        queue.schedule_periodic()
+        self.assertEqual(Task.objects.filter(name=tick.task_name).count(), 1)
+
+    def test_metrics(self):
+        enqueue(record, 1)
+        enqueue(record, 2)
+        enqueue(broken, delay=60)
+        metrics = generate_latest(REGISTRY).decode()
+        self.assertIn(
+            f'task_queue_depth{{status="queued",task="{record.task_name}"}} 2.0',
+            metrics,
+        )
+        self.assertIn(
+            f'task_queue_oldest_age_seconds{{task="{record.task_name}"}}', metrics
+        )
+
+        run_due_tasks()
+        metrics = generate_latest(REGISTRY).decode()
+        self.assertIn(
+            f'task_runs_total{{outcome="done",task="{record.task_name}"}}', metrics
+        )
+        self.assertIn(
+            f'task_queue_wait_seconds_count{{task="{record.task_name}"}}', metrics
+        )
+
+    def test_workers_serve_their_metrics(self):
+        enqueue(record, 1)
+        run_due_tasks()
+        server = serve(0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_port}/metrics"
+        with urlopen(url) as response:
+            families = {
+                family.name: family
+                for family in text_string_to_metric_families(response.read().decode())
+            }
+        for name in ("task_queue_wait_seconds", "task_duration_seconds"):
+            self.assertIn(
+                {"task": record.task_name},
+                [sample.labels for sample in families[name].samples],
+            )
+        # Read from the database by the web processes.
+        self.assertNotIn("task_queue_depth", families)
+
+
+class WorkerTests(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_worker_drains_the_queue(self):
+        for value in range(6):
+            enqueue(record, value)
+        enqueue(broken)
+        out = StringIO()
+        # One task thread: the in-memory test database locks whole tables
+        # and, unlike a database file, does not wait for the lock.
+        with override_settings(TASK_RETRY_DELAY=0):
+            call_command("run_tasks", once=True, concurrency=1, stdout=out)
+        self.assertEqual(out.getvalue().strip(), "6 done, 1 retried, 1 failed, 0 lost")
+        self.assertEqual(sorted(calls), list(range(6)))
+        self.assertEqual(Task.objects.get().status, Task.Status.FAILED)